@@ -15,6 +15,21 @@ import {
 import { Audio } from 'expo-av';
 import * as FileSystem from 'expo-file-system';
  
+// Voice notes are uploaded in chunks of this many bytes, a multiple of 3 so each
+// chunk is whole base64; it stays well under the server's message size limit
+const UPLOAD_CHUNK_BYTES = 48 * 1024;
+ 
+// Record ADTS AAC on Android: unlike m4a it can be decoded before the whole file has arrived
+const RECORDING_OPTIONS = {
+  ...Audio.RecordingOptionsPresets.HIGH_QUALITY,
+  android: {
+    ...Audio.RecordingOptionsPresets.HIGH_QUALITY.android,
+    extension: '.aac',
+    outputFormat: Audio.AndroidOutputFormat.AAC_ADTS,
+    audioEncoder: Audio.AndroidAudioEncoder.AAC,
+  },
+};
+ 
 // Helper function to convert base64 to an ArrayBuffer
 function base64ToArrayBuffer(base64) {
   const binaryString = atob(base64);
@@ -74,6 +89,12 @@ export default function App() {
           audioBuffer.push(message.data);
         }
  
+        // The server refused a message, e.g. a voice note chunk out of order
+        if (message.error) {
+          console.error('Server error:', message.error);
+          addMessage('system', `Error: ${message.error}`);
+        }
+ 
         // If it's text, update the message content
         if (message.mime_type === 'text/plain') {
           addMessage('model', message.data, currentMessageId);
@@ -175,12 +196,12 @@ export default function App() {
  
       console.log('Starting recording..');
       const { recording } = await Audio.Recording.createAsync(
-        Audio.RecordingOptionsPresets.HIGH_QUALITY
+        RECORDING_OPTIONS
       );
       setRecording(recording);
       setIsRecording(true);
       console.log(
-        'Audio streaming started - will send complete file when recording stops'
+        'Recording started - will upload the file in chunks when recording stops'
       );
     } catch (err) {
       console.error('Failed to start recording', err);
@@ -198,48 +219,45 @@ export default function App() {
     setRecording(null);
   };
  
+  // Uploads the recording in sequenced chunks so the server can start decoding before the last one arrives
   const sendAudioFile = async (uri) => {
     try {
       console.log('=== SENDING AUDIO FILE ===');
       console.log('Audio file URI:', uri);
  
-      const response = await fetch(uri);
-      const blob = await response.blob();
- 
-      console.log('Audio blob size:', blob.size, 'bytes');
-      console.log('Audio blob type:', blob.type);
- 
-      const reader = new FileReader();
-      reader.onload = () => {
-        const base64Data = reader.result.split(',')[1];
- 
-        console.log('Base64 audio data length:', base64Data.length);
-        console.log('WebSocket state:', websocket?.readyState);
- 
-        if (websocket && websocket.readyState === WebSocket.OPEN) {
-          const message = {
-            mime_type: 'audio/m4a',
-            data: base64Data,
-            role: 'user',
-          };
+      const info = await FileSystem.getInfoAsync(uri);
+      const mimeType = uri.endsWith('.aac') ? 'audio/aac' : 'audio/m4a';
+      const uploadId = `${sessionId}_${Date.now()}`;
+      const chunkCount = Math.max(1, Math.ceil(info.size / UPLOAD_CHUNK_BYTES));
+      console.log('Audio file size:', info.size, 'bytes in', chunkCount, 'chunks');
  
-          console.log('🚀 Sending audio/m4a message to server...');
-          websocket.send(JSON.stringify(message));
-          console.log('✅ Audio data sent to server successfully');
-        } else {
+      for (let seq = 0; seq < chunkCount; seq++) {
+        if (!websocket || websocket.readyState !== WebSocket.OPEN) {
           console.error('❌ WebSocket not ready for audio transmission');
           addMessage(
             'system',
             'Error: Could not send audio. Please check your connection.'
           );
+          return;
         }
-      };
- 
-      reader.onerror = (error) => {
-        console.error('Error reading audio file:', error);
-      };
  
-      reader.readAsDataURL(blob);
+        const data = await FileSystem.readAsStringAsync(uri, {
+          encoding: FileSystem.EncodingType.Base64,
+          position: seq * UPLOAD_CHUNK_BYTES,
+          length: Math.min(UPLOAD_CHUNK_BYTES, info.size - seq * UPLOAD_CHUNK_BYTES),
+        });
+        websocket.send(
+          JSON.stringify({
+            mime_type: mimeType,
+            upload_id: uploadId,
+            seq,
+            end: seq === chunkCount - 1,
+            data,
+            role: 'user',
+          })
+        );
+      }
+      console.log('✅ Audio data sent to server successfully');
     } catch (err) {
       console.error('❌ Error sending audio file:', err);
       addMessage('system', 'Error: Could not send audio file.');
@@ -1 +1,7 @@
 # Initialize app package
+
+# Modules under app read their settings from the environment at import time,
+# so .env has to be loaded before any of them is imported
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,82 @@
+# Audio Streaming Package
+
+"""
+Audio helpers for the websocket streaming endpoint.
+"""
+
+from .coalescing import AudioCoalescer
+from .decoder import FfmpegSpares, FfmpegStreamDecoder, decoder_spares
+from .encoding import (
+    OUTPUT_CODECS,
+    OUTPUT_SAMPLE_RATES,
+    FfmpegOpusEncoder,
+    MulawEncoder,
+    OggPacketReader,
+    OutputEncoder,
+    create_output_encoder,
+)
+from .ingress import (
+    OVERFLOW_BLOCK,
+    OVERFLOW_CLOSE,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_POLICIES,
+    BoundedLiveRequestQueue,
+    IngressBudget,
+    IngressOverflow,
+    ingress_backlog_seconds,
+)
+from .framing import (
+    AUDIO_FRAME_HEADER_SIZE,
+    CODEC_MULAW,
+    CODEC_OPUS,
+    CODEC_PCM16,
+    CODEC_PCM_F32,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+from .pacing import BURST, PACED, PACING_MODES, AudioPacer
+from .pcm import PcmIngestor, PcmResampler, parse_pcm_mime_type
+from .upload import ChunkedUpload
+from .vad import VAD_COMPRESS, VAD_DROP, VAD_MODES, VAD_OFF, VoiceActivityGate
+
+__all__ = [
+    "AudioCoalescer",
+    "AudioPacer",
+    "BURST",
+    "BoundedLiveRequestQueue",
+    "AUDIO_FRAME_HEADER_SIZE",
+    "CODEC_MULAW",
+    "CODEC_OPUS",
+    "CODEC_PCM16",
+    "CODEC_PCM_F32",
+    "ChunkedUpload",
+    "FfmpegOpusEncoder",
+    "FfmpegSpares",
+    "FfmpegStreamDecoder",
+    "IngressBudget",
+    "IngressOverflow",
+    "MulawEncoder",
+    "OUTPUT_CODECS",
+    "OVERFLOW_BLOCK",
+    "OVERFLOW_CLOSE",
+    "OVERFLOW_DROP_OLDEST",
+    "OVERFLOW_POLICIES",
+    "OUTPUT_SAMPLE_RATES",
+    "OggPacketReader",
+    "OutputEncoder",
+    "PACED",
+    "PACING_MODES",
+    "PcmIngestor",
+    "PcmResampler",
+    "VAD_COMPRESS",
+    "VAD_DROP",
+    "VAD_MODES",
+    "VAD_OFF",
+    "VoiceActivityGate",
+    "create_output_encoder",
+    "decode_audio_frame",
+    "decoder_spares",
+    "encode_audio_frame",
+    "ingress_backlog_seconds",
+    "parse_pcm_mime_type",
+]
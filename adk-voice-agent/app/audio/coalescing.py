@@ -0,0 +1,177 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class AudioCoalescer:
+    """
+    Per-session writer that combines the agent's PCM parts into larger frames.
+
+    The live model emits audio in parts of varying, often small, size; sending
+    each one costs a message envelope and a send call. ``write()`` buffers
+    parts and hands ``send`` frames of ``frame_ms`` of audio:
+
+    - the first part after the writer has been idle goes out at once, so
+      coalescing never delays the start of a reply;
+    - a partial frame is sent once its oldest audio has waited
+      ``max_hold_ms``, which bounds the added latency;
+    - ``flush()`` sends whatever is buffered at turn end, then calls
+      ``on_flush`` (e.g. to flush an encoder downstream);
+    - ``discard()`` drops it instead when the reply is interrupted, then
+      calls ``on_discard`` (e.g. to reset the encoder);
+    - a change of sample rate flushes the audio buffered at the old rate.
+
+    ``frame_ms=0`` disables coalescing, every part is sent as it arrives.
+    Frames per second and the average frame size are reported by ``stats()``.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[bytes, int], Awaitable[None]],
+        frame_ms: int = 80,
+        max_hold_ms: int = 40,
+        sample_width: int = 2,
+        on_flush: Optional[Callable[[], Awaitable[None]]] = None,
+        on_discard: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        if frame_ms < 0 or max_hold_ms < 0:
+            raise ValueError("frame_ms and max_hold_ms must not be negative")
+
+        self.send = send
+        self.on_flush = on_flush
+        self.on_discard = on_discard
+        self.frame_ms = frame_ms
+        self.max_hold = max_hold_ms / 1000
+        self.sample_width = sample_width
+
+        self.parts_in = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.hold_flushes = 0
+        self.bytes_discarded = 0
+        self._started = time.monotonic()
+
+        self._buffer = bytearray()
+        self._sample_rate = 0
+        self._idle = True
+        self._lock = asyncio.Lock()
+        self._held_since: Optional[float] = None
+        self._hold_timer: Optional[asyncio.TimerHandle] = None
+        self._hold_task: Optional[asyncio.Task] = None
+
+    async def write(self, pcm: bytes, sample_rate: int):
+        """Buffers one part of agent audio, sending every frame it completes"""
+        self.parts_in += 1
+        if self._buffer and sample_rate != self._sample_rate:
+            await self.flush()
+        self._sample_rate = sample_rate
+
+        if not self.frame_ms or self._idle:
+            self._idle = False
+            async with self._lock:
+                await self._send_frame(pcm, sample_rate)
+            return
+
+        frame_bytes = max(1, sample_rate * self.frame_ms // 1000) * self.sample_width
+        async with self._lock:
+            held = len(self._buffer)
+            self._buffer += pcm
+            while len(self._buffer) >= frame_bytes:
+                frame = bytes(self._buffer[:frame_bytes])
+                del self._buffer[:frame_bytes]
+                await self._send_frame(frame, sample_rate)
+                held = 0
+            if not self._buffer:
+                self._held_since = None
+            elif not held:
+                # What is left arrived with this part
+                self._held_since = asyncio.get_running_loop().time()
+                if self._hold_timer is None:
+                    self._hold_timer = asyncio.get_running_loop().call_later(self.max_hold, self._hold_expired)
+
+    async def flush(self):
+        """Sends the buffered audio now; the next part starts a new reply and goes out at once"""
+        self._cancel_hold_timer()
+        async with self._lock:
+            await self._send_buffer()
+            if self.on_flush is not None:
+                await self.on_flush()
+        self._idle = True
+
+    async def discard(self):
+        """Drops the buffered audio of an interrupted reply; the next part goes out at once"""
+        self._cancel_hold_timer()
+        async with self._lock:
+            self.bytes_discarded += len(self._buffer)
+            self._buffer.clear()
+            if self.on_discard is not None:
+                await self.on_discard()
+        self._idle = True
+
+    @property
+    def pending_ms(self) -> float:
+        """Milliseconds of audio waiting to be sent"""
+        if not self._sample_rate:
+            return 0.0
+        return len(self._buffer) * 1000 / (self._sample_rate * self.sample_width)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the writer counters"""
+        elapsed = time.monotonic() - self._started
+        return {
+            "frame_ms": self.frame_ms,
+            "parts_in": self.parts_in,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "hold_flushes": self.hold_flushes,
+            "bytes_discarded": self.bytes_discarded,
+            "frames_per_second": round(self.frames_sent / elapsed, 2) if elapsed > 0 else 0.0,
+            "mean_frame_bytes": round(self.bytes_sent / self.frames_sent, 1) if self.frames_sent else 0.0,
+        }
+
+    async def close(self):
+        """Stops the hold timer, unsent audio is discarded"""
+        self._cancel_hold_timer()
+        if self._hold_task is not None:
+            self._hold_task.cancel()
+            try:
+                await self._hold_task
+            except asyncio.CancelledError:
+                pass
+            self._hold_task = None
+        self._buffer.clear()
+
+    async def _send_buffer(self):
+        if self._buffer:
+            frame = bytes(self._buffer)
+            self._buffer.clear()
+            await self._send_frame(frame, self._sample_rate)
+
+    async def _send_frame(self, frame: bytes, sample_rate: int):
+        await self.send(frame, sample_rate)
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+
+    def _cancel_hold_timer(self):
+        if self._hold_timer is not None:
+            self._hold_timer.cancel()
+            self._hold_timer = None
+        self._held_since = None
+
+    def _hold_expired(self):
+        # One timer at a time; it is moved on rather than cancelled as frames go out
+        self._hold_timer = None
+        if self._held_since is None:
+            return
+        remaining = self._held_since + self.max_hold - asyncio.get_running_loop().time()
+        if remaining > 0:
+            self._hold_timer = asyncio.get_running_loop().call_later(remaining, self._hold_expired)
+        else:
+            self._hold_task = asyncio.create_task(self._flush_held())
+
+    async def _flush_held(self):
+        async with self._lock:
+            if self._buffer:
+                self.hold_flushes += 1
+                self._held_since = None
+                await self._send_buffer()
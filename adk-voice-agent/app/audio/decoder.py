@@ -0,0 +1,239 @@
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+from app.logs import get_logger
+
+log = get_logger("audio")
+
+# Decode any container ffmpeg understands to 16 kHz mono s16le PCM
+FFMPEG_PCM_COMMAND = [
+    "ffmpeg", "-hide_banner", "-loglevel", "error",
+    "-i", "pipe:0",
+    "-f", "s16le", "-ar", "16000", "-ac", "1",
+    "pipe:1",
+]
+
+# Idle ffmpeg processes kept ready for voice notes, shared by all sessions of the worker
+DECODER_SPARES = int(os.getenv("DECODER_SPARES", "2"))
+
+
+class FfmpegSpares:
+    """
+    Small pool of ffmpeg processes spawned ahead of time and shared by every decoder.
+
+    A clip that takes a spare does not wait for process start-up. The pool
+    is only filled once the first voice note of the worker arrives and is
+    topped up in the background after each
+    claim, so at most ``size`` processes sit idle however many sessions are
+    connected, and sessions that never send a voice note cost none.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, size: int = DECODER_SPARES):
+        self.command = command or FFMPEG_PCM_COMMAND
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._spares: Deque[asyncio.subprocess.Process] = deque()
+        self._filling: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def take(self) -> asyncio.subprocess.Process:
+        """Returns an idle ffmpeg process, spawning one if none is ready"""
+        self._check_loop()
+        while self._spares:
+            process = self._spares.popleft()
+            # A spare may have died while idle, skip it
+            if process.returncode is None:
+                self.hits += 1
+                self._refill()
+                return process
+
+        self.misses += 1
+        self._refill()
+        return await self.spawn()
+
+    async def spawn(self) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def close(self):
+        """Stops refilling and kills the idle processes, called on shutdown"""
+        if self._filling is not None:
+            self._filling.cancel()
+            self._filling = None
+        while self._spares:
+            process = self._spares.popleft()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    def stats(self):
+        return {
+            "available": sum(1 for process in self._spares if process.returncode is None),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _check_loop(self):
+        # Subprocesses belong to the loop that spawned them, drop spares of a finished loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._spares.clear()
+            self._filling = None
+
+    def _refill(self):
+        self._check_loop()
+        if self.size > 0 and (self._filling is None or self._filling.done()):
+            self._filling = asyncio.create_task(self._fill())
+
+    async def _fill(self):
+        try:
+            while sum(1 for process in self._spares if process.returncode is None) < self.size:
+                self._spares.append(await self.spawn())
+        except OSError as e:
+            # take() spawns on demand and reports the error for the clip
+            log.warning("decoder_spare_failed", f"Could not spawn a spare ffmpeg decoder: {e}")
+
+
+# Shared by every decoder that runs the default command
+decoder_spares = FfmpegSpares()
+
+
+class FfmpegStreamDecoder:
+    """
+    Per-session ffmpeg decoder that forwards PCM while ffmpeg is still running.
+
+    Every recorded clip is a complete container (m4a), so ffmpeg needs a
+    fresh demuxer per clip. The decoder is created once per session and
+    takes each clip's process from ``spares`` (the worker-wide
+    ``decoder_spares`` pool for the default command), so a new clip usually
+    does not wait for process start-up and idle sessions hold no process.
+    PCM is handed to ``on_pcm`` in ``read_size`` pieces as soon as ffmpeg
+    writes it.
+
+    Usage per clip: ``await feed(data)`` one or more times, then
+    ``await end_stream()``, or ``abort_stream()`` to drop a clip whose
+    upload was abandoned. Call ``close()`` when the session ends.
+
+    Feeding a clip in chunks as it is uploaded only lets ffmpeg start early
+    for streamable containers (ADTS AAC, fragmented MP4, Ogg, WebM); a plain
+    m4a with its index at the end still decodes only once its last chunk is in.
+    """
+
+    def __init__(
+        self,
+        on_pcm: Callable[[bytes], Awaitable[None]],
+        read_size: int = 4096,
+        command: Optional[List[str]] = None,
+        spares: Optional[FfmpegSpares] = None,
+    ):
+        self.on_pcm = on_pcm
+        self.read_size = read_size
+        if spares is None:
+            spares = decoder_spares if command is None else FfmpegSpares(command, size=0)
+        self.spares = spares
+        self.streams_decoded = 0
+        self.bytes_decoded = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def feed(self, data: bytes):
+        """Writes encoded audio for the current clip, starting a clip if needed"""
+        if self._closed:
+            raise RuntimeError("Decoder is closed")
+        if self._process is None:
+            await self._begin_stream()
+
+        try:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg rejected the input, end_stream() reports its error
+            pass
+
+    async def end_stream(self) -> int:
+        """
+        Marks the end of the current clip and waits until all of its PCM was forwarded
+
+        Returns:
+            int: Number of PCM bytes produced for the clip
+
+        Raises:
+            RuntimeError: If ffmpeg exited with an error
+        """
+        process, reader = self._process, self._reader
+        self._process = self._reader = None
+        if process is None:
+            return 0
+
+        try:
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+        pcm_bytes, stderr_data = await reader
+        returncode = await process.wait()
+        if returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg error (code {returncode}): {stderr_data.decode(errors='replace')}"
+            )
+
+        self.streams_decoded += 1
+        self.bytes_decoded += pcm_bytes
+        return pcm_bytes
+
+    async def abort_stream(self):
+        """Kills the ffmpeg process of the current clip, its remaining PCM is discarded"""
+        process, reader = self._process, self._reader
+        self._process = self._reader = None
+        if reader is not None:
+            reader.cancel()
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    async def close(self):
+        """Kills the running ffmpeg process, called on disconnect"""
+        self._closed = True
+        await self.abort_stream()
+
+    async def _begin_stream(self):
+        process = await self.spares.take()
+        if self._closed:
+            process.kill()
+            await process.wait()
+            raise RuntimeError("Decoder is closed")
+
+        self._process = process
+        self._reader = asyncio.create_task(self._read_output(process))
+
+    async def _read_output(self, process: asyncio.subprocess.Process) -> Tuple[int, bytes]:
+        stderr_task = asyncio.create_task(process.stderr.read())
+        total = 0
+        remainder = b""
+        try:
+            while True:
+                chunk = await process.stdout.read(self.read_size)
+                if not chunk:
+                    break
+
+                # Only forward whole 16-bit samples
+                chunk = remainder + chunk
+                usable = len(chunk) - len(chunk) % 2
+                remainder = chunk[usable:]
+                if usable:
+                    total += usable
+                    await self.on_pcm(chunk[:usable])
+
+            return total, await stderr_task
+        finally:
+            if not stderr_task.done():
+                stderr_task.cancel()
@@ -0,0 +1,375 @@
+import asyncio
+import os
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .framing import CODEC_MULAW, CODEC_OPUS, CODEC_PCM16
+from .pcm import PcmResampler
+
+# Codecs a client can ask for with ?codec=, and the rates the PCM codecs can be sent at
+OUTPUT_CODECS = ("pcm", "mulaw", "opus")
+OUTPUT_SAMPLE_RATES = (24000, 16000, 8000)
+DEFAULT_OUTPUT_RATES = {"pcm": 24000, "mulaw": 8000}
+
+# Opus packets are decoded at 48 kHz whatever the input rate was
+OPUS_DECODE_RATE = 48000
+# Rate of the PCM given to ffmpeg, the model's own
+OPUS_INPUT_RATE = 24000
+OPUS_FRAME_MS = 20
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "24000"))
+# Longest wait for ffmpeg to send the last packets of a reply before it is killed
+OPUS_DRAIN_TIMEOUT_SECONDS = 2.0
+
+# G.711 mu-law
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+# Encode 16-bit mono PCM from stdin as Opus in Ogg, a page per packet so each is flushed right away
+FFMPEG_OPUS_COMMAND = [
+    "ffmpeg", "-hide_banner", "-loglevel", "error",
+    "-probesize", "32", "-analyzeduration", "0",
+    "-f", "s16le", "-ar", "{rate}", "-ac", "1", "-i", "pipe:0",
+    "-c:a", "libopus", "-b:a", "{bitrate}", "-application", "voip",
+    "-frame_duration", str(OPUS_FRAME_MS),
+    "-flush_packets", "1", "-page_duration", str(OPUS_FRAME_MS * 1000),
+    "-f", "ogg", "pipe:1",
+]
+
+SendEncoded = Callable[[bytes, int], Awaitable[None]]
+
+
+def mulaw_encode(samples: np.ndarray) -> bytes:
+    """G.711 mu-law bytes for int16 samples"""
+    x = samples.astype(np.int32)
+    sign = (x < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(x), MULAW_CLIP) + MULAW_BIAS
+    exponent = np.frexp(magnitude)[1] - 8
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def pack_opus_packets(packets: List[bytes]) -> bytes:
+    """Payload of a CODEC_OPUS frame: each packet prefixed with its uint16 big-endian length"""
+    return b"".join(struct.pack("!H", len(packet)) + packet for packet in packets)
+
+
+class OggPacketReader:
+    """
+    Splits an Ogg stream into its packets as bytes arrive.
+
+    Only the framing is read (capture pattern, lacing values), page CRCs are
+    not checked since the stream comes from a local ffmpeg pipe.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._packet = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Returns the packets completed by this piece of the stream"""
+        self._buffer += data
+        packets = []
+        while len(self._buffer) >= 27:
+            if self._buffer[:4] != b"OggS":
+                start = self._buffer.find(b"OggS", 1)
+                del self._buffer[:start if start > 0 else len(self._buffer) - 3]
+                continue
+
+            header_size = 27 + self._buffer[26]
+            if len(self._buffer) < header_size:
+                break
+            lacing = self._buffer[27:header_size]
+            if len(self._buffer) < header_size + sum(lacing):
+                break
+
+            position = header_size
+            for size in lacing:
+                self._packet += self._buffer[position:position + size]
+                position += size
+                # A lacing value below 255 ends the packet, 255 continues it
+                if size < 255:
+                    packets.append(bytes(self._packet))
+                    self._packet.clear()
+            del self._buffer[:position]
+        return packets
+
+
+class OutputEncoder:
+    """
+    Per-session encoder for the agent audio sent to one client.
+
+    ``write()`` takes 16-bit mono PCM at the model's rate and hands the
+    encoded payload to ``send(payload, sample_rate)``; ``flush()`` marks the
+    end of a reply and returns once all of it was sent, ``reset()`` drops
+    an interrupted reply still being encoded. This base class sends PCM, resampled to ``sample_rate``
+    when that is lower than the input. ``stats()`` reports the PCM bytes
+    in, the encoded bytes out and the CPU time spent encoding.
+    """
+
+    codec = "pcm"
+    frame_codec = CODEC_PCM16
+
+    def __init__(self, send: SendEncoded, sample_rate: int = 24000):
+        self.send = send
+        self.sample_rate = sample_rate
+        self.pcm_bytes = 0
+        self.encoded_bytes = 0
+        self.encode_seconds = 0.0
+        self._resamplers: Dict[int, PcmResampler] = {}
+
+    @property
+    def mime_type(self) -> str:
+        # The model's own rate keeps the plain mime type existing clients expect
+        if self.sample_rate == DEFAULT_OUTPUT_RATES["pcm"]:
+            return "audio/pcm"
+        return f"audio/pcm;rate={self.sample_rate}"
+
+    async def write(self, pcm: bytes, sample_rate: int):
+        """Encodes one frame of PCM and sends it"""
+        start = time.thread_time()
+        payload = self.encode(pcm, sample_rate)
+        self.encode_seconds += time.thread_time() - start
+        self.pcm_bytes += len(pcm)
+        if payload:
+            self.encoded_bytes += len(payload)
+            await self.send(payload, self.sample_rate)
+
+    def encode(self, pcm: bytes, sample_rate: int) -> bytes:
+        samples = self._resample(pcm, sample_rate)
+        return pcm if samples is None else samples.tobytes()
+
+    async def flush(self):
+        """Called at the end of each reply"""
+
+    async def reset(self):
+        """Called when a reply is interrupted, its audio not sent yet is dropped"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the encoder counters"""
+        return {
+            "codec": self.codec,
+            "sample_rate": self.sample_rate,
+            "pcm_bytes": self.pcm_bytes,
+            "encoded_bytes": self.encoded_bytes,
+            "bandwidth_saved": round(1 - self.encoded_bytes / self.pcm_bytes, 3) if self.pcm_bytes else 0.0,
+            "encode_ms": round(self.encode_seconds * 1000, 2),
+        }
+
+    async def close(self):
+        """Releases the encoder, called on disconnect"""
+
+    def _resample(self, pcm: bytes, sample_rate: int) -> Optional[np.ndarray]:
+        """int16 samples at the output rate, or None when the input already is"""
+        if sample_rate == self.sample_rate:
+            return None
+        resampler = self._resamplers.get(sample_rate)
+        if resampler is None:
+            resampler = self._resamplers[sample_rate] = PcmResampler(sample_rate, self.sample_rate)
+        samples = resampler.process(np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0)
+        return np.clip(samples * 32768.0, -32768, 32767).astype("<i2")
+
+
+class MulawEncoder(OutputEncoder):
+    """G.711 mu-law, one byte per sample, 64 kbps at 8 kHz"""
+
+    codec = "mulaw"
+    frame_codec = CODEC_MULAW
+
+    def __init__(self, send: SendEncoded, sample_rate: int = 8000):
+        super().__init__(send, sample_rate)
+
+    @property
+    def mime_type(self) -> str:
+        return f"audio/pcmu;rate={self.sample_rate}"
+
+    def encode(self, pcm: bytes, sample_rate: int) -> bytes:
+        samples = self._resample(pcm, sample_rate)
+        if samples is None:
+            samples = np.frombuffer(pcm, dtype="<i2")
+        return mulaw_encode(samples)
+
+
+class FfmpegOpusEncoder(OutputEncoder):
+    """
+    Opus through a streaming ffmpeg process, one per reply.
+
+    PCM is written to ffmpeg as it comes; a reader task splits ffmpeg's Ogg
+    output into Opus packets and sends every batch it reads as one payload
+    of length-prefixed packets (see pack_opus_packets). ffmpeg holds back
+    input until it has a whole demuxer packet, so a reply is ended by
+    closing its input: ``flush()`` waits until the reader has sent the last
+    packet, so no audio of a reply reaches the client after its
+    turn_complete, then starts the process for the next reply. ``reset()``
+    kills ffmpeg instead, discards the packets still coming from it and
+    starts a fresh process. ffmpeg's CPU time is read from /proc before
+    each process ends.
+    """
+
+    codec = "opus"
+    frame_codec = CODEC_OPUS
+
+    def __init__(self, send: SendEncoded, sample_rate: int = OPUS_INPUT_RATE, bitrate: int = OPUS_BITRATE):
+        super().__init__(send, sample_rate)
+        self.bitrate = bitrate
+        self.packets_sent = 0
+        self.replies_dropped = 0
+        self._written = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        # Process whose remaining output belongs to an interrupted reply
+        self._discarded: Optional[asyncio.subprocess.Process] = None
+
+    @property
+    def mime_type(self) -> str:
+        return "audio/opus"
+
+    async def start(self):
+        """Spawns ffmpeg, so the next reply does not wait for it"""
+        if self._process is None:
+            self._written = 0
+            command = [
+                arg.format(rate=self.sample_rate, bitrate=self.bitrate) for arg in FFMPEG_OPUS_COMMAND
+            ]
+            self._process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            self._reader = asyncio.create_task(self._read_packets(self._process))
+
+    async def write(self, pcm: bytes, sample_rate: int):
+        if self._process is None:
+            await self.start()
+        start = time.thread_time()
+        samples = self._resample(pcm, sample_rate)
+        data = pcm if samples is None else samples.tobytes()
+        self.encode_seconds += time.thread_time() - start
+        self.pcm_bytes += len(pcm)
+        await self._feed(data)
+
+    async def flush(self):
+        if self._process is None or not self._written:
+            return
+        process, reader = self._process, self._reader
+        self._process = self._reader = None
+        await self._end(process, reader, drain=True)
+        await self.start()
+
+    async def reset(self):
+        if self._process is None or not self._written:
+            return
+        process, reader = self._process, self._reader
+        self._process = self._reader = None
+        self._discarded = process
+        try:
+            await self._end(process, reader, drain=False)
+        finally:
+            self._discarded = None
+        self.replies_dropped += 1
+        await self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "bitrate": self.bitrate,
+            "packets_sent": self.packets_sent,
+            "replies_dropped": self.replies_dropped,
+        })
+        return stats
+
+    async def close(self):
+        process, reader = self._process, self._reader
+        self._process = self._reader = None
+        if reader is not None:
+            reader.cancel()
+        if process is not None:
+            self.encode_seconds += _process_cpu_seconds(process.pid)
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def _end(self, process: asyncio.subprocess.Process, reader: asyncio.Task, drain: bool):
+        """Stops one ffmpeg process; drain lets it encode its input and waits for its last packets"""
+        self.encode_seconds += _process_cpu_seconds(process.pid)
+        if drain:
+            process.stdin.close()
+        elif process.returncode is None:
+            process.kill()
+        try:
+            await asyncio.wait_for(reader, OPUS_DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+    async def _feed(self, data: bytes):
+        try:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+            self._written += len(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg is gone, the reader has seen its output end
+            pass
+
+    async def _read_packets(self, process: asyncio.subprocess.Process):
+        ogg = OggPacketReader()
+        while True:
+            data = await process.stdout.read(4096)
+            if not data:
+                break
+            if process is self._discarded:
+                continue
+            # The first two packets are the OpusHead and OpusTags headers
+            packets = [
+                packet for packet in ogg.feed(data)
+                if not packet.startswith((b"OpusHead", b"OpusTags"))
+            ]
+            if packets:
+                payload = pack_opus_packets(packets)
+                self.packets_sent += len(packets)
+                self.encoded_bytes += len(payload)
+                await self.send(payload, OPUS_DECODE_RATE)
+
+
+def _process_cpu_seconds(pid: int) -> float:
+    """User plus system CPU time of a child process, 0 where /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def create_output_encoder(codec: str, send: SendEncoded, sample_rate: Optional[int] = None) -> OutputEncoder:
+    """
+    Builds the encoder for a codec a client asked for
+
+    Args:
+        codec (str): One of OUTPUT_CODECS
+        send: Coroutine taking (payload, sample_rate) that sends one encoded payload
+        sample_rate (int): Output rate for pcm and mulaw, one of OUTPUT_SAMPLE_RATES
+            (default: 24 kHz for pcm, 8 kHz for mulaw); opus always encodes 24 kHz
+
+    Raises:
+        ValueError: If the codec or rate is not supported
+    """
+    if codec not in OUTPUT_CODECS:
+        raise ValueError(f"Unsupported codec: {codec}. Must be one of {OUTPUT_CODECS}")
+    if codec == "opus":
+        if sample_rate not in (None, OPUS_INPUT_RATE):
+            raise ValueError(f"Opus is always encoded at {OPUS_INPUT_RATE} Hz, got an output rate of {sample_rate}")
+        return FfmpegOpusEncoder(send)
+
+    sample_rate = sample_rate or DEFAULT_OUTPUT_RATES[codec]
+    if sample_rate not in OUTPUT_SAMPLE_RATES:
+        raise ValueError(f"Unsupported output sample rate: {sample_rate}. Must be one of {OUTPUT_SAMPLE_RATES}")
+    if codec == "mulaw":
+        return MulawEncoder(send, sample_rate)
+    return OutputEncoder(send, sample_rate)
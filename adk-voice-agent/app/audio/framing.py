@@ -0,0 +1,60 @@
+import struct
+from typing import Tuple
+
+# Binary audio frame layout (network byte order, 8 bytes):
+#   version      uint8   protocol version, currently 1
+#   codec        uint8   payload codec, see CODEC_* below
+#   sample_rate  uint16  payload sample rate in Hz
+#   sequence     uint32  per-direction frame counter, wraps at 2**32
+AUDIO_FRAME_VERSION = 1
+AUDIO_FRAME_HEADER = struct.Struct("!BBHI")
+AUDIO_FRAME_HEADER_SIZE = AUDIO_FRAME_HEADER.size
+
+# Payload codecs
+CODEC_PCM16 = 0  # 16-bit signed little-endian mono PCM
+CODEC_PCM_F32 = 1  # 32-bit float little-endian mono PCM
+CODEC_MULAW = 2  # G.711 mu-law, one byte per sample
+CODEC_OPUS = 3  # Opus packets, each prefixed with its uint16 big-endian length
+
+
+def encode_audio_frame(data: bytes, sequence: int, sample_rate: int, codec: int = CODEC_PCM16) -> bytes:
+    """
+    Prefix an audio payload with the fixed binary frame header
+
+    Args:
+        data (bytes): Encoded audio payload
+        sequence (int): Frame counter for this direction of the connection
+        sample_rate (int): Sample rate of the payload in Hz
+        codec (int): One of the CODEC_* constants (default: CODEC_PCM16)
+
+    Returns:
+        bytes: Header followed by the payload, ready for websocket.send_bytes
+    """
+    header = AUDIO_FRAME_HEADER.pack(
+        AUDIO_FRAME_VERSION, codec, sample_rate, sequence & 0xFFFFFFFF
+    )
+    return header + data
+
+
+def decode_audio_frame(frame: bytes) -> Tuple[int, int, int, memoryview]:
+    """
+    Split a binary audio frame into its header fields and payload
+
+    Args:
+        frame (bytes): Raw websocket binary message
+
+    Returns:
+        tuple: (codec, sample_rate, sequence, payload) where payload is a
+        zero-copy view into the frame
+
+    Raises:
+        ValueError: If the frame is truncated or uses an unknown version
+    """
+    if len(frame) < AUDIO_FRAME_HEADER_SIZE:
+        raise ValueError(f"Audio frame too short: {len(frame)} bytes")
+
+    version, codec, sample_rate, sequence = AUDIO_FRAME_HEADER.unpack_from(frame)
+    if version != AUDIO_FRAME_VERSION:
+        raise ValueError(f"Unsupported audio frame version: {version}")
+
+    return codec, sample_rate, sequence, memoryview(frame)[AUDIO_FRAME_HEADER_SIZE:]
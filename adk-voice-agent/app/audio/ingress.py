@@ -0,0 +1,235 @@
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.live_request_queue import LiveRequest
+from google.genai.types import Blob, Content
+
+from .pacing import AudioPacer
+
+# What happens to client audio once a connection's backlog is full
+OVERFLOW_BLOCK = "block"  # stop reading from the client until the model catches up
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # drop the oldest audio still waiting
+OVERFLOW_CLOSE = "close"  # close the connection with an error
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_CLOSE)
+
+# Client audio a connection may have queued for the live model, and the policy beyond it.
+# The pacer holds a whole decoded voice note on purpose, so it gets a larger limit of its own
+INGRESS_MAX_MS = int(os.getenv("INGRESS_MAX_MS", "4000"))
+INGRESS_PACER_MAX_MS = int(os.getenv("INGRESS_PACER_MAX_MS", "120000"))
+INGRESS_OVERFLOW = os.getenv("INGRESS_OVERFLOW", OVERFLOW_BLOCK)
+# A blocked reader gives up after this long, so a stalled model cannot hold a connection open forever
+INGRESS_BLOCK_TIMEOUT = float(os.getenv("INGRESS_BLOCK_TIMEOUT_SECONDS", "10"))
+
+# The live model takes 16 kHz 16-bit mono
+BYTES_PER_MS = 32
+
+# Budgets of the open connections, read by the backlog gauges
+_budgets: "weakref.WeakSet[IngressBudget]" = weakref.WeakSet()
+
+
+class IngressOverflow(Exception):
+    """Raised when a connection's audio backlog is full and its policy is close"""
+
+
+class BoundedLiveRequestQueue(LiveRequestQueue):
+    """
+    LiveRequestQueue that knows how much audio is waiting for the model.
+
+    ADK's queue wraps an asyncio.Queue that can only be appended to and
+    says nothing about its contents. This one keeps requests in a deque,
+    counts the audio bytes queued, lets the oldest audio be dropped and
+    signals whenever the model takes a request. Limits are applied by
+    IngressBudget; content and close requests are never dropped.
+
+    It subclasses LiveRequestQueue only because ADK's InvocationContext
+    type-checks the queue it is given, and replaces every method ADK uses.
+    Written against google-adk 0.5.0, whose runner and flows only call
+    ``send``, ``send_content``, ``send_realtime``, ``get`` and ``close``;
+    recheck this list when upgrading ADK.
+    """
+
+    def __init__(self):
+        # The base class only creates the asyncio.Queue this class replaces, so it is not called
+        self.audio_bytes = 0
+        self.peak_audio_bytes = 0
+        self._requests: deque = deque()
+        self._ready = asyncio.Event()
+        self._taken = asyncio.Event()
+
+    def close(self):
+        self.send(LiveRequest(close=True))
+
+    def send_content(self, content: Content):
+        self.send(LiveRequest(content=content))
+
+    def send_realtime(self, blob: Blob):
+        self.send(LiveRequest(blob=blob))
+
+    def send(self, req: LiveRequest):
+        if req.blob is not None:
+            self.audio_bytes += len(req.blob.data)
+            if self.audio_bytes > self.peak_audio_bytes:
+                self.peak_audio_bytes = self.audio_bytes
+        self._requests.append(req)
+        self._ready.set()
+
+    async def get(self) -> LiveRequest:
+        while not self._requests:
+            self._ready.clear()
+            await self._ready.wait()
+        req = self._requests.popleft()
+        if req.blob is not None:
+            self.audio_bytes -= len(req.blob.data)
+        self._taken.set()
+        return req
+
+    def drop_oldest_audio(self, size: int) -> int:
+        """Drops the oldest audio requests until ``size`` bytes are gone or none are left, returns the bytes dropped"""
+        dropped = 0
+        kept = []
+        while self._requests and dropped < size:
+            req = self._requests.popleft()
+            if req.blob is None:
+                kept.append(req)
+                continue
+            dropped += len(req.blob.data)
+        self._requests.extendleft(reversed(kept))
+        self.audio_bytes -= dropped
+        return dropped
+
+    async def wait_taken(self, timeout: float) -> bool:
+        """Waits until the model takes a request, False on timeout"""
+        self._taken.clear()
+        try:
+            await asyncio.wait_for(self._taken.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class IngressBudget:
+    """
+    Bounds the client audio one connection has waiting for the live model.
+
+    Two stages are bounded: the audio in the session's
+    BoundedLiveRequestQueue (``max_ms``) and the decoded voice-note PCM
+    still in the connection's pacer (``pacer_max_ms``). The websocket
+    reader calls ``admit()`` before taking each message, so a stage exceeds
+    its limit by at most one message's audio. Once one is over, by
+    ``policy``:
+
+    - block: the reader stops reading until the model has taken enough
+      audio, which pushes back on the client through the socket; if the
+      model takes nothing for ``block_timeout`` seconds it gives up with
+      IngressOverflow;
+    - drop_oldest: the oldest audio of the full stage is dropped;
+    - close: IngressOverflow is raised and the connection closed.
+
+    ``stats()`` reports the peak backlog, overflows and audio dropped.
+    """
+
+    def __init__(
+        self,
+        queue: BoundedLiveRequestQueue,
+        pacer: Optional[AudioPacer] = None,
+        max_ms: int = INGRESS_MAX_MS,
+        pacer_max_ms: int = INGRESS_PACER_MAX_MS,
+        policy: str = INGRESS_OVERFLOW,
+        block_timeout: float = INGRESS_BLOCK_TIMEOUT,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {policy}. Must be one of {OVERFLOW_POLICIES}")
+        if max_ms <= 0 or pacer_max_ms <= 0:
+            raise ValueError("max_ms and pacer_max_ms must be positive")
+
+        self.queue = queue
+        self.pacer = pacer
+        self.max_bytes = max_ms * BYTES_PER_MS
+        self.pacer_max_bytes = pacer_max_ms * BYTES_PER_MS
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.overflows = 0
+        self.dropped_bytes = 0
+        self.blocked_seconds = 0.0
+        self.peak_backlog_bytes = 0
+        _budgets.add(self)
+
+    @property
+    def backlog_bytes(self) -> int:
+        """Audio waiting in both stages"""
+        if self.pacer is None:
+            return self.queue.audio_bytes
+        return self.queue.audio_bytes + self.pacer.pending_bytes
+
+    @property
+    def dropped_seconds(self) -> float:
+        return self.dropped_bytes / BYTES_PER_MS / 1000
+
+    def _excess(self) -> Tuple[int, int]:
+        """Bytes over the limit in the model queue and in the pacer"""
+        pacer_bytes = self.pacer.pending_bytes if self.pacer is not None else 0
+        return self.queue.audio_bytes - self.max_bytes, pacer_bytes - self.pacer_max_bytes
+
+    async def admit(self):
+        """
+        Returns once the connection may take another message
+
+        Raises:
+            IngressOverflow: Under the close policy when a stage is full, or
+                under block when the model stopped taking audio
+        """
+        backlog = self.backlog_bytes
+        if backlog > self.peak_backlog_bytes:
+            self.peak_backlog_bytes = backlog
+        queue_excess, pacer_excess = self._excess()
+        if queue_excess <= 0 and pacer_excess <= 0:
+            return
+
+        self.overflows += 1
+        if self.policy == OVERFLOW_CLOSE:
+            raise IngressOverflow(f"{backlog // BYTES_PER_MS} ms of audio waiting for the model")
+
+        if self.policy == OVERFLOW_DROP_OLDEST:
+            if queue_excess > 0:
+                self.dropped_bytes += self.queue.drop_oldest_audio(queue_excess)
+            if pacer_excess > 0:
+                self.dropped_bytes += self.pacer.drop_oldest(pacer_excess)
+            return
+
+        start = time.monotonic()
+        try:
+            while max(self._excess()) > 0:
+                if not await self.queue.wait_taken(self.block_timeout):
+                    raise IngressOverflow(f"The model took no audio for {self.block_timeout:g} s")
+        finally:
+            self.blocked_seconds += time.monotonic() - start
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the budget counters"""
+        return {
+            "overflow_policy": self.policy,
+            "peak_backlog_ms": self.peak_backlog_bytes // BYTES_PER_MS,
+            "overflows": self.overflows,
+            "dropped_ms": self.dropped_bytes // BYTES_PER_MS,
+            "blocked_ms": round(self.blocked_seconds * 1000, 1),
+        }
+
+    def close(self):
+        """Stops counting the connection in the backlog gauges"""
+        _budgets.discard(self)
+
+
+def ingress_backlog_seconds() -> Dict[tuple, float]:
+    """Audio waiting for the model across open connections, by stage"""
+    queues = {id(budget.queue): budget.queue for budget in _budgets}
+    pacer_bytes = sum(budget.pacer.pending_bytes for budget in _budgets if budget.pacer is not None)
+    return {
+        ("model_queue",): sum(queue.audio_bytes for queue in queues.values()) / BYTES_PER_MS / 1000,
+        ("pacer",): pacer_bytes / BYTES_PER_MS / 1000,
+    }
@@ -0,0 +1,191 @@
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from app.logs import get_logger
+
+log = get_logger("audio")
+
+# Pacing modes
+PACED = "paced"  # release audio at real-time speed
+BURST = "burst"  # release audio as fast as the agent queue accepts it
+PACING_MODES = (PACED, BURST)
+
+
+class AudioPacer:
+    """
+    Per-session scheduler that streams decoded PCM to the agent on its own task.
+
+    Producers call ``feed()`` and return immediately, so the websocket reader
+    is never held up by pacing. The scheduler cuts the buffered audio into
+    chunks of ``chunk_ms`` and hands them to ``send``:
+
+    - paced: each chunk is released when its start time is due on a
+      real-time clock (optionally ``lead_ms`` ahead). The clock restarts
+      whenever the buffer runs dry.
+    - burst: chunks are released back to back, yielding to the event loop
+      between chunks.
+
+    Drift is how late each paced chunk went out compared to its deadline,
+    whether it had to wait or was already late; the maximum and mean are
+    reported by ``stats()``.
+
+    If ``send`` raises (the model queue was closed, an ingress limit
+    closed the connection) the error is logged, unsent audio is dropped
+    and the scheduler stops; ``error`` holds the exception and later
+    ``feed()`` calls raise, so the producer sees the failure.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[bytes], None],
+        sample_rate: int = 16000,
+        sample_width: int = 2,
+        chunk_ms: int = 50,
+        mode: str = PACED,
+        lead_ms: int = 0,
+    ):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Invalid pacing mode: {mode}. Must be one of {PACING_MODES}")
+        if chunk_ms <= 0:
+            raise ValueError("chunk_ms must be positive")
+
+        self.send = send
+        self.mode = mode
+        self.chunk_ms = chunk_ms
+        self.bytes_per_second = sample_rate * sample_width
+        self.chunk_bytes = max(1, sample_rate * chunk_ms // 1000) * sample_width
+        self.lead = lead_ms / 1000
+
+        self.chunks_sent = 0
+        self.bytes_sent = 0
+        self.max_drift_ms = 0.0
+        self._drift_total_ms = 0.0
+        self._drift_samples = 0
+
+        self.error: Optional[Exception] = None
+
+        self._buffer = bytearray()
+        self._flush = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the scheduler task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def feed(self, pcm: bytes):
+        """
+        Queues PCM for sending, returns without waiting for it to go out
+
+        Raises:
+            RuntimeError: If the scheduler stopped because ``send`` failed
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Audio pacer stopped: {self.error}") from self.error
+        self._buffer += pcm
+        self._wakeup.set()
+
+    def flush(self):
+        """Marks the end of a stream so a trailing partial chunk is sent too"""
+        self._flush = True
+        self._wakeup.set()
+
+    def clear(self):
+        """Drops all audio that has not been sent yet"""
+        self._buffer.clear()
+        self._flush = False
+
+    def drop_oldest(self, size: int) -> int:
+        """Drops up to ``size`` bytes of the oldest unsent audio, in whole samples; returns the bytes dropped"""
+        size = min(size + size % 2, len(self._buffer))
+        del self._buffer[:size]
+        return size
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes of audio waiting to be sent"""
+        return len(self._buffer)
+
+    @property
+    def pending_ms(self) -> float:
+        """Milliseconds of audio waiting to be sent"""
+        return len(self._buffer) * 1000 / self.bytes_per_second
+
+    @property
+    def mean_drift_ms(self) -> float:
+        """Average lateness of paced chunks"""
+        return self._drift_total_ms / self._drift_samples if self._drift_samples else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the scheduler counters"""
+        return {
+            "mode": self.mode,
+            "chunk_ms": self.chunk_ms,
+            "chunks_sent": self.chunks_sent,
+            "bytes_sent": self.bytes_sent,
+            "pending_ms": round(self.pending_ms, 1),
+            "max_drift_ms": round(self.max_drift_ms, 3),
+            "mean_drift_ms": round(self.mean_drift_ms, 3),
+        }
+
+    async def close(self):
+        """Stops the scheduler, unsent audio is discarded"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        clock_start = None
+        clock_bytes = 0
+
+        while True:
+            ready = len(self._buffer) >= self.chunk_bytes or (self._flush and self._buffer)
+            if not ready:
+                if not self._buffer:
+                    # Idle, the next audio starts a new real-time clock
+                    self._flush = False
+                    clock_start = None
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            chunk = bytes(self._buffer[:self.chunk_bytes])
+            del self._buffer[:self.chunk_bytes]
+
+            if self.mode == PACED:
+                now = loop.time()
+                if clock_start is None:
+                    clock_start = now
+                    clock_bytes = 0
+
+                deadline = clock_start + clock_bytes / self.bytes_per_second - self.lead
+                if deadline > now:
+                    await asyncio.sleep(deadline - now)
+                # Every chunk counts, above all the ones already behind schedule; none is due before the clock started
+                self._record_drift((loop.time() - max(deadline, clock_start)) * 1000)
+                clock_bytes += len(chunk)
+
+            try:
+                self.send(chunk)
+            except Exception as e:
+                log.error("pacing_send_failed", f"Audio pacer stopped: {e}", exc_info=True)
+                self.error = e
+                self.clear()
+                return
+            self.chunks_sent += 1
+            self.bytes_sent += len(chunk)
+
+            if self.mode == BURST:
+                await asyncio.sleep(0)
+
+    def _record_drift(self, drift_ms: float):
+        self.max_drift_ms = max(self.max_drift_ms, drift_ms)
+        self._drift_total_ms += drift_ms
+        self._drift_samples += 1
@@ -0,0 +1,152 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Format the live model expects for realtime audio input
+TARGET_SAMPLE_RATE = 16000
+
+SUPPORTED_SAMPLE_RATES = (16000, 24000, 44100, 48000)
+SAMPLE_FORMATS = {
+    "int16": np.dtype("<i2"),
+    "float32": np.dtype("<f4"),
+}
+
+
+def parse_pcm_mime_type(mime_type: str) -> Tuple[int, str, int]:
+    """
+    Read rate, format and channels parameters from an audio/pcm mime type
+
+    Example: "audio/pcm;rate=48000;format=float32;channels=2". Missing
+    parameters default to 16 kHz mono int16, which is what the browser
+    recorder sends.
+
+    Returns:
+        tuple: (sample_rate, sample_format, channels)
+    """
+    params = {}
+    for param in mime_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        params[key.lower()] = value.strip().lower()
+
+    sample_rate = int(params.get("rate", TARGET_SAMPLE_RATE))
+    sample_format = params.get("format", "int16")
+    channels = int(params.get("channels", 1))
+    return sample_rate, sample_format, channels
+
+
+class PcmResampler:
+    """
+    Stateful resampler from one mono stream rate to another.
+
+    Integer ratios (48 kHz -> 16 kHz) average blocks of input samples, which
+    doubles as a simple anti-aliasing filter. Other ratios (44.1 kHz,
+    24 kHz) use linear interpolation. Leftover samples and the fractional
+    read position carry over between calls so chunk boundaries stay seamless.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        self.block = source_rate // target_rate if source_rate % target_rate == 0 else 0
+        self._pending = np.empty(0, dtype=np.float32)
+        self._position = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resamples a float32 mono buffer, returns float32 at the target rate"""
+        if self.source_rate == self.target_rate:
+            return samples
+
+        if self._pending.size:
+            samples = np.concatenate((self._pending, samples))
+
+        if self.block:
+            usable = samples.size - samples.size % self.block
+            self._pending = samples[usable:]
+            return samples[:usable].reshape(-1, self.block).mean(axis=1, dtype=np.float32)
+
+        # Linear interpolation, output positions are in input sample units
+        last = samples.size - 1
+        if last < self._position:
+            self._pending = samples
+            return np.empty(0, dtype=np.float32)
+
+        count = int((last - self._position) // self.step) + 1
+        positions = self._position + self.step * np.arange(count)
+        resampled = np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+        next_position = self._position + self.step * count
+        keep_from = min(int(next_position), samples.size)
+        self._pending = samples[keep_from:]
+        self._position = next_position - keep_from
+        return resampled
+
+
+class PcmIngestor:
+    """
+    Converts client PCM of any supported rate/format/layout to 16 kHz mono int16.
+
+    One instance per session; it keeps a resampler per source rate so
+    buffers of a continuous stream are resampled without seams.
+    """
+
+    def __init__(self, target_rate: int = TARGET_SAMPLE_RATE):
+        self.target_rate = target_rate
+        self.samples_in = 0
+        self.samples_out = 0
+        self._resamplers: Dict[int, PcmResampler] = {}
+
+    def convert(self, data: bytes, sample_rate: int = TARGET_SAMPLE_RATE, sample_format: str = "int16", channels: int = 1) -> bytes:
+        """
+        Convert one buffer of client PCM
+
+        Args:
+            data (bytes): Raw interleaved PCM
+            sample_rate (int): One of SUPPORTED_SAMPLE_RATES
+            sample_format (str): "int16" or "float32"
+            channels (int): Number of interleaved channels
+
+        Returns:
+            bytes: 16-bit little-endian mono PCM at the target rate
+
+        Raises:
+            ValueError: If the rate, format or layout is not supported
+        """
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {sample_format}")
+        if channels < 1:
+            raise ValueError(f"Invalid channel count: {channels}")
+
+        dtype = SAMPLE_FORMATS[sample_format]
+        frame_size = dtype.itemsize * channels
+        if len(data) % frame_size:
+            raise ValueError(f"PCM buffer of {len(data)} bytes is not a whole number of frames")
+
+        # Fast path: the client already sends what the model wants
+        if sample_format == "int16" and channels == 1 and sample_rate == self.target_rate:
+            samples = len(data) // 2
+            self.samples_in += samples
+            self.samples_out += samples
+            return bytes(data)
+
+        samples = np.frombuffer(data, dtype=dtype)
+        if sample_format == "int16":
+            samples = samples.astype(np.float32) / 32768.0
+        else:
+            samples = samples.astype(np.float32, copy=False)
+
+        # Downmix interleaved channels to mono
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+        self.samples_in += samples.size
+
+        resampler = self._resamplers.get(sample_rate)
+        if resampler is None:
+            resampler = self._resamplers[sample_rate] = PcmResampler(sample_rate, self.target_rate)
+        samples = resampler.process(samples)
+
+        pcm16 = np.clip(samples * 32768.0, -32768, 32767).astype("<i2")
+        self.samples_out += pcm16.size
+        return pcm16.tobytes()
@@ -0,0 +1,75 @@
+from typing import Any, Dict, Optional
+
+
+class ChunkedUpload:
+    """
+    Sequence state of the voice note a client is uploading in chunks.
+
+    A clip arrives as messages ``{"upload_id": ..., "seq": n, "end": bool,
+    "data": <base64>}`` with ``seq`` counting up from 0; ``end`` marks its
+    last chunk. ``seq`` 0 starts a clip, replacing one that was never
+    finished. Any other chunk must continue the current clip in order,
+    ``check()`` raises ValueError otherwise. One upload runs at a time per
+    connection since the session has a single decoder.
+    """
+
+    def __init__(self):
+        self.upload_id: Optional[str] = None
+        self.next_seq = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.uploads_completed = 0
+        self.uploads_abandoned = 0
+        self.chunks_rejected = 0
+
+    @property
+    def active(self) -> bool:
+        return self.upload_id is not None
+
+    def start(self, upload_id: str):
+        """Begins a clip with its chunk 0; a clip still in progress counts as abandoned"""
+        if self.active:
+            self.uploads_abandoned += 1
+        self.upload_id = str(upload_id)
+        self.next_seq = 0
+        self.chunks = 0
+        self.bytes = 0
+
+    def check(self, upload_id: str, seq: int):
+        """
+        Accepts the next chunk of the current clip
+
+        Raises:
+            ValueError: If no clip was started or the chunk is out of order
+        """
+        if not self.active or str(upload_id) != self.upload_id:
+            self.chunks_rejected += 1
+            raise ValueError(f"Chunk {seq} of upload {upload_id} arrived without its first chunk")
+        if seq != self.next_seq:
+            self.chunks_rejected += 1
+            raise ValueError(f"Chunk {seq} of upload {upload_id} arrived, expected {self.next_seq}")
+
+    def received(self, size: int):
+        """Counts a chunk that went to the decoder"""
+        self.next_seq += 1
+        self.chunks += 1
+        self.bytes += size
+
+    def finish(self):
+        """Ends the current clip after its last chunk was decoded"""
+        self.uploads_completed += 1
+        self.upload_id = None
+
+    def abandon(self):
+        """Drops the current clip, e.g. after a chunk was rejected"""
+        if self.active:
+            self.uploads_abandoned += 1
+        self.upload_id = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the upload counters"""
+        return {
+            "uploads_completed": self.uploads_completed,
+            "uploads_abandoned": self.uploads_abandoned,
+            "chunks_rejected": self.chunks_rejected,
+        }
@@ -0,0 +1,189 @@
+import os
+from collections import deque
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# VAD modes: off sends everything, drop sends speech only, compress also keeps short pauses
+VAD_OFF = "off"
+VAD_DROP = "drop"
+VAD_COMPRESS = "compress"
+VAD_MODES = (VAD_OFF, VAD_DROP, VAD_COMPRESS)
+
+# A frame is speech when it is VAD_MARGIN_DB above the noise floor, louder than
+# VAD_MIN_DB (dBFS) and has most of its energy in the voice band
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-50"))
+VOICE_BAND_HZ = (150, 4000)
+VOICE_BAND_SHARE = 0.6
+
+# Silence sent at once when speech ends, so the model's own end-of-speech
+# detection does not have to wait for that much silence in real time
+VAD_END_PADDING_MS = int(os.getenv("VAD_END_PADDING_MS", "800"))
+
+
+class VoiceActivityGate:
+    """
+    Per-session gate that trims silence from the audio sent to the live model.
+
+    PCM (16-bit mono) is cut into ``frame_ms`` frames; each batch of frames
+    is classified at once with NumPy, by its energy against an adaptive
+    noise floor and the share of its spectrum in the voice band, which keeps
+    hum and hiss from counting as speech. A partial frame waits for the next
+    call. Then per frame:
+
+    - speech starts after ``start_ms`` of consecutive speech frames, so a
+      single loud click does not open the gate;
+    - silence before speech is dropped, except the last ``pre_roll_ms``
+      which is sent ahead of the first speech frame so onsets are not cut;
+    - the first ``hangover_ms`` of silence after speech is always sent;
+    - drop: the rest of a pause is dropped; compress: pauses are shortened
+      to ``max_pause_ms``;
+    - after ``end_silence_ms`` of silence the utterance has ended:
+      ``end_padding_ms`` of digital silence is sent right away and
+      ``process()`` reports the end of speech.
+
+    ``stats()`` reports the audio seen, sent and trimmed; the padding is
+    counted separately.
+    """
+
+    def __init__(
+        self,
+        mode: str = VAD_COMPRESS,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        start_ms: int = 60,
+        pre_roll_ms: int = 200,
+        hangover_ms: int = 200,
+        max_pause_ms: int = 300,
+        end_silence_ms: int = 500,
+        end_padding_ms: int = VAD_END_PADDING_MS,
+        margin_db: float = VAD_MARGIN_DB,
+        min_db: float = VAD_MIN_DB,
+    ):
+        if mode not in (VAD_DROP, VAD_COMPRESS):
+            raise ValueError(f"Invalid VAD mode: {mode}. Must be one of {(VAD_DROP, VAD_COMPRESS)}")
+        if end_silence_ms < hangover_ms or end_silence_ms <= 0:
+            raise ValueError("end_silence_ms must be positive and at least hangover_ms")
+        if pre_roll_ms < start_ms:
+            raise ValueError("pre_roll_ms must be at least start_ms")
+
+        self.mode = mode
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = hangover_ms // frame_ms
+        self.pause_frames = max(max_pause_ms, hangover_ms) // frame_ms if mode == VAD_COMPRESS else self.hangover_frames
+        self.end_frames = end_silence_ms // frame_ms
+        self.end_padding = bytes(sample_rate * end_padding_ms // 1000 * 2)
+        self.margin_db = margin_db
+        self.min_db = min_db
+
+        freqs = np.fft.rfftfreq(self.frame_samples, 1 / sample_rate)
+        self._band = (freqs >= VOICE_BAND_HZ[0]) & (freqs <= VOICE_BAND_HZ[1])
+        self._window = np.hanning(self.frame_samples).astype(np.float32)
+
+        self.frames_in = 0
+        self.speech_frames = 0
+        self.frames_sent = 0
+        self.speech_ends = 0
+        self.padding_ms = 0
+        self._noise_db = None
+        self._in_speech = False
+        self._speech_run = 0
+        self._silent_frames = 0
+        self._pending = b""
+        self._pre_roll = deque(maxlen=pre_roll_ms // frame_ms)
+
+    def process(self, pcm: bytes) -> Tuple[bytes, bool]:
+        """
+        Gates one buffer of PCM
+
+        Returns:
+            tuple: (PCM to send, possibly empty; True if speech ended in this buffer)
+        """
+        frame_bytes = self.frame_samples * 2
+        data = self._pending + pcm if self._pending else pcm
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return b"", False
+
+        frames = np.frombuffer(data, dtype="<i2", count=usable // 2).reshape(-1, self.frame_samples)
+        levels, voiced = self._classify(frames)
+
+        out = []
+        ended = False
+        padded = 0
+        for i in range(len(frames)):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+            speech = self._is_speech(levels[i], voiced[i])
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._in_speech:
+                if speech:
+                    self.speech_frames += 1
+                    self._silent_frames = 0
+                    out.append(frame)
+                    continue
+                self._silent_frames += 1
+                if self._silent_frames <= self.pause_frames:
+                    out.append(frame)
+                if self._silent_frames >= self.end_frames:
+                    self._in_speech = False
+                    self.speech_ends += 1
+                    ended = True
+                    out.append(self.end_padding)
+                    padded += len(self.end_padding)
+                continue
+
+            self._pre_roll.append(frame)
+            if self._speech_run >= self.start_frames:
+                self.speech_frames += self._speech_run
+                self._in_speech = True
+                self._silent_frames = 0
+                out.extend(self._pre_roll)
+                self._pre_roll.clear()
+
+        sent = b"".join(out)
+        self.frames_in += len(frames)
+        self.frames_sent += (len(sent) - padded) // frame_bytes
+        self.padding_ms += padded * self.frame_ms // frame_bytes
+        return sent, ended
+
+    @property
+    def trimmed_ms(self) -> int:
+        """Milliseconds of client audio not sent"""
+        return (self.frames_in - self.frames_sent) * self.frame_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the gate counters"""
+        return {
+            "vad_mode": self.mode,
+            "audio_in_ms": self.frames_in * self.frame_ms,
+            "speech_ms": self.speech_frames * self.frame_ms,
+            "audio_sent_ms": self.frames_sent * self.frame_ms,
+            "trimmed_ms": self.trimmed_ms,
+            "trimmed_share": round(self.trimmed_ms / (self.frames_in * self.frame_ms), 3) if self.frames_in else 0.0,
+            "speech_ends": self.speech_ends,
+            "padding_ms": self.padding_ms,
+        }
+
+    def _classify(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Level in dBFS and whether the spectrum is voice-like, for each frame"""
+        samples = frames.astype(np.float32) / 32768.0
+        levels = 10 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(samples * self._window, axis=1)) ** 2
+        voiced = power[:, self._band].sum(axis=1) > VOICE_BAND_SHARE * (power.sum(axis=1) + 1e-12)
+        return levels, voiced
+
+    def _is_speech(self, level: float, voiced: bool) -> bool:
+        if self._noise_db is None:
+            # Sessions start in silence; a loud first frame still leaves a sane floor
+            self._noise_db = min(level, self.min_db - self.margin_db)
+        speech = voiced and level > self.min_db and level > self._noise_db + self.margin_db
+        # The floor follows quieter frames at once and louder ones slowly, much more slowly during speech
+        if level < self._noise_db:
+            self._noise_db = level
+        else:
+            self._noise_db += (level - self._noise_db) * (0.002 if speech else 0.05)
+        return speech
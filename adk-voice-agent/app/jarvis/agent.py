@@ -2,6 +2,7 @@ from google.adk.agents import Agent
 from google.adk.tools.agent_tool import AgentTool
 from .sub_agents.news_analyst.agent import news_analyst
 from .sub_agents.mandi_analyst.agent import mandi_analyst
+from .tools import get_current_weather, get_weather_forecast
 from datetime import datetime
 
 # Get current time without external dependencies
@@ -59,6 +60,8 @@ root_agent = Agent(
         - news_analyst: A tool that can search the web for the latest news and information about farming.
         IMPORTANT : whenevr ask for price of any crop, use mandi_analyst tool.
         - mandi_analyst: A tool that can get the latest prices of crops in the mandi. ("What is current mandi price for wheat in Bangalore Karnataka?")
+        - get_current_weather: Current weather conditions for a latitude/longitude.
+        - get_weather_forecast: Daily weather forecast (1-10 days) for a latitude/longitude.
 
         ## Response Format (250 words max)
         - Brief, friendly greeting (10-15 words)
@@ -84,5 +87,10 @@ root_agent = Agent(
         
         Today's date is {current_time}.
     """,
-    tools=[AgentTool(news_analyst), AgentTool(mandi_analyst)],
+    tools=[
+        AgentTool(news_analyst),
+        AgentTool(mandi_analyst),
+        get_current_weather,
+        get_weather_forecast,
+    ],
 ) 
\ No newline at end of file
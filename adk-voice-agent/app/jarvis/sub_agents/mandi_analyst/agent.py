@@ -1,8 +1,12 @@
 from google.adk.agents import Agent
-import requests
+import asyncio
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from .analytics import analyze_arrays_batch, analyze_series
+from .archive import price_archive
+from .districts import district_directory
+from .price_store import price_store
+from .resolver import NameIndex
 
 # Commodity mapping for wheat, rice, banana, dal
 COMMODITY_MAPPING = {
@@ -10,9 +14,9 @@ COMMODITY_MAPPING = {
     "rice": {"commodity_id": 3, "commodity_name": "Rice"},
     "banana": {"commodity_id": 19, "commodity_name": "Banana"},
     "dal": {"commodity_id": 6, "commodity_name": "Bengal Gram (Gram)(Whole)"},
-    "arhar dal": {"commodity_id": 49, "commodity_name": "Arhar (Tur/Red Gram)(Whole)"},
-    "moong dal": {"commodity_id": 9, "commodity_name": "Green Gram (Moong)(Whole)"},
-    "urad dal": {"commodity_id": 8, "commodity_name": "Black Gram (Urad Beans)(Whole)"},
+    "arhar": {"commodity_id": 49, "commodity_name": "Arhar (Tur/Red Gram)(Whole)"},
+    "moong": {"commodity_id": 9, "commodity_name": "Green Gram (Moong)(Whole)"},
+    "urad": {"commodity_id": 8, "commodity_name": "Black Gram (Urad Beans)(Whole)"},
     "masur dal": {"commodity_id": 259, "commodity_name": "Masur Dal"},
     "tur dal": {"commodity_id": 260, "commodity_name": "Arhar Dal (Tur Dal)"},
     "chana dal": {"commodity_id": 263, "commodity_name": "Bengal Gram Dal (Chana Dal)"},
@@ -20,6 +24,25 @@ COMMODITY_MAPPING = {
     "moong dal": {"commodity_id": 265, "commodity_name": "Green Gram Dal (Moong Dal)"}
 }
 
+# Other names for each commodity: English, romanized Hindi and regional, Devanagari
+COMMODITY_ALIASES = {
+    "wheat": ["gehun", "gehu", "gahu", "godhi", "godhumai", "kothumai", "गेहूं", "गेहूँ", "गेहु", "गहू"],
+    "rice": ["chawal", "chaval", "akki", "arisi", "biyyam", "tandul", "चावल", "तांदूळ"],
+    "banana": ["kela", "kele", "bale hannu", "vazhaipazham", "arati pandu", "केला", "केले", "केळी"],
+    "dal": ["chana", "chickpea", "chickpeas", "gram", "bengal gram", "kala chana", "harbhara", "kadale", "चना", "चने", "हरभरा"],
+    "arhar": ["tur", "toor", "tuvar", "tuar", "pigeon pea", "red gram", "togari", "अरहर", "तूर", "तुअर"],
+    "moong": ["mung", "green gram", "hesaru", "मूंग", "हरी मूंग"],
+    "urad": ["urd", "black gram", "uddu", "उड़द", "उरद"],
+    "masur dal": ["masoor dal", "masur", "masoor", "red lentil", "lentil", "lentils", "मसूर", "मसूर दाल"],
+    "tur dal": ["arhar dal", "toor dal", "tuvar dal", "togari bele", "अरहर दाल", "तूर दाल", "तुअर दाल"],
+    "chana dal": ["bengal gram dal", "kadale bele", "चना दाल"],
+    "urad dal": ["urd dal", "black gram dal", "uddina bele", "उड़द दाल", "उरद दाल"],
+    "moong dal": ["mung dal", "green gram dal", "hesaru bele", "मूंग दाल"],
+}
+
+# Longest period analyze_price_history looks back over
+MAX_HISTORY_DAYS = 3 * 365
+
 # State mapping
 STATE_MAPPING = {
     "karnataka": {"state_id": 29, "state_name": "Karnataka"},
@@ -53,95 +76,191 @@ STATE_MAPPING = {
     "sikkim": {"state_id": 11, "state_name": "Sikkim"}
 }
 
+# Other names for each state: Hindi in Devanagari, old names, misspellings, abbreviations
+STATE_ALIASES = {
+    "karnataka": ["karnatak", "karnatka", "कर्नाटक"],
+    "maharashtra": ["maharastra", "maharashtr", "महाराष्ट्र", "mh"],
+    "tamil nadu": ["tamilnadu", "tamil naadu", "तमिलनाडु", "तमिल नाडु", "tn"],
+    "andhra pradesh": ["andhra", "आंध्र प्रदेश", "आंध्र", "ap"],
+    "telangana": ["telengana", "telanagana", "तेलंगाना", "ts", "tg"],
+    "kerala": ["kerela", "keralam", "केरल", "केरला", "kl"],
+    "goa": ["गोवा", "ga"],
+    "punjab": ["panjab", "पंजाब", "pb"],
+    "haryana": ["hariyana", "हरियाणा", "hr"],
+    "delhi": ["dilli", "new delhi", "nct of delhi", "दिल्ली", "नई दिल्ली", "dl"],
+    "uttar pradesh": ["uttarpradesh", "उत्तर प्रदेश", "यूपी", "up"],
+    "bihar": ["बिहार", "br"],
+    "west bengal": ["bengal", "paschim banga", "पश्चिम बंगाल", "बंगाल", "wb"],
+    "odisha": ["orissa", "odisa", "ओडिशा", "उड़ीसा", "ओड़िशा", "od"],
+    "chhattisgarh": ["chattisgarh", "chhatisgarh", "छत्तीसगढ़", "cg"],
+    "madhya pradesh": ["madhyapradesh", "मध्य प्रदेश", "एमपी", "mp"],
+    "gujarat": ["gujrat", "गुजरात", "gj"],
+    "rajasthan": ["rajastan", "राजस्थान", "rj"],
+    "himachal pradesh": ["himachal", "हिमाचल प्रदेश", "हिमाचल", "hp"],
+    "uttarakhand": ["uttaranchal", "उत्तराखंड", "उत्तराखण्ड"],
+    "jharkhand": ["jarkhand", "झारखंड", "झारखण्ड", "jh"],
+    "assam": ["asom", "असम"],
+    "manipur": ["मणिपुर", "mn"],
+    "meghalaya": ["मेघालय", "ml"],
+    "nagaland": ["नागालैंड", "nl"],
+    "tripura": ["त्रिपुरा", "tr"],
+    "mizoram": ["मिजोरम", "mz"],
+    "arunachal pradesh": ["arunachal", "अरुणाचल प्रदेश", "अरुणाचल", "ar"],
+    "sikkim": ["सिक्किम", "sk"],
+}
+
+# Precomputed resolvers for the spoken names above
+commodity_index = NameIndex(COMMODITY_MAPPING, COMMODITY_ALIASES)
+state_index = NameIndex(STATE_MAPPING, STATE_ALIASES)
+
 def get_commodity_id(commodity_name: str) -> Optional[Dict[str, Any]]:
     """
     Get commodity ID and name from commodity name
+
+    Accepts English, Hindi or regional names in Latin or Devanagari script
+    (e.g. "wheat", "gehun", "गेहूं").
     """
-    commodity_lower = commodity_name.lower().strip()
-    
-    # Direct match
-    if commodity_lower in COMMODITY_MAPPING:
-        return COMMODITY_MAPPING[commodity_lower]
-    
-    # Partial match
-    for key, value in COMMODITY_MAPPING.items():
-        if commodity_lower in key or key in commodity_lower:
-            return value
-    
-    return None
+    return commodity_index.resolve(commodity_name)
 
 def get_state_id(state_name: str) -> Optional[Dict[str, Any]]:
     """
     Get state ID and name from state name
+
+    Accepts English or Hindi names, common misspellings and abbreviations
+    (e.g. "karnataka", "कर्नाटक", "UP").
     """
-    state_lower = state_name.lower().strip()
-    
-    # Direct match
-    if state_lower in STATE_MAPPING:
-        return STATE_MAPPING[state_lower]
-    
-    # Partial match
-    for key, value in STATE_MAPPING.items():
-        if state_lower in key or key in state_lower:
-            return value
-    
-    return None
-
-def get_district_id(state_id: int, district_name: str) -> Optional[int]:
+    return state_index.resolve(state_name)
+
+def suggest_names(index: NameIndex, name: str) -> List[str]:
+    """Display names of the closest entries, for a "did you mean" reply"""
+    names = []
+    for candidate in index.candidates(name, limit=3):
+        entry = index.mapping[candidate["key"]]
+        names.append(entry.get("commodity_name") or entry.get("state_name"))
+    return names
+
+async def get_district_id(state_id: int, district_name: str) -> Optional[int]:
     """
     Get district ID from state ID and district name
     """
-    try:
-        url = f"https://agmarknet.ceda.ashoka.edu.in/api/districts?state_id={state_id}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        districts = data.get("data", [])
-        
-        district_lower = district_name.lower().strip()
-        
-        for district in districts:
-            if district_lower in district["census_district_name"].lower() or district["census_district_name"].lower() in district_lower:
-                return district["census_district_id"]
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error fetching district data: {e}")
-        return None
+    await district_directory.ensure_state(state_id)
+    district = district_directory.lookup(state_id, district_name)
+    return district["census_district_id"] if district else None
 
-def get_mandi_prices(commodity_id: int, state_id: int, district_id: int) -> Dict[str, Any]:
+async def get_mandi_prices(commodity_id: int, state_id: int, district_id: int) -> Dict[str, Any]:
     """
     Get mandi prices for a commodity in a specific state/district
     """
-    try:
-        # Calculate dates
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)  # 1 month ago
-        
-        payload = {
-            "calculation_type": "d",
-            "commodity_id": commodity_id,
-            "district_id": district_id,
-            "end_date": end_date.isoformat() + "Z",
-            "start_date": start_date.isoformat() + "Z",
-            "state_id": state_id
+    # Served from the local price store, only missing or stale days are fetched
+    return await price_store.get_prices(commodity_id, state_id, district_id, days=30)
+
+async def analyze_price_trends(commodity_id: int, state_id: int, district_id: int) -> str:
+    """
+    Analyze price trends for a commodity in a specific state/district
+    """
+    price_data = await price_store.get_prices(commodity_id, state_id, district_id, days=30)
+    return analyze_price_records(price_data)
+
+async def analyze_price_history(commodity_id: int, state_id: int, district_id: int, days: int) -> str:
+    """
+    Analyze long-range price trends for a commodity in a specific state/district
+
+    Args:
+        commodity_id (int): Commodity ID from get_commodity_id
+        state_id (int): State ID from get_state_id
+        district_id (int): District ID from get_district_id, 0 for the whole state
+        days (int): How far back to look, e.g. 90 for a season or 365 for a year
+
+    Returns:
+        str: Price analysis over the period, read from the local price archive
+    """
+    days = max(1, min(int(days), MAX_HISTORY_DAYS))
+    key = (commodity_id, state_id, district_id)
+    stats = analyze_arrays_batch(price_archive.window([key], days)).get(key, {"count": 0})
+    if stats["count"] < days // 2:
+        # Fill the archive for the whole period, settled days are only fetched once
+        price_data = await price_store.get_prices(commodity_id, state_id, district_id, days=days)
+        stats = analyze_arrays_batch(price_archive.window([key], days)).get(key, {"count": 0})
+        if not stats["count"]:
+            if "error" in price_data:
+                return f"Error: {price_data['error']}"
+            return "No price data available for the specified commodity and location."
+
+    percentiles = stats["percentiles"]
+    return f"""
+        Price History over the last {days} days ({stats["count"]} trading days):
+        - Latest Price: ₹{stats["current"]:.2f} per quintal (Modal)
+        - Average Price: ₹{stats["average"]:.2f} per quintal
+        - Overall Price Range: ₹{stats["overall_min"]:.2f} - ₹{stats["overall_max"]:.2f} per quintal
+        - Typical Range (10th-90th percentile): ₹{percentiles[10]:.2f} - ₹{percentiles[90]:.2f} per quintal
+        - Last 7 Trading Days vs Earlier: ₹{stats["recent_average"]:.2f} vs ₹{stats["older_average"]:.2f}
+        - Trend: {stats["trend"].capitalize()}
+        - Volatility: {stats["volatility"]:.1f}% (standard deviation of daily change)
+    """.strip()
+
+async def get_mandi_quote(commodity: str, state: str, district: str = "") -> Dict[str, Any]:
+    """
+    Get the mandi price analysis for a commodity in one call
+
+    Resolves the commodity, state and district names, fetches the last 30 days
+    of prices and analyzes them on the server. Use this instead of calling the
+    individual tools one after another.
+
+    Args:
+        commodity (str): Commodity name as the user said it (e.g. "wheat", "moong dal")
+        state (str): State name (e.g. "karnataka")
+        district (str): District name, or empty for state-level prices
+
+    Returns:
+        dict: Resolved names and ids with the price analysis, or an error
+        naming the input that could not be resolved
+    """
+    async def resolve_commodity():
+        return get_commodity_id(commodity)
+
+    async def resolve_location():
+        state_info = get_state_id(state)
+        if state_info is None or not district.strip():
+            return state_info, None
+        await district_directory.ensure_state(state_info["state_id"])
+        return state_info, district_directory.lookup(state_info["state_id"], district)
+
+    # The commodity and the state/district chain do not depend on each other
+    commodity_info, (state_info, district_info) = await asyncio.gather(
+        resolve_commodity(), resolve_location()
+    )
+
+    if commodity_info is None:
+        return {
+            "error": f"Commodity '{commodity}' not found.",
+            "did_you_mean": suggest_names(commodity_index, commodity),
+            "supported_commodities": sorted({v["commodity_name"] for v in COMMODITY_MAPPING.values()}),
         }
-        
-        url = "https://agmarknet.ceda.ashoka.edu.in/api/prices"
-        response = requests.post(url, json=payload, timeout=15)
-        response.raise_for_status()
-        
-        return response.json()
-        
-    except Exception as e:
+    if state_info is None:
         return {
-            "error": f"Failed to fetch price data: {str(e)}",
-            "payload": payload
+            "error": f"State '{state}' not found.",
+            "did_you_mean": suggest_names(state_index, state),
+            "supported_states": sorted(v["state_name"] for v in STATE_MAPPING.values()),
         }
 
-def analyze_price_trends(price_data: Dict[str, Any]) -> str:
+    quote = {
+        "commodity": commodity_info["commodity_name"],
+        "commodity_id": commodity_info["commodity_id"],
+        "state": state_info["state_name"],
+        "state_id": state_info["state_id"],
+        "district": district_info["census_district_name"] if district_info else "All districts",
+        "district_id": district_info["census_district_id"] if district_info else 0,
+    }
+    if district.strip() and district_info is None:
+        quote["note"] = f"District '{district}' not found, showing state-level prices."
+
+    price_data = await price_store.get_prices(
+        quote["commodity_id"], quote["state_id"], quote["district_id"], days=30
+    )
+    quote["analysis"] = analyze_price_records(price_data)
+    return quote
+
+def analyze_price_records(price_data: Dict[str, Any]) -> str:
     """
     Analyze price trends from the API response
     """
@@ -153,52 +272,17 @@ def analyze_price_trends(price_data: Dict[str, Any]) -> str:
         if not data:
             return "No price data available for the specified commodity and location."
         
-        # Extract price information using p_modal (most common price)
-        prices = []
-        min_prices = []
-        max_prices = []
-        dates = []
-        
-        for item in data:
-            if "p_modal" in item and item["p_modal"] and item["p_modal"] > 0:
-                try:
-                    modal_price = float(item["p_modal"])
-                    min_price = float(item.get("p_min", 0)) if item.get("p_min") and item["p_min"] > 0 else modal_price
-                    max_price = float(item.get("p_max", 0)) if item.get("p_max") and item["p_max"] > 0 else modal_price
-                    
-                    prices.append(modal_price)
-                    min_prices.append(min_price)
-                    max_prices.append(max_price)
-                    dates.append(item.get("t", ""))
-                except (ValueError, TypeError):
-                    continue
-        
-        if not prices:
+        stats = analyze_series(data)
+        if not stats["count"]:
             return "No valid price data found in the response."
         
-        # Calculate statistics
-        current_price = prices[-1] if prices else 0
-        avg_price = sum(prices) / len(prices) if prices else 0
-        min_price_overall = min(min_prices) if min_prices else 0
-        max_price_overall = max(max_prices) if max_prices else 0
-        
-        # Get current min/max
-        current_min = min_prices[-1] if min_prices else current_price
-        current_max = max_prices[-1] if max_prices else current_price
-        
-        # Determine trend
-        if len(prices) >= 2:
-            recent_avg = sum(prices[-7:]) / min(7, len(prices))  # Last 7 days
-            older_avg = sum(prices[:-7]) / max(1, len(prices) - 7) if len(prices) > 7 else avg_price
-            
-            if recent_avg > older_avg * 1.05:
-                trend = "increasing"
-            elif recent_avg < older_avg * 0.95:
-                trend = "decreasing"
-            else:
-                trend = "stable"
-        else:
-            trend = "insufficient data"
+        current_price = stats["current"]
+        current_min = stats["current_min"]
+        current_max = stats["current_max"]
+        avg_price = stats["average"]
+        min_price_overall = stats["overall_min"]
+        max_price_overall = stats["overall_max"]
+        trend = stats["trend"]
         
         # Format response
         analysis = f"""
@@ -208,6 +292,7 @@ def analyze_price_trends(price_data: Dict[str, Any]) -> str:
             - Average Price (30 days): ₹{avg_price:.2f} per quintal
             - Overall Price Range: ₹{min_price_overall:.2f} - ₹{max_price_overall:.2f} per quintal
             - Trend: {trend.capitalize()}
+            - Volatility: {stats["volatility"]:.1f}% (standard deviation of daily change)
 
             Market Insights:
         """
@@ -253,41 +338,31 @@ mandi_analyst = Agent(
         - Ensure your response is optimized for audio delivery
         - Keep sentences shorter and more conversational for audio
 
-        ## Your Workflow - Follow This Exact Sequence:
+        ## Your Workflow:
 
         ### Step 1: Extract Information from User Query
         - Identify the commodity name (wheat, rice, banana, dal, etc.)
         - Identify the state name (karnataka, maharashtra, etc.)
-        - Identify the district name (bangalore, mumbai, etc.)
-
-        ### Step 2: Get Commodity ID
-        - Use the `get_commodity_id` tool with the commodity name
-        - This will return the commodity_id and commodity_name
-        - If not found, suggest similar commodities
-
-        ### Step 3: Get State ID
-        - Use the `get_state_id` tool with the state name
-        - This will return the state_id and state_name
-        - If not found, suggest similar states
-
-        ### Step 4: Get District ID
-        - Use the `get_district_id` tool with state_id and district name
-        - This will return the district_id
-        - If district is specified by user but not found, ask for clarification or use state-level data
-        - If no district is specified by user, use district_id = 0 for state-level data
-        - IMPORTANT: Only use district_id = 0 when user doesn't specify a district
-
-        ### Step 5: Fetch Price Data
-        - Use the `get_mandi_prices` tool with commodity_id, state_id, and district_id
-        - If user specified a district but it's not found, inform them and ask for correct district name
-        - If no district was specified, use district_id = 0 for state-level data
-        - This will return the price data from Agmarknet API
-
-        ### Step 6: Analyze Price Trends
-        - Use the `analyze_price_trends` tool with the price data
-        - This will provide a comprehensive analysis
-
-        ### Step 7: Provide Summary (250 words max)
+        - Identify the district name (bangalore, mumbai, etc.), if the user gave one
+
+        ### Step 2: Get the Quote in One Call
+        - Use the `get_mandi_quote` tool with commodity, state and district (empty if not specified)
+        - It resolves the names, fetches the prices and returns the analysis in a single step
+        - If it returns an error, ask the user whether they meant one of the "did_you_mean" names, otherwise suggest the supported commodities or states it lists
+        - Pass names exactly as the user said them, Hindi or regional names (gehun, गेहूं, tur) are understood
+        - If it returns a note that the district was not found, tell the user you are using state-level prices
+
+        ### Fallback: Individual Tools
+        Only when you need a single piece (for example just a district ID), the individual tools are:
+        - `get_commodity_id` with the commodity name → commodity_id
+        - `get_state_id` with the state name → state_id
+        - `get_district_id` with state_id and district name → district_id (use 0 when no district was specified)
+        - `get_mandi_prices` with commodity_id, state_id, and district_id → price data
+        - `analyze_price_trends` with the same commodity_id, state_id, and district_id → analysis
+        - `analyze_price_history` with commodity_id, state_id, district_id and a number of days → long-range analysis,
+          use it when the user asks about a season, several months or a year (e.g. "last year", "since Diwali")
+
+        ### Step 3: Provide Summary (250 words max)
         - Combine all the information into a clear, farmer-friendly summary
         - Include commodity name, location, prices, trends, and recommendations
         - Respond in the same language as the user's query
@@ -309,21 +384,13 @@ mandi_analyst = Agent(
         
         Your Response (250 words max):
         1. "I'll help you get the current mandi price for wheat in Bangalore, Karnataka. Let me fetch this information for you."
-        2. Call get_commodity_id("wheat") → commodity_id: 1
-        3. Call get_state_id("karnataka") → state_id: 29
-        4. Call get_district_id(29, "bangalore") → district_id: 572 (actual district ID)
-        5. Call get_mandi_prices(1, 29, 572) → price data
-        6. Call analyze_price_trends(price_data) → analysis
-        7. Provide concise summary with key points only
+        2. Call get_mandi_quote("wheat", "karnataka", "bangalore") → ids and analysis
+        3. Provide concise summary with key points only
         
         User: "What is current mandi price for rice in Karnataka?" (no district specified)
         1. "I'll help you get the current mandi price for rice in Karnataka. Let me fetch state-level data."
-        2. Call get_commodity_id("rice") → commodity_id: 2
-        3. Call get_state_id("karnataka") → state_id: 29
-        4. No district specified, so use district_id = 0
-        5. Call get_mandi_prices(2, 29, 0) → state-level price data
-        6. Call analyze_price_trends(price_data) → analysis
-        7. Provide concise summary with key points only
+        2. Call get_mandi_quote("rice", "karnataka", "") → state-level ids and analysis
+        3. Provide concise summary with key points only
 
         ## Language Detection Rule
             - Always detect the user's language from their audio/text input
@@ -334,7 +401,7 @@ mandi_analyst = Agent(
             - Match their language exactly
 
         ## Important Notes:
-        - ALWAYS follow the exact sequence of tool calls
+        - Prefer a single get_mandi_quote call over the individual tools
         - Handle errors gracefully and suggest alternatives
         - Provide prices in ₹ per quintal
         - Be helpful and informative in your responses
@@ -342,5 +409,5 @@ mandi_analyst = Agent(
         - Prioritize the most critical price information within the 250-word limit
         - Ensure audio response format when parent agent receives audio input
     """,
-    tools=[get_commodity_id, get_state_id, get_district_id, get_mandi_prices, analyze_price_trends],
+    tools=[get_mandi_quote, get_commodity_id, get_state_id, get_district_id, get_mandi_prices, analyze_price_trends, analyze_price_history],
 ) 
\ No newline at end of file
@@ -0,0 +1,200 @@
+import warnings
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+# Recent window and thresholds used to classify a trend
+RECENT_DAYS = 7
+RISING_RATIO = 1.05
+FALLING_RATIO = 0.95
+PERCENTILES = (10, 50, 90)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def records_to_arrays(records: Sequence[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract price columns from agmarknet records
+
+    Missing or non-numeric prices become 0.
+
+    Returns:
+        tuple: (dates, p_min, p_modal, p_max) with float64 arrays, unvalidated
+    """
+    dates = [record.get("t", "") for record in records]
+    rows = [(record.get("p_min") or 0, record.get("p_modal") or 0, record.get("p_max") or 0) for record in records]
+    try:
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), 3)
+    except (TypeError, ValueError):
+        table = np.array([[_to_float(value) for value in row] for row in rows]).reshape(len(rows), 3)
+    return dates, table[:, 0], table[:, 1], table[:, 2]
+
+
+def clean_prices(low: np.ndarray, modal: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Keep rows with a positive p_modal, falling back to p_modal for missing p_min/p_max
+
+    NaN (days missing from an archive) counts as missing.
+
+    Returns:
+        tuple: (valid mask, p_min, p_modal, p_max) for the valid rows
+    """
+    with np.errstate(invalid="ignore"):
+        valid = modal > 0
+        modal = modal[valid]
+        low = np.asarray(low)[valid]
+        high = np.asarray(high)[valid]
+        low = np.where(low > 0, low, modal)
+        high = np.where(high > 0, high, modal)
+    return valid, low, modal, high
+
+
+def group_records(records: Iterable[Dict[str, Any]], fields: Tuple[str, ...] = ("cmdty", "district")) -> Dict[Tuple, List[Dict[str, Any]]]:
+    """Split a flat record list into one series per combination of ``fields``"""
+    groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(tuple(record.get(field) for field in fields), []).append(record)
+    return groups
+
+
+def _row_percentiles(packed: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Linearly interpolated PERCENTILES of each row's leading non-NaN values"""
+    ordered = np.sort(packed, axis=1)  # NaN sorts last
+    rows = np.arange(packed.shape[0])
+    last = np.maximum(counts - 1, 0)
+    result = np.empty((len(PERCENTILES), packed.shape[0]))
+    for i, percentile in enumerate(PERCENTILES):
+        position = last * (percentile / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, last)
+        fraction = position - below
+        result[i] = ordered[rows, below] + (ordered[rows, above] - ordered[rows, below]) * fraction
+    return result
+
+
+def _analyze_flat(row_ids: np.ndarray, low: np.ndarray, modal: np.ndarray, high: np.ndarray, n_rows: int):
+    """
+    Statistics for series stored back to back in flat arrays
+
+    ``row_ids`` holds the series index of every element and must be
+    non-decreasing, each series being in date order.
+
+    Returns:
+        tuple: (counts, kept flat indices, dict of per-row statistic arrays)
+    """
+    valid, low, modal, high = clean_prices(low, modal, high)
+    kept = np.flatnonzero(valid)
+    row_ids = row_ids[kept]
+    counts = np.bincount(row_ids, minlength=n_rows)
+    width = max(int(counts.max()) if counts.size else 0, 1)
+
+    # Scatter into right-aligned NaN padded matrices, newest value in the last column
+    starts = np.cumsum(counts) - counts
+    columns = width - counts[row_ids] + np.arange(row_ids.size) - starts[row_ids]
+    packed = []
+    for values in (low, modal, high):
+        matrix = np.full((n_rows, width), np.nan)
+        matrix[row_ids, columns] = values
+        packed.append(matrix)
+    low, modal, high = packed
+
+    # All-NaN rows (short series) are expected, silence numpy's empty slice warnings
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        average = np.nanmean(modal, axis=1)
+        recent = np.nanmean(modal[:, -RECENT_DAYS:], axis=1)
+        older = np.nanmean(modal[:, :-RECENT_DAYS], axis=1) if width > RECENT_DAYS else average
+        older = np.where(counts > RECENT_DAYS, older, average)
+        changes = np.diff(modal, axis=1) / modal[:, :-1] * 100
+        volatility = np.nanstd(changes, axis=1) if width > 1 else np.zeros(n_rows)
+        stats = {
+            "current": modal[:, -1],
+            "current_min": low[:, -1],
+            "current_max": high[:, -1],
+            "average": average,
+            "overall_min": np.nanmin(low, axis=1),
+            "overall_max": np.nanmax(high, axis=1),
+            "recent_average": recent,
+            "older_average": older,
+            "volatility": np.nan_to_num(volatility),
+        }
+
+    trend = np.where(
+        recent > older * RISING_RATIO, "increasing",
+        np.where(recent < older * FALLING_RATIO, "decreasing", "stable"),
+    )
+    stats["trend"] = np.where(counts >= 2, trend, "insufficient data")
+    stats["percentiles"] = _row_percentiles(modal, counts)
+    return counts, kept, stats
+
+
+def _collect(keys: List[Hashable], counts: np.ndarray, stats: Dict[str, np.ndarray]) -> Dict[Hashable, Dict[str, Any]]:
+    """Turn per-row statistic arrays into one result dict per key"""
+    columns = {name: values.tolist() for name, values in stats.items() if name != "percentiles"}
+    percentiles = list(zip(*stats["percentiles"].tolist()))
+    results: Dict[Hashable, Dict[str, Any]] = {}
+    for row, key in enumerate(keys):
+        count = int(counts[row])
+        if not count:
+            results[key] = {"count": 0}
+            continue
+        result = {"count": count}
+        for name, values in columns.items():
+            result[name] = values[row]
+        result["percentiles"] = dict(zip(PERCENTILES, percentiles[row]))
+        results[key] = result
+    return results
+
+
+def analyze_arrays_batch(series: Mapping[Hashable, Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Dict[Hashable, Dict[str, Any]]:
+    """
+    Price statistics for many series in one vectorized pass
+
+    Args:
+        series: Mapping from a series key, e.g. (commodity, market), to its
+            (p_min, p_modal, p_max) arrays in date order. Arrays may be
+            read-only views; rows without a positive p_modal are skipped.
+
+    Returns:
+        dict: Per key: count, current/current_min/current_max, average,
+        overall_min/overall_max, recent_average (last 7 rows),
+        older_average, trend, volatility (std of daily % change) and
+        percentiles of the modal price. Series without valid rows map to
+        {"count": 0}.
+    """
+    keys = list(series)
+    if not keys:
+        return {}
+    row_ids = np.repeat(np.arange(len(keys)), [len(series[key][1]) for key in keys])
+    # The only copy of the (possibly memory-mapped) input, straight to float64
+    low, modal, high = (np.concatenate([series[key][i] for key in keys], dtype=np.float64) for i in range(3))
+    counts, _, stats = _analyze_flat(row_ids, low, modal, high, len(keys))
+    return _collect(keys, counts, stats)
+
+
+def analyze_series_batch(series: Mapping[Hashable, Sequence[Dict[str, Any]]]) -> Dict[Hashable, Dict[str, Any]]:
+    """Like analyze_arrays_batch, for agmarknet record lists; adds last_date"""
+    keys = list(series)
+    if not keys:
+        return {}
+    # One extraction pass over every record instead of one per series
+    records = [record for key in keys for record in series[key]]
+    row_ids = np.repeat(np.arange(len(keys)), [len(series[key]) for key in keys])
+    dates, low, modal, high = records_to_arrays(records)
+    counts, kept, stats = _analyze_flat(row_ids, low, modal, high, len(keys))
+    results = _collect(keys, counts, stats)
+
+    ends = np.cumsum(counts) - 1
+    for row in np.flatnonzero(counts).tolist():
+        results[keys[row]]["last_date"] = dates[kept[ends[row]]]
+    return results
+
+
+def analyze_series(records: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Statistics for a single series, see analyze_series_batch"""
+    return analyze_series_batch({None: records})[None]
@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.logs import get_logger
+
+log = get_logger("mandi")
+
+SeriesKey = Tuple[int, int, int]  # (commodity_id, state_id, district_id)
+
+
+def record_date(record: Dict[str, Any]) -> Optional[str]:
+    """ISO date (YYYY-MM-DD) of an agmarknet price record"""
+    timestamp = record.get("t")
+    if not timestamp:
+        return None
+    return str(timestamp)[:10]
+
+
+# Column order of the price axis
+P_MIN, P_MODAL, P_MAX = 0, 1, 2
+
+INDEX_DTYPE = np.dtype([("commodity_id", "<i4"), ("state_id", "<i4"), ("district_id", "<i4")])
+PRICE_DTYPE = np.dtype("<f4")
+
+# Growth steps, so appending a day or a series rarely resizes the file
+DAYS_BLOCK = 366
+ROWS_BLOCK = 64
+
+
+class PriceArchive:
+    """
+    Columnar, memory-mapped archive of daily mandi prices.
+
+    One float32 cube of shape (series, 3, days) holds p_min, p_modal and
+    p_max per (commodity_id, state_id, district_id) series on a shared date
+    axis, NaN where there is no price. A year of one series is about 4 KB
+    on disk and nothing in RAM until its pages are touched, against several
+    hundred KB for the equivalent list of agmarknet record dicts. Opening
+    the archive maps the file and reads a small key index; no records are
+    parsed.
+
+    Appends may run in a worker thread (the price store writes through
+    asyncio.to_thread) while reads stay on the event loop. Writers are
+    serialized; growing the cube rewrites it into a new file without
+    blocking readers, which only wait for the swap to the new mapping.
+
+    Files in ``path``:
+        prices.f32    the price cube, row-major
+        index.npy     series keys, row i of the cube is entry i
+        archive.json  first date and capacity of the cube
+
+    Configuration from the environment:
+        MANDI_DATA_DIR  parent directory of archive/ (default: ~/.cache/kisan_mitra)
+    """
+
+    def __init__(self, path: Optional[Path] = None, readonly: bool = False):
+        data_dir = Path(os.getenv("MANDI_DATA_DIR", Path.home() / ".cache" / "kisan_mitra"))
+        self.path = path or data_dir / "archive"
+        self.readonly = readonly
+
+        self.start: Optional[date] = None
+        self._days = 0
+        self._capacity = 0
+        self._keys: Dict[SeriesKey, int] = {}
+        self._prices: Optional[np.memmap] = None
+        self._opened = False
+        # _lock guards the mapping and its shape, _write_lock serializes appends and resizes
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def prices_path(self) -> Path:
+        return self.path / "prices.f32"
+
+    def open(self):
+        """Maps an existing archive; a missing archive opens empty"""
+        self._opened = True
+        try:
+            with open(self.path / "archive.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            index = np.load(self.path / "index.npy")
+        except (OSError, ValueError) as e:
+            if (self.path / "archive.json").exists():
+                log.error("archive_open_failed", f"Error opening price archive: {e}", path=str(self.path))
+            return
+
+        self.start = date.fromisoformat(meta["start_date"])
+        self._days = meta["days"]
+        self._capacity = meta["row_capacity"]
+        self._keys = {tuple(int(v) for v in entry): row for row, entry in enumerate(index.tolist())}
+        self._prices = np.memmap(
+            self.prices_path, dtype=PRICE_DTYPE, mode="r" if self.readonly else "r+",
+            shape=(self._capacity, 3, self._days),
+        )
+
+    def keys(self) -> List[SeriesKey]:
+        self._ensure_open()
+        return list(self._keys)
+
+    def __contains__(self, key: SeriesKey) -> bool:
+        self._ensure_open()
+        return key in self._keys
+
+    def series(self, key: SeriesKey, start: Optional[date] = None, end: Optional[date] = None) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Prices of one series between ``start`` and ``end`` inclusive
+
+        The price arrays are views into the mapped file, not copies; they stay
+        valid until the archive is resized or closed.
+
+        Returns:
+            tuple: (dates as datetime64[D], p_min, p_modal, p_max), or None for an unknown series
+        """
+        self._ensure_open()
+        with self._lock:
+            row = self._keys.get(key)
+            if row is None:
+                return None
+            first = 0 if start is None else max((start - self.start).days, 0)
+            last = self._days if end is None else min((end - self.start).days + 1, self._days)
+            last = max(last, first)
+            dates = np.datetime64(self.start, "D") + np.arange(first, last)
+            prices = self._prices[row, :, first:last]
+        return dates, prices[P_MIN], prices[P_MODAL], prices[P_MAX]
+
+    def window(self, keys: Iterable[SeriesKey], days: int, end: Optional[date] = None) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(p_min, p_modal, p_max) views of the last ``days`` days per known key, for analyze_arrays_batch"""
+        end = end or date.today()
+        start = end - timedelta(days=days - 1)
+        window = {}
+        for key in keys:
+            series = self.series(key, start, end)
+            if series is not None:
+                window[key] = series[1:]
+        return window
+
+    def append_records(self, key: SeriesKey, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Stores agmarknet records of one series, overwriting the days they cover
+
+        Several records on one day (markets of a state-level series) are
+        averaged. Records without a positive p_modal are ignored.
+
+        Returns:
+            int: number of days written
+        """
+        by_day: Dict[str, List[Tuple[float, float, float]]] = {}
+        for record in records:
+            day = record_date(record)
+            try:
+                modal = float(record.get("p_modal") or 0)
+                low = float(record.get("p_min") or 0) or modal
+                high = float(record.get("p_max") or 0) or modal
+            except (TypeError, ValueError):
+                continue
+            if day is None or modal <= 0:
+                continue
+            by_day.setdefault(day, []).append((low, modal, high))
+        if not by_day:
+            return 0
+
+        days = sorted(by_day)
+        dates = np.array(days, dtype="datetime64[D]")
+        values = np.array([np.mean(by_day[day], axis=0) for day in days], dtype=PRICE_DTYPE)
+        self.append_arrays(key, dates, values[:, P_MIN], values[:, P_MODAL], values[:, P_MAX])
+        return len(days)
+
+    def append_arrays(self, key: SeriesKey, dates: np.ndarray, low: np.ndarray, modal: np.ndarray, high: np.ndarray):
+        """Writes prices for the given datetime64[D] dates, growing the archive as needed"""
+        if self.readonly:
+            raise RuntimeError("Price archive is open read-only")
+        self._ensure_open()
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        if not dates.size:
+            return
+
+        first, last = dates.min().astype(date), dates.max().astype(date)
+        with self._write_lock:
+            if self.start is None or first < self.start or (last - self.start).days >= self._days:
+                self._resize_days(first, last)
+            row = self._keys.get(key)
+            if row is None:
+                row = self._add_series(key)
+
+            columns = (dates - np.datetime64(self.start, "D")).astype(np.int64)
+            self._prices[row, P_MIN, columns] = low
+            self._prices[row, P_MODAL, columns] = modal
+            self._prices[row, P_MAX, columns] = high
+
+    def flush(self):
+        prices = self._prices
+        if prices is not None and not self.readonly:
+            prices.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_open()
+        with self._lock:
+            return {
+                "series": len(self._keys),
+                "start_date": self.start.isoformat() if self.start else None,
+                "days": self._days,
+                "bytes": self._capacity * 3 * self._days * PRICE_DTYPE.itemsize,
+            }
+
+    def close(self):
+        with self._write_lock, self._lock:
+            self.flush()
+            self._prices = None
+            self._opened = False
+
+    def _ensure_open(self):
+        with self._lock:
+            if not self._opened:
+                self.open()
+
+    def _add_series(self, key: SeriesKey) -> int:
+        row = len(self._keys)
+        if row >= self._capacity:
+            self._resize_rows(self._capacity + ROWS_BLOCK)
+        with self._lock:
+            self._keys[key] = row
+        self._save_index()
+        return row
+
+    def _resize_rows(self, capacity: int):
+        """Extends the file by whole rows, existing rows stay where they are"""
+        self.flush()
+        with open(self.prices_path, "ab") as f:
+            f.truncate(capacity * 3 * self._days * PRICE_DTYPE.itemsize)
+        resized = np.memmap(self.prices_path, dtype=PRICE_DTYPE, mode="r+", shape=(capacity, 3, self._days))
+        resized[self._capacity:] = np.nan
+        with self._lock:
+            self._prices, self._capacity = resized, capacity
+        self._save_meta()
+
+    def _resize_days(self, first: date, last: date):
+        """
+        Rewrites the cube so its date axis covers first..last, in whole blocks
+
+        The new cube is written to a temporary file while readers keep the
+        old mapping; only the swap holds the read lock. Only the cells that
+        are not copied from the old cube are filled with NaN.
+        """
+        start = first if self.start is None else min(first, self.start)
+        end = last if self.start is None else max(last, self.start + timedelta(days=self._days - 1))
+        days = -(-((end - start).days + 1) // DAYS_BLOCK) * DAYS_BLOCK
+        capacity = max(self._capacity, ROWS_BLOCK)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.prices_path.with_suffix(".tmp")
+        resized = np.memmap(tmp_path, dtype=PRICE_DTYPE, mode="w+", shape=(capacity, 3, days))
+        if self._prices is None:
+            resized[:] = np.nan
+        else:
+            offset = (self.start - start).days
+            resized[: self._capacity, :, :offset] = np.nan
+            resized[: self._capacity, :, offset: offset + self._days] = self._prices
+            resized[: self._capacity, :, offset + self._days:] = np.nan
+            resized[self._capacity:] = np.nan
+        resized.flush()
+        del resized
+
+        # The old mapping stays valid for readers holding views of it after the file is replaced
+        os.replace(tmp_path, self.prices_path)
+        prices = np.memmap(self.prices_path, dtype=PRICE_DTYPE, mode="r+", shape=(capacity, 3, days))
+        with self._lock:
+            self._prices = prices
+            self.start, self._days, self._capacity = start, days, capacity
+        self._save_meta()
+
+    def _save_index(self):
+        index = np.array(list(self._keys), dtype=INDEX_DTYPE) if self._keys else np.empty(0, dtype=INDEX_DTYPE)
+        tmp_path = self.path / "index.tmp.npy"
+        np.save(tmp_path, index)
+        os.replace(tmp_path, self.path / "index.npy")
+
+    def _save_meta(self):
+        meta = {"start_date": self.start.isoformat(), "days": self._days, "row_capacity": self._capacity}
+        tmp_path = self.path / "archive.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.path / "archive.json")
+        if not (self.path / "index.npy").exists():
+            self._save_index()
+
+
+# Shared by the price store and the mandi tools
+price_archive = PriceArchive()
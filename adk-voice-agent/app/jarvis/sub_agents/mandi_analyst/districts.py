@@ -0,0 +1,271 @@
+import asyncio
+import difflib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from app.logs import get_logger
+
+log = get_logger("mandi")
+
+AGMARKNET_API_URL = os.getenv("AGMARKNET_API_URL", "https://agmarknet.ceda.ashoka.edu.in/api")
+
+# Renamed cities and common spellings. Every name in a group resolves to
+# whichever of them the census district list uses.
+DISTRICT_ALIASES = [
+    ["bengaluru", "bangalore", "bengaluru urban", "bangalore urban"],
+    ["bengaluru rural", "bangalore rural"],
+    ["mysuru", "mysore"],
+    ["mangaluru", "mangalore", "dakshina kannada"],
+    ["belagavi", "belgaum"],
+    ["kalaburagi", "gulbarga"],
+    ["vijayapura", "bijapur"],
+    ["shivamogga", "shimoga"],
+    ["ballari", "bellary"],
+    ["tumakuru", "tumkur"],
+    ["chikkamagaluru", "chikmagalur"],
+    ["hubballi", "hubli", "dharwad"],
+    ["mumbai", "bombay", "mumbai city"],
+    ["pune", "poona"],
+    ["nashik", "nasik"],
+    ["kolkata", "calcutta"],
+    ["chennai", "madras"],
+    ["tiruchirappalli", "trichy", "tiruchirapalli"],
+    ["thoothukudi", "tuticorin"],
+    ["thiruvananthapuram", "trivandrum"],
+    ["ernakulam", "kochi", "cochin"],
+    ["kozhikode", "calicut"],
+    ["thrissur", "trichur"],
+    ["vadodara", "baroda"],
+    ["prayagraj", "allahabad"],
+    ["ayodhya", "faizabad"],
+    ["varanasi", "banaras", "benares"],
+    ["gurugram", "gurgaon"],
+    ["puducherry", "pondicherry"],
+    ["visakhapatnam", "vizag", "vishakhapatnam"],
+    ["hyderabad", "secunderabad"],
+]
+
+_ALIAS_GROUPS: Dict[str, List[str]] = {}
+for _group in DISTRICT_ALIASES:
+    for _name in _group:
+        _ALIAS_GROUPS[_name] = _group
+
+_NON_ALNUM = re.compile(r"[^\w\s]")
+_SUFFIXES = (" district", " dist", " zilla", " jila")
+
+# A fuzzy match needs this similarity and must beat the runner-up by FUZZY_MARGIN, or it is ambiguous
+FUZZY_CUTOFF = 0.75
+FUZZY_MARGIN = 0.05
+# Lookups remembered per state, least recently used dropped first
+MEMO_SIZE = 1024
+
+
+def normalize_district_name(name: str) -> str:
+    """Lowercase, drop punctuation and trailing 'district', collapse spaces"""
+    normalized = " ".join(_NON_ALNUM.sub(" ", name.lower()).split())
+    for suffix in _SUFFIXES:
+        if normalized.endswith(suffix):
+            normalized = normalized[: -len(suffix)].strip()
+    return normalized
+
+
+def best_match(name: str, candidates: Iterable[str], cutoff: float = FUZZY_CUTOFF) -> Optional[str]:
+    """The candidate most similar to ``name``, None when none reaches ``cutoff`` or the best is not unique"""
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(name)
+    scored = []
+    for candidate in candidates:
+        matcher.set_seq1(candidate)
+        if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, candidate))
+    if not scored:
+        return None
+    scored.sort(reverse=True)
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < FUZZY_MARGIN:
+        return None
+    return scored[0][1]
+
+
+class DistrictDirectory:
+    """
+    Local directory of agmarknet districts for every state.
+
+    District lists are loaded from disk once, served from an in-memory index
+    keyed by normalized name (plus aliases such as Bangalore/Bengaluru), and
+    refreshed from agmarknet on a background task when older than
+    ``max_age``. A lookup is a dict access; fuzzy matching only runs on a
+    miss and its result is memoized (the last MEMO_SIZE names per state),
+    so no network call happens while the user is talking unless a state has
+    never been fetched at all.
+
+    Configuration from the environment:
+        MANDI_DATA_DIR                 cache directory (default: ~/.cache/kisan_mitra)
+        MANDI_DISTRICTS_MAX_AGE_HOURS  refresh interval (default: 168)
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_age: Optional[float] = None,
+        base_url: str = AGMARKNET_API_URL,
+    ):
+        data_dir = Path(os.getenv("MANDI_DATA_DIR", Path.home() / ".cache" / "kisan_mitra"))
+        self.path = path or data_dir / "districts.json"
+        self.max_age = max_age or float(os.getenv("MANDI_DISTRICTS_MAX_AGE_HOURS", 168)) * 3600
+        self.base_url = base_url
+
+        self._districts: Dict[int, List[Dict[str, Any]]] = {}
+        self._fetched_at: Dict[int, float] = {}
+        self._index: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._memo: Dict[int, "OrderedDict[str, Optional[Dict[str, Any]]]"] = {}
+        self._refreshing: Dict[int, asyncio.Task] = {}
+        self._fetch_slots = asyncio.Semaphore(4)
+        self._loaded = False
+
+    def load(self):
+        """Loads the persisted directory, missing or corrupt files are ignored"""
+        self._loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for state_id, districts in stored.get("districts", {}).items():
+            self._set_state(int(state_id), districts, stored.get("fetched_at", {}).get(state_id, 0.0))
+
+    def save(self):
+        """Writes the directory to disk atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stored = {
+            "fetched_at": {str(k): v for k, v in self._fetched_at.items()},
+            "districts": {str(k): v for k, v in self._districts.items()},
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self, state_id: int) -> bool:
+        return time.time() - self._fetched_at.get(state_id, 0.0) > self.max_age
+
+    def lookup(self, state_id: int, district_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a spoken or typed district name within a state
+
+        Tries the exact normalized name and its aliases first, then difflib
+        fuzzy matching, which only accepts a unique best match (see best_match).
+
+        Returns:
+            dict: census_district_id and census_district_name, or None
+        """
+        index = self._index.get(state_id)
+        if not index:
+            return None
+
+        name = normalize_district_name(district_name)
+        memo = self._memo.setdefault(state_id, OrderedDict())
+        if name in memo:
+            memo.move_to_end(name)
+            return memo[name]
+
+        match = index.get(name)
+        if match is None:
+            for alias in _ALIAS_GROUPS.get(name, ()):
+                match = index.get(alias)
+                if match is not None:
+                    break
+        if match is None:
+            close = best_match(name, index.keys())
+            if close is not None:
+                match = index[close]
+
+        memo[name] = match
+        if len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+        return match
+
+    async def ensure_state(self, state_id: int):
+        """Makes a state available, fetching it now only if it was never loaded"""
+        if not self._loaded:
+            self.load()
+        if state_id not in self._index:
+            await self.refresh(state_id)
+        elif self.is_stale(state_id):
+            self.refresh_in_background([state_id])
+
+    async def refresh(self, state_id: int):
+        """Fetches one state's districts from agmarknet, sharing in-flight refreshes"""
+        await asyncio.shield(self._start_refresh(state_id))
+
+    def refresh_in_background(self, state_ids: Iterable[int]):
+        """Schedules refreshes of stale states without waiting for them"""
+        for state_id in state_ids:
+            if self.is_stale(state_id):
+                self._start_refresh(state_id)
+
+    async def warm(self, state_ids: Iterable[int]):
+        """Loads from disk and refreshes every stale state, called at startup"""
+        if not self._loaded:
+            self.load()
+        self.refresh_in_background(state_ids)
+
+    async def close(self):
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        self._refreshing.clear()
+
+    def _start_refresh(self, state_id: int) -> asyncio.Task:
+        task = self._refreshing.get(state_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(state_id))
+            self._refreshing[state_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(state_id, None))
+        return task
+
+    async def _fetch(self, state_id: int):
+        try:
+            async with self._fetch_slots, httpx.AsyncClient(base_url=self.base_url, timeout=10) as client:
+                response = await client.get("/districts", params={"state_id": state_id})
+                response.raise_for_status()
+                districts = response.json().get("data", [])
+        except (httpx.HTTPError, ValueError) as e:
+            log.error("districts_fetch_failed", f"Error fetching district data: {e}", state_id=state_id)
+            return
+
+        self._set_state(state_id, districts, time.time())
+        try:
+            self.save()
+        except OSError as e:
+            log.error("districts_save_failed", f"Error saving district directory: {e}", path=str(self.path))
+
+    def _set_state(self, state_id: int, districts: List[Dict[str, Any]], fetched_at: float):
+        index = {}
+        for district in districts:
+            entry = {
+                "census_district_id": district["census_district_id"],
+                "census_district_name": district["census_district_name"],
+            }
+            name = normalize_district_name(entry["census_district_name"])
+            index.setdefault(name, entry)
+
+        self._districts[state_id] = [
+            {"census_district_id": d["census_district_id"], "census_district_name": d["census_district_name"]}
+            for d in districts
+        ]
+        self._fetched_at[state_id] = fetched_at
+        self._index[state_id] = index
+        self._memo.pop(state_id, None)
+
+
+# Shared by the mandi tools
+district_directory = DistrictDirectory()
@@ -0,0 +1,77 @@
+"""
+Nightly price analysis over every commodity and state.
+
+Fetches state-level prices for every commodity in COMMODITY_MAPPING and
+every state in STATE_MAPPING through the local price store, splits them
+into (commodity, state, district) series and analyzes all of them in one
+vectorized batch.
+
+Run from the adk-voice-agent directory:
+    python -m app.jarvis.sub_agents.mandi_analyst.nightly [--days 30] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, Hashable, List, Tuple
+
+from .agent import COMMODITY_MAPPING, STATE_MAPPING
+from .analytics import analyze_series_batch
+from .price_store import price_store
+
+
+async def fetch_all_markets(days: int = 30, concurrency: int = 4) -> Dict[Tuple, List[Dict[str, Any]]]:
+    """Records per (commodity, state, district) for every commodity/state pair"""
+    commodity_ids = sorted({c["commodity_id"] for c in COMMODITY_MAPPING.values()})
+    state_ids = sorted({s["state_id"] for s in STATE_MAPPING.values()})
+    slots = asyncio.Semaphore(concurrency)
+
+    async def fetch(commodity_id: int, state_id: int):
+        async with slots:
+            return commodity_id, state_id, await price_store.get_prices(commodity_id, state_id, 0, days=days)
+
+    results = await asyncio.gather(*(fetch(c, s) for c in commodity_ids for s in state_ids))
+
+    series: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for commodity_id, state_id, price_data in results:
+        for record in price_data.get("data", []):
+            key = (commodity_id, state_id, record.get("district", ""))
+            series.setdefault(key, []).append(record)
+    return series
+
+
+async def analyze_all_markets(days: int = 30) -> Dict[Hashable, Dict[str, Any]]:
+    """Statistics for every market series, see analytics.analyze_series_batch"""
+    series = await fetch_all_markets(days)
+    return analyze_series_batch(series)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30, help="Days of history per series")
+    parser.add_argument("--output", help="Write the per-series statistics to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    series = asyncio.run(fetch_all_markets(args.days))
+    fetched = time.perf_counter()
+    stats = analyze_series_batch(series)
+    analyzed = time.perf_counter()
+
+    print(f"Fetched {len(series)} series in {fetched - start:.2f}s, analyzed in {(analyzed - fetched) * 1000:.1f} ms")
+    trends: Dict[str, int] = {}
+    for result in stats.values():
+        if result["count"]:
+            trends[result["trend"]] = trends.get(result["trend"], 0) + 1
+    print(f"Trends: {trends}")
+
+    if args.output:
+        report = [{"commodity_id": k[0], "state_id": k[1], "district": k[2], **v} for k, v in stats.items()]
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
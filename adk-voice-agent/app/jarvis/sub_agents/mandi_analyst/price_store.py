@@ -0,0 +1,258 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from datetime import time as day_time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.logs import get_logger
+
+from .archive import PriceArchive, SeriesKey, price_archive, record_date
+from .districts import AGMARKNET_API_URL
+
+log = get_logger("mandi")
+
+
+def missing_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Collapse sorted days into contiguous (start, end) ranges"""
+    ranges = []
+    for day in days:
+        if ranges and (day - ranges[-1][1]).days == 1:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class PriceStore:
+    """
+    Local daily price store for agmarknet, keyed by (commodity_id, state_id, district_id, date).
+
+    A request for the last N days only fetches the days that are missing or
+    stale and merges them into what is already stored. Days older than
+    ``settled_days`` never change upstream and are fetched once; more recent
+    days are refetched after ``recent_ttl`` seconds. Days without trading are
+    stored as empty so they are not asked for again. Rows persist in SQLite
+    and the ``max_series`` most recently used series are kept in memory.
+    Every fetched day is also written to the columnar ``archive`` for
+    long-range analysis. Upstream requests share one keep-alive client, and
+    SQLite and archive I/O run in worker threads, off the event loop.
+
+    Configuration from the environment:
+        MANDI_DATA_DIR           directory of prices.sqlite3 (default: ~/.cache/kisan_mitra)
+        MANDI_PRICES_RECENT_TTL  seconds before a recent day is refetched (default: 3600)
+        MANDI_PRICES_SETTLED_DAYS  age in days after which a day is final (default: 3)
+        MANDI_PRICES_MAX_SERIES  series kept in memory (default: 512)
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        recent_ttl: Optional[float] = None,
+        settled_days: Optional[int] = None,
+        base_url: str = AGMARKNET_API_URL,
+        archive: Optional[PriceArchive] = None,
+        max_series: Optional[int] = None,
+    ):
+        data_dir = Path(os.getenv("MANDI_DATA_DIR", Path.home() / ".cache" / "kisan_mitra"))
+        self.path = path or data_dir / "prices.sqlite3"
+        self.recent_ttl = recent_ttl or float(os.getenv("MANDI_PRICES_RECENT_TTL", 3600))
+        self.settled_days = settled_days if settled_days is not None else int(os.getenv("MANDI_PRICES_SETTLED_DAYS", 3))
+        self.base_url = base_url
+        self.archive = archive or price_archive
+        self.max_series = max_series or int(os.getenv("MANDI_PRICES_MAX_SERIES", 512))
+
+        self.upstream_requests = 0
+        self.days_fetched = 0
+        self.days_served = 0
+
+        # series key -> {iso date: (fetched_at, records)}, least recently used first
+        self._series: "OrderedDict[SeriesKey, Dict[str, Tuple[float, List[Dict[str, Any]]]]]" = OrderedDict()
+        self._locks: "OrderedDict[SeriesKey, asyncio.Lock]" = OrderedDict()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._db: Optional[sqlite3.Connection] = None
+        # The connection is used from worker threads, one at a time
+        self._db_lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=15)
+        return self._client
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS prices (
+                    commodity_id INTEGER NOT NULL,
+                    state_id INTEGER NOT NULL,
+                    district_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    records TEXT NOT NULL,
+                    PRIMARY KEY (commodity_id, state_id, district_id, date)
+                )
+                """
+            )
+        return self._db
+
+    async def get_prices(self, commodity_id: int, state_id: int, district_id: int, days: int = 30) -> Dict[str, Any]:
+        """
+        Return the last ``days`` days of records in the agmarknet response shape
+
+        Only missing or stale days are requested upstream. If a fetch fails,
+        whatever is stored is returned with a "warning"; if nothing is stored
+        an "error" is returned instead.
+        """
+        key = (commodity_id, state_id, district_id)
+        end = date.today()
+        window = [end - timedelta(days=offset) for offset in range(days, -1, -1)]
+
+        async with self._lock(key):
+            series = await self._load_series(key)
+            now = time.time()
+            settled_before = end - timedelta(days=self.settled_days)
+            needed = [
+                day for day in window
+                if day.isoformat() not in series
+                or (day >= settled_before and now - series[day.isoformat()][0] > self.recent_ttl)
+            ]
+
+            warning = None
+            for start, stop in missing_ranges(needed):
+                try:
+                    records = await self._fetch(commodity_id, state_id, district_id, start, stop)
+                except (httpx.HTTPError, ValueError) as e:
+                    warning = f"Failed to fetch price data: {str(e)}"
+                    continue
+                await self._merge(key, series, start, stop, records)
+
+        data = []
+        for day in window:
+            entry = series.get(day.isoformat())
+            if entry:
+                data.extend(entry[1])
+        self.days_served += len(window)
+
+        if not data and warning:
+            return {"error": warning}
+        response = {"data": data}
+        if warning:
+            response["warning"] = warning
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self._series),
+            "upstream_requests": self.upstream_requests,
+            "days_fetched": self.days_fetched,
+            "days_served": self.days_served,
+        }
+
+    async def aclose(self):
+        """Closes pooled upstream connections, called on application shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        self.archive.close()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _lock(self, key: SeriesKey) -> asyncio.Lock:
+        """Lock of one series; idle locks beyond ``max_series`` are dropped, oldest first"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._locks.move_to_end(key)
+        for old_key in list(self._locks):
+            if len(self._locks) <= self.max_series:
+                break
+            if not self._locks[old_key].locked():
+                del self._locks[old_key]
+        return lock
+
+    async def _load_series(self, key: SeriesKey) -> Dict[str, Tuple[float, List[Dict[str, Any]]]]:
+        series = self._series.get(key)
+        if series is None:
+            series = await asyncio.to_thread(self._read_series, key)
+            self._series[key] = series
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        self._series.move_to_end(key)
+        return series
+
+    def _read_series(self, key: SeriesKey) -> Dict[str, Tuple[float, List[Dict[str, Any]]]]:
+        with self._db_lock:
+            rows = self.db.execute(
+                "SELECT date, fetched_at, records FROM prices"
+                " WHERE commodity_id = ? AND state_id = ? AND district_id = ?",
+                key,
+            ).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def _write_rows(self, rows: List[Tuple]):
+        with self._db_lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    async def _merge(self, key: SeriesKey, series, start: date, stop: date, records: List[Dict[str, Any]]):
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            day = record_date(record)
+            if day is not None:
+                by_day.setdefault(day, []).append(record)
+
+        fetched_at = time.time()
+        rows = []
+        day = start
+        while day <= stop:
+            iso_day = day.isoformat()
+            day_records = by_day.get(iso_day, [])
+            series[iso_day] = (fetched_at, day_records)
+            rows.append((*key, iso_day, fetched_at, json.dumps(day_records)))
+            day += timedelta(days=1)
+
+        await asyncio.to_thread(self._write_rows, rows)
+        self.days_fetched += len(rows)
+
+        try:
+            # Growing the archive rewrites its file, keep that off the event loop
+            await asyncio.to_thread(self._archive_records, key, records)
+        except OSError as e:
+            log.error("archive_write_failed", f"Error writing price archive: {e}", series=list(key))
+
+    def _archive_records(self, key: SeriesKey, records: List[Dict[str, Any]]):
+        self.archive.append_records(key, records)
+        self.archive.flush()
+
+    async def _fetch(self, commodity_id: int, state_id: int, district_id: int, start: date, stop: date) -> List[Dict[str, Any]]:
+        payload = {
+            "calculation_type": "d",
+            "commodity_id": commodity_id,
+            "district_id": district_id,
+            "end_date": datetime.combine(stop, day_time(23, 59, 59)).isoformat() + "Z",
+            "start_date": datetime.combine(start, day_time.min).isoformat() + "Z",
+            "state_id": state_id
+        }
+        self.upstream_requests += 1
+        response = await self.client.post("/prices", json=payload)
+        response.raise_for_status()
+        return response.json().get("data", [])
+
+
+# Shared by the mandi tools
+price_store = PriceStore()
@@ -0,0 +1,211 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Words that come along with a name in spoken queries ("gehun ka bhav")
+FILLER_WORDS = {
+    "ka", "ki", "ke", "ko", "ha", "hai", "mein", "me", "in", "of", "the", "state", "rate", "rates",
+    "price", "prices", "bhav", "bhaav", "daam", "dam", "mandi", "today", "aaj",
+    "का", "की", "के", "को", "है", "में", "भाव", "दाम", "मंडी", "आज", "राज्य", "रेट",
+}
+
+# Spelling variants of romanized Indian words, folded to one form
+_ROMAN_FOLDS = (
+    ("aa", "a"), ("ee", "i"), ("ea", "i"), ("oo", "u"), ("ou", "u"), ("ph", "f"), ("sh", "s"), ("kh", "k"),
+    ("gh", "g"), ("th", "t"), ("dh", "d"), ("bh", "b"), ("w", "v"), ("z", "j"), ("q", "k"),
+)
+_REPEATS = re.compile(r"(.)\1+")
+
+# Scores of the different match kinds, fuzzy matches score their trigram similarity
+EXACT_SCORE = 1.0
+PHONETIC_SCORE = 0.95
+PARTIAL_SCORE = 0.9
+# A run that is only a word many names share ("dal" in "chna dal") ranks below fuzzy matches of the whole query
+GENERIC_PARTIAL_SCORE = 0.5
+WORD_SCORE = 0.8
+FUZZY_MAX_SCORE = 0.85
+MIN_ACCEPT_SCORE = 0.6
+MIN_CANDIDATE_SCORE = 0.3
+# Fuzzy matches against a much shorter or longer name ("bengaluru" vs "bengal") are scaled down by the length ratio
+FUZZY_MIN_LENGTH_RATIO = 0.75
+# A fuzzy best match this close to the runner-up is ambiguous ("pradesh")
+AMBIGUITY_MARGIN = 0.1
+
+
+def normalize_name(text: str) -> str:
+    """
+    Lowercase, unify Unicode forms and drop punctuation and filler words
+
+    Devanagari nukta is dropped and chandrabindu folded to anusvara, so
+    उड़द/उडद and गेहूँ/गेहूं compare equal.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = text.replace("़", "").replace("ँ", "ं")
+    cleaned = "".join(" " if unicodedata.category(c)[0] in "PSZC" else c for c in text)
+    words = [word for word in cleaned.split() if word not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def phonetic_key(name: str) -> str:
+    """Normalized name with romanization variants folded and spaces removed ("Tamil Naadu" -> "tamilnadu")"""
+    key = name.replace(" ", "")
+    if key.isascii():
+        for variant, folded in _ROMAN_FOLDS:
+            key = key.replace(variant, folded)
+        key = _REPEATS.sub(r"\1", key)
+    return key
+
+
+def trigrams(key: str) -> Counter:
+    padded = f"^{key}$"
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class NameIndex:
+    """
+    Precomputed resolver from spoken or typed names to mapping entries.
+
+    Every mapping key and alias (English, romanized Hindi or regional names,
+    Devanagari) is indexed by its normalized form, by a phonetic key that
+    folds romanization variants, and by character trigrams of both. A lookup
+    is a dict access for exact and phonetic matches, then a scan of the
+    longest exactly matching run of words, and only then trigram fuzzy
+    matching over the posting lists, with a word of a longer name as a last
+    resort ("madhya" for Madhya Pradesh). A run that is just a word shared
+    by several names ("dal") ranks below fuzzy matches of the whole query,
+    and fuzzy matches of very different length are scaled down, so a city
+    such as "bengaluru" does not resolve to West Bengal. Results are memoized.
+    """
+
+    def __init__(self, mapping: Mapping[str, Dict[str, Any]], aliases: Optional[Mapping[str, Iterable[str]]] = None):
+        self.mapping = mapping
+        self._exact: Dict[str, str] = {}
+        self._phonetic: Dict[str, str] = {}
+        self._forms: List[Tuple[str, str]] = []  # (form, mapping key)
+        # Trigrams of each form, and postings from trigram to form positions, per spelling:
+        # "plain" is the normalized form without spaces, "phonetic" its phonetic key
+        self._grams: Dict[str, List[Counter]] = {"plain": [], "phonetic": []}
+        self._postings: Dict[str, Dict[str, List[int]]] = {"plain": {}, "phonetic": {}}
+        self._words: Dict[str, Set[str]] = {}
+        self._memo: Dict[str, List[Dict[str, Any]]] = {}
+
+        names = [(key, key) for key in mapping]
+        for key, key_aliases in (aliases or {}).items():
+            if key not in mapping:
+                raise KeyError(f"Alias group for unknown entry '{key}'")
+            names.extend((alias, key) for alias in key_aliases)
+
+        for name, key in names:
+            form = normalize_name(name)
+            if not form:
+                continue
+            self._exact.setdefault(form, key)
+            phonetic = phonetic_key(form)
+            self._phonetic.setdefault(phonetic, key)
+            for kind, spelling in (("plain", form.replace(" ", "")), ("phonetic", phonetic)):
+                grams = trigrams(spelling)
+                for gram in grams:
+                    self._postings[kind].setdefault(gram, []).append(len(self._forms))
+                self._grams[kind].append(grams)
+            self._forms.append((form, key))
+            for word in form.split():
+                if len(word) >= 3:
+                    self._words.setdefault(phonetic_key(word), set()).add(key)
+
+        self._max_words = max((len(form.split()) for form, _ in self._forms), default=1)
+
+    def candidates(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Ranked mapping entries for a query
+
+        Returns:
+            list: Up to ``limit`` dicts with key, score (0-1), matched (the
+            alias that matched) and method (exact, phonetic, partial, fuzzy or word),
+            best first and one per mapping entry
+        """
+        form = normalize_name(query)
+        memo_key = f"{limit}|{form}"
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+
+        ranked: Dict[str, Dict[str, Any]] = {}
+
+        def add(key: str, score: float, matched: str, method: str):
+            if key not in ranked or ranked[key]["score"] < score:
+                ranked[key] = {"key": key, "score": round(score, 3), "matched": matched, "method": method}
+
+        if form:
+            if form in self._exact:
+                add(self._exact[form], EXACT_SCORE, form, "exact")
+            phonetic = phonetic_key(form)
+            if phonetic in self._phonetic:
+                add(self._phonetic[phonetic], PHONETIC_SCORE, form, "phonetic")
+
+            # The longest run of words that is itself a known name ("wheat from karnataka mandi")
+            words = form.split()
+            if not ranked and len(words) > 1:
+                for size in range(min(self._max_words, len(words) - 1), 0, -1):
+                    for start in range(len(words) - size + 1):
+                        span = " ".join(words[start:start + size])
+                        key = self._exact.get(span) or self._phonetic.get(phonetic_key(span))
+                        if key is not None and len(span) >= 3:
+                            generic = size == 1 and len(self._words.get(phonetic_key(span), ())) > 1
+                            add(key, GENERIC_PARTIAL_SCORE if generic else PARTIAL_SCORE, span, "partial")
+                    if ranked:
+                        break
+
+            for key, score, matched in self._fuzzy(form.replace(" ", ""), phonetic):
+                add(key, min(score, FUZZY_MAX_SCORE), matched, "fuzzy")
+
+            if not ranked or max(c["score"] for c in ranked.values()) < MIN_ACCEPT_SCORE:
+                for word in words:
+                    keys = self._words.get(phonetic_key(word), ())
+                    for key in keys:
+                        # A word shared by several names ("pradesh") only suggests them
+                        add(key, WORD_SCORE if len(keys) == 1 else MIN_CANDIDATE_SCORE, word, "word")
+
+        result = sorted(ranked.values(), key=lambda c: -c["score"])[:limit]
+        if len(self._memo) > 4096:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+    def resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        """Mapping entry of the best candidate, or None when none is good enough or it is ambiguous"""
+        candidates = self.candidates(query, limit=2)
+        if not candidates or candidates[0]["score"] < MIN_ACCEPT_SCORE:
+            return None
+        best = candidates[0]
+        if best["score"] < PHONETIC_SCORE and len(candidates) > 1 and best["score"] - candidates[1]["score"] < AMBIGUITY_MARGIN:
+            return None
+        return self.mapping[best["key"]]
+
+    def _fuzzy(self, plain: str, phonetic: str) -> List[Tuple[str, float, str]]:
+        """Best trigram similarity of each form over its plain and phonetic spelling"""
+        best: Dict[int, float] = {}
+        for kind, spelling in (("plain", plain), ("phonetic", phonetic)):
+            query_grams = trigrams(spelling)
+            form_grams = self._grams[kind]
+            shared: Counter = Counter()
+            for gram, count in query_grams.items():
+                for position in self._postings[kind].get(gram, ()):
+                    shared[position] += min(count, form_grams[position][gram])
+
+            query_size = sum(query_grams.values())
+            for position, overlap in shared.items():
+                # Trigram counts are the padded length, so this compares the lengths of the two spellings
+                form_size = sum(form_grams[position].values())
+                score = 2 * overlap / (query_size + form_size)
+                ratio = min(query_size, form_size) / max(query_size, form_size)
+                if ratio < FUZZY_MIN_LENGTH_RATIO:
+                    score *= ratio
+                if score > best.get(position, 0.0):
+                    best[position] = score
+
+        matches = []
+        for position, score in best.items():
+            if score >= MIN_CANDIDATE_SCORE:
+                form, key = self._forms[position]
+                matches.append((key, score, form))
+        return matches
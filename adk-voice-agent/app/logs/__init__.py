@@ -0,0 +1,23 @@
+# Logs Package
+
+"""
+Structured, queued logging for the websocket hot path.
+"""
+
+from .structured import (
+    EventLogger,
+    LogSettings,
+    configure_logging,
+    dropped_records,
+    get_logger,
+    shutdown_logging,
+)
+
+__all__ = [
+    "EventLogger",
+    "LogSettings",
+    "configure_logging",
+    "dropped_records",
+    "get_logger",
+    "shutdown_logging",
+]
@@ -0,0 +1,203 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Root of the app's loggers, "kisaan.ws", "kisaan.sessions", ...
+ROOT_LOGGER = "kisaan"
+
+# Records waiting for the writer thread; beyond this new records are dropped
+MAX_QUEUED_RECORDS = 10000
+
+# Default share of events logged per sampled category
+DEFAULT_SAMPLE_RATES = {"audio_in": 0.01, "audio_out": 0.01}
+
+
+def _parse_sample_rates(value: str) -> Dict[str, float]:
+    """'audio_out=0.05,audio_in=0' -> {"audio_out": 0.05, "audio_in": 0.0}"""
+    rates = {}
+    for item in value.split(","):
+        category, _, rate = item.partition("=")
+        try:
+            rates[category.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, message and the record's fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for local development: message then key=value fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            line = f"{line} {fields}"
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The writer thread formats; only resolve what may change or pin frames
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class EventLogger:
+    """
+    Structured logger for one component.
+
+    ``event()`` logs a named event with keyword fields. Categories listed in
+    the sample rates (audio chunks by default) are logged for one in every
+    1/rate events, decided by a counter instead of a random draw, and carry
+    the number of events they stand for as ``sampled``. ``payload()``
+    returns the text itself when payload logging is on and only its length
+    otherwise, so message contents stay out of the logs by default.
+    """
+
+    def __init__(self, logger: logging.Logger, settings: "LogSettings"):
+        self.logger = logger
+        self.settings = settings
+        self._counts: Dict[str, int] = {}
+
+    def event(self, event: str, message: str = "", level: int = logging.INFO, category: Optional[str] = None, **fields: Any):
+        if not self.logger.isEnabledFor(level):
+            return
+        if category is not None:
+            every = self.settings.sample_every(category)
+            if every == 0:
+                return
+            count = self._counts.get(category, 0) + 1
+            if count < every:
+                self._counts[category] = count
+                return
+            self._counts[category] = 0
+            if every > 1:
+                fields["sampled"] = every
+        self.logger.log(level, message or event, extra={"event": event, "fields": fields})
+
+    def debug(self, event: str, message: str = "", **fields: Any):
+        self.event(event, message, logging.DEBUG, **fields)
+
+    def warning(self, event: str, message: str = "", **fields: Any):
+        self.event(event, message, logging.WARNING, **fields)
+
+    def error(self, event: str, message: str = "", exc_info: bool = False, **fields: Any):
+        if exc_info:
+            self.logger.error(message or event, exc_info=True, extra={"event": event, "fields": fields})
+        else:
+            self.event(event, message, logging.ERROR, **fields)
+
+    def payload(self, text: Optional[str]) -> Any:
+        if self.settings.log_payloads:
+            return text
+        return {"chars": len(text or "")}
+
+
+class LogSettings:
+    """
+    Logging configuration from the environment.
+
+        LOG_LEVEL         DEBUG, INFO, WARNING or ERROR (default: INFO)
+        LOG_FORMAT        json or text (default: json)
+        LOG_PAYLOADS      set to 1 to log message texts (default: off)
+        LOG_SAMPLE_RATES  per-category share of events logged, e.g.
+                          "audio_out=0.05,audio_in=0" (default: 0.01 for both)
+    """
+
+    def __init__(self):
+        self.level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.format = os.getenv("LOG_FORMAT", "json").lower()
+        self.log_payloads = os.getenv("LOG_PAYLOADS") == "1"
+        self.sample_rates = dict(DEFAULT_SAMPLE_RATES)
+        self.sample_rates.update(_parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")))
+
+    def sample_every(self, category: str) -> int:
+        """Log one in this many events of a category, 0 for none"""
+        rate = self.sample_rates.get(category, 1.0)
+        if rate <= 0:
+            return 0
+        return max(1, round(1 / rate))
+
+
+settings = LogSettings()
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging():
+    """Routes the app's loggers through a queue to a writer thread, once per process"""
+    global _handler, _listener
+    if _handler is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.format == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_RECORDS)
+    _handler = DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(settings.level)
+    root.addHandler(_handler)
+    root.propagate = False
+
+
+def shutdown_logging():
+    """Writes out the queued records and stops the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def get_logger(name: str) -> EventLogger:
+    """EventLogger for a component, e.g. get_logger("ws") logs as kisaan.ws"""
+    configure_logging()
+    return EventLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"), settings)
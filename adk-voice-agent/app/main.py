@@ -1,52 +1,140 @@
+import os
 import json
 import base64
 import asyncio
+import time
 import subprocess
+import shutil
 import io
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import AsyncIterable
+from typing import AsyncIterable, Optional
 
 from google.genai.types import Blob, Content, Part
 from google.adk.runners import Runner
 from google.adk.agents import LiveRequestQueue
 from google.adk.agents.run_config import RunConfig
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
 
 from fastapi import FastAPI, WebSocket
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.websockets import WebSocketDisconnect
 from pydantic import BaseModel
 from fastapi import Body
 
 from app.jarvis.agent import root_agent
-from dotenv import load_dotenv
 from app.kisaan_info import kisaan_info_agent
 from app.kisaan_info.tools import get_current_weather, get_weather_forecast
+from app.weather import weather_cache, weather_client
+from app.jarvis.sub_agents.mandi_analyst.agent import STATE_MAPPING
+from app.jarvis.sub_agents.mandi_analyst.districts import district_directory
+from app.jarvis.sub_agents.mandi_analyst.price_store import price_store
+from app.sessions import BoundedSessionService, LiveSessionRegistry, instructions_read_state
+from app.logs import dropped_records, get_logger
+from app.metrics import (
+    INPUT_PCM,
+    INPUT_TEXT,
+    INPUT_VOICE_NOTE,
+    TurnTimer,
+    active_connections,
+    audio_encode_seconds,
+    audio_out_bytes,
+    audio_out_frames,
+    audio_out_pcm_bytes,
+    ingress_dropped_seconds,
+    ingress_overflows,
+    instrument_agent,
+    metrics,
+    vad_audio_seconds,
+)
+from app.audio import (
+    PACING_MODES,
+    AudioCoalescer,
+    AudioPacer,
+    BoundedLiveRequestQueue,
+    ChunkedUpload,
+    CODEC_PCM16,
+    CODEC_PCM_F32,
+    FfmpegOpusEncoder,
+    FfmpegStreamDecoder,
+    IngressBudget,
+    IngressOverflow,
+    OutputEncoder,
+    PcmIngestor,
+    VAD_MODES,
+    VAD_OFF,
+    VoiceActivityGate,
+    create_output_encoder,
+    decode_audio_frame,
+    decoder_spares,
+    encode_audio_frame,
+    ingress_backlog_seconds,
+    parse_pcm_mime_type,
+)
 
 #
 # ADK Streaming Setup
 #
-load_dotenv()
 APP_NAME = "adk-streaming-ws"
-session_service = InMemorySessionService()
-
-
-async def start_agent_session(user_id, is_audio=False):
-    """Starts an agent session"""
-
-    # Create a Runner
-    runner = Runner(
-        app_name=APP_NAME,
-        session_service=session_service,
-        agent=root_agent,
-    )
-
-    # Create a Session
-    session = runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-    )
+log = get_logger("ws")
+# Capped, idle sessions expire; set SESSION_DB_PATH to keep them across restarts
+session_service = BoundedSessionService()
+
+# Runners are built once per agent and shared by every connection and request.
+# A Runner only holds the agent tree and services; per-connection state lives
+# in the session and the LiveRequestQueue passed to each run.
+live_runner = Runner(
+    app_name=APP_NAME,
+    session_service=session_service,
+    agent=root_agent,
+)
+weather_runner = Runner(
+    app_name=APP_NAME,
+    session_service=session_service,
+    agent=kisaan_info_agent,
+)
+# Tool call durations per tool, see /metrics
+instrument_agent(root_agent)
+instrument_agent(kisaan_info_agent)
+
+# Audio sample rates expected by the live model
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+
+# Duration of each decoded audio chunk sent to the live model
+PACING_CHUNK_MS = 50
+
+# Agent audio is sent to clients in frames of this duration (0 sends every part as it comes),
+# a partial frame waits at most AUDIO_OUT_MAX_HOLD_MS
+AUDIO_OUT_FRAME_MS = int(os.getenv("AUDIO_OUT_FRAME_MS", "80"))
+AUDIO_OUT_MAX_HOLD_MS = int(os.getenv("AUDIO_OUT_MAX_HOLD_MS", "40"))
+
+# Largest JSON message taken from a client, in bytes; longer voice notes are uploaded in chunks.
+# Keep uvicorn's --ws-max-size at the same value so bigger messages are refused before being buffered
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+
+# Silence trimming before the live model (off, drop or compress, see app.audio.vad), and the
+# silence after which the user is taken to have finished speaking; both can be set per connection
+VAD_MODE = os.getenv("VAD_MODE", VAD_OFF)
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "500"))
+
+# Recorded clips decoded with ffmpeg, m4a from iOS and web recorders, ADTS AAC from Android
+VOICE_NOTE_MIME_TYPES = ("audio/m4a", "audio/aac")
+
+
+@lru_cache(maxsize=32)
+def sample_rate_from_mime_type(mime_type: str, default: int) -> int:
+    """Reads the rate parameter from a mime type such as audio/pcm;rate=24000"""
+    for param in mime_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key == "rate" and value.isdigit():
+            return int(value)
+    return default
+
+
+async def start_live_run(session, is_audio=False):
+    """Starts a live run of the agent on an existing session"""
 
     # Set response modality
     modality = "AUDIO" if is_audio else "TEXT"
@@ -62,11 +150,11 @@ async def start_agent_session(user_id, is_audio=False):
             response_modalities=[modality]
         )
 
-    # Create a LiveRequestQueue for this session
-    live_request_queue = LiveRequestQueue()
+    # Create a LiveRequestQueue for this session, one that tracks the audio waiting in it
+    live_request_queue = BoundedLiveRequestQueue()
 
     # Start agent session
-    live_events = runner.run_live(
+    live_events = live_runner.run_live(
         session=session,
         live_request_queue=live_request_queue,
         run_config=run_config,
@@ -74,22 +162,127 @@ async def start_agent_session(user_id, is_audio=False):
     return live_events, live_request_queue
 
 
-async def agent_to_client_messaging(websocket: WebSocket, live_events):
+# Live runs outlive their websocket for a grace period, see the resume query parameter.
+# Pre-warmed runs connect before anyone claims them, so they are off if an instruction reads session state
+pool_size = None
+if instructions_read_state(root_agent):
+    log.warning("live_pool_disabled", "An agent instruction reads session state, pre-warmed live runs are off")
+    pool_size = 0
+live_sessions = LiveSessionRegistry(session_service, APP_NAME, start_live_run, pool_size=pool_size)
+
+# Session metrics, read when /metrics is scraped
+metrics.gauge("live_sessions", "Live agent runs, attached or within their resume grace period",
+              function=lambda: live_sessions.stats()["live"])
+metrics.gauge("live_sessions_detached", "Live agent runs waiting for their client to reconnect",
+              function=lambda: live_sessions.stats()["detached"])
+metrics.gauge("live_pool_available", "Pre-warmed live runs ready to be claimed", ["modality"],
+              function=lambda: {("audio",): live_sessions.stats()["pool_audio"], ("text",): live_sessions.stats()["pool_text"]})
+metrics.counter("live_pool_claims_total", "New conversations by whether a pre-warmed run was available", ["result"],
+                function=lambda: {("hit",): live_sessions.pool_hits, ("miss",): live_sessions.pool_misses})
+metrics.gauge("decoder_spares_available", "Idle ffmpeg processes ready to decode a voice note",
+              function=lambda: decoder_spares.stats()["available"])
+metrics.counter("decoder_spare_claims_total", "Voice notes by whether an idle ffmpeg process was ready", ["result"],
+                function=lambda: {("hit",): decoder_spares.hits, ("miss",): decoder_spares.misses})
+metrics.counter("weather_cache_lookups_total", "Weather lookups by cache result, coalesced ones shared an in-flight fetch", ["result"],
+                function=lambda: {("hit",): weather_cache.hits, ("miss",): weather_cache.misses,
+                                  ("coalesced",): weather_cache.coalesced})
+metrics.gauge("weather_cache_entries", "Weather responses held in the cache", function=lambda: weather_cache.stats()["entries"])
+metrics.counter("weather_cache_evictions_total", "Weather responses evicted because the cache was full",
+                function=lambda: weather_cache.evictions)
+metrics.counter("log_records_dropped_total", "Log records dropped because the log queue was full",
+                function=dropped_records)
+metrics.gauge("session_store_sessions", "Sessions held in memory", function=lambda: session_service.stats()["sessions"])
+metrics.gauge("voice_ingress_backlog_seconds", "Client audio waiting for the live model, by stage", ["stage"],
+              function=ingress_backlog_seconds)
+metrics.gauge("session_store_bytes", "Approximate size of the sessions held in memory",
+              function=lambda: session_service.stats()["bytes"])
+
+
+def audio_sender(websocket: WebSocket, binary_audio: bool):
+    """Builds the callback that sends one payload of an encoder to the client"""
+    transport = "binary" if binary_audio else "json"
+    sequence = 0
+
+    async def send_audio_frame(encoder: OutputEncoder, payload: bytes, sample_rate: int):
+        nonlocal sequence
+        if binary_audio:
+            await websocket.send_bytes(encode_audio_frame(payload, sequence, sample_rate, encoder.frame_codec))
+        else:
+            message = {
+                "mime_type": encoder.mime_type,
+                "data": base64.b64encode(payload).decode("ascii"),
+            }
+            await websocket.send_text(json.dumps(message))
+        sequence += 1
+        audio_out_frames.inc(transport=transport, codec=encoder.codec)
+        audio_out_bytes.inc(len(payload), transport=transport, codec=encoder.codec)
+        log.event("audio_out", category="audio_out", bytes=len(payload), sequence=sequence)
+
+    return send_audio_frame
+
+
+def audio_output(
+    websocket: WebSocket,
+    binary_audio: bool,
+    codec: str = "pcm",
+    sample_rate: Optional[int] = None,
+    frame_ms: int = AUDIO_OUT_FRAME_MS,
+):
+    """
+    Builds a connection's outbound audio chain: coalescer, encoder, websocket
+
+    Returns:
+        tuple: (writer, encoder), the AudioCoalescer takes the agent's PCM parts
+
+    Raises:
+        ValueError: If the codec or output rate is not supported
+    """
+    send_audio_frame = audio_sender(websocket, binary_audio)
+
+    async def send_encoded(payload: bytes, payload_rate: int):
+        # Frames are labelled with the codec and mime type of the encoder built below
+        await send_audio_frame(encoder, payload, payload_rate)
+
+    encoder = create_output_encoder(codec, send_encoded, sample_rate)
+
+    async def encode_audio_frame(pcm: bytes, pcm_rate: int):
+        audio_out_pcm_bytes.inc(len(pcm), codec=encoder.codec)
+        spent = encoder.encode_seconds
+        await encoder.write(pcm, pcm_rate)
+        audio_encode_seconds.inc(encoder.encode_seconds - spent, codec=encoder.codec)
+
+    writer = AudioCoalescer(
+        encode_audio_frame, frame_ms, AUDIO_OUT_MAX_HOLD_MS, on_flush=encoder.flush, on_discard=encoder.reset
+    )
+    return writer, encoder
+
+
+async def agent_to_client_messaging(
+    websocket: WebSocket,
+    live_events,
+    binary_audio=False,
+    timer: TurnTimer = None,
+    writer: AudioCoalescer = None,
+):
     """Agent to client communication"""
+    timer = timer or TurnTimer()
+    writer = writer or audio_output(websocket, binary_audio)[0]
     full_text_response = ""
     async for event in live_events:
         part: Part = event.content and event.content.parts and event.content.parts[0]
+        audio_sent = False
         
-        # Always stream audio immediately
+        # Stream audio through the coalescer, the first part of a reply goes out immediately
         if part and part.inline_data and part.inline_data.mime_type.startswith("audio/pcm"):
             audio_data = part.inline_data.data
+            audio_sent = bool(audio_data)
             if audio_data:
-                message = {
-                    "mime_type": "audio/pcm",
-                    "data": base64.b64encode(audio_data).decode("ascii"),
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"[AGENT TO CLIENT]: audio/pcm: {len(audio_data)} bytes.")
+                sample_rate = sample_rate_from_mime_type(
+                    part.inline_data.mime_type, OUTPUT_SAMPLE_RATE
+                )
+                await writer.write(audio_data, sample_rate)
+
+        timer.agent_event(audio_sent)
 
         # Buffer text, overwriting partial transcripts with the latest, most complete one
         if part and part.text:
@@ -97,11 +290,18 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events):
 
         # At the end of a turn (either completed or interrupted), send the buffered text and the signal
         if event.turn_complete or event.interrupted:
+            if event.interrupted:
+                # Speech of an interrupted reply is stale, drop what is still held or being encoded
+                await writer.discard()
+            else:
+                # Audio still held for the turn goes out before the signal
+                await writer.flush()
+
             # Send the complete text message if we have any
             if full_text_response:
                 text_message = {"mime_type": "text/plain", "data": full_text_response}
                 await websocket.send_text(json.dumps(text_message))
-                print(f"[AGENT TO CLIENT]: Full text/plain: {full_text_response}")
+                log.event("text_out", text=log.payload(full_text_response))
             
             # Send the completion signal
             completion_message = {
@@ -109,76 +309,257 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events):
                 "interrupted": event.interrupted,
             }
             await websocket.send_text(json.dumps(completion_message))
-            print(f"[AGENT TO CLIENT]: {completion_message}")
+            log.event("turn_end", **completion_message)
+            timer.turn_finished(bool(event.interrupted))
             
             # Reset for the next turn
             full_text_response = ""
 
 
+# Binary frame codecs accepted from clients
+BINARY_PCM_FORMATS = {CODEC_PCM16: "int16", CODEC_PCM_F32: "float32"}
+
+
+def send_binary_audio_frame(
+    frame: bytes,
+    live_request_queue: LiveRequestQueue,
+    ingestor: PcmIngestor,
+    timer: TurnTimer,
+    received_at: float,
+    vad: Optional[VoiceActivityGate] = None,
+):
+    """Forwards a binary audio frame from the client to the agent, a malformed frame is dropped"""
+    try:
+        codec, sample_rate, sequence, payload = decode_audio_frame(frame)
+    except ValueError as e:
+        log.warning("audio_frame_dropped", str(e), bytes=len(frame))
+        return
+    if codec not in BINARY_PCM_FORMATS:
+        log.warning("audio_frame_dropped", "Codec not supported", sequence=sequence, codec=codec)
+        return
+    send_client_pcm(
+        payload, sample_rate, BINARY_PCM_FORMATS[codec], 1, live_request_queue, ingestor, timer, received_at, vad
+    )
+
+
+def send_client_pcm(
+    data: bytes,
+    sample_rate: int,
+    sample_format: str,
+    channels: int,
+    live_request_queue: LiveRequestQueue,
+    ingestor: PcmIngestor,
+    timer: TurnTimer,
+    received_at: float,
+    vad: Optional[VoiceActivityGate] = None,
+):
+    """Converts client PCM to 16 kHz mono int16 in-process and forwards it to the agent, minus the silence the VAD trims"""
+    try:
+        pcm = ingestor.convert(data, sample_rate, sample_format, channels)
+    except ValueError as e:
+        log.warning("audio_dropped", str(e))
+        return
+    if vad is not None and pcm:
+        pcm, speech_ended = vad.process(pcm)
+        if speech_ended:
+            # Answer latency is measured from here, the model gets the end padding right away
+            timer.input_ended(INPUT_PCM)
+            log.event("speech_ended", trimmed_ms=vad.trimmed_ms)
+    if pcm:
+        timer.decoded(INPUT_PCM, received_at)
+        live_request_queue.send_realtime(Blob(data=pcm, mime_type="audio/pcm"))
+        timer.sent_to_agent()
+        log.event("audio_in", category="audio_in", bytes=len(pcm), sample_rate=sample_rate)
+
+
+def realtime_sender(live_request_queue: LiveRequestQueue, timer: TurnTimer, vad: Optional[VoiceActivityGate] = None):
+    """Builds the pacer callback that sends one PCM chunk to the agent"""
+
+    def send_pcm_chunk(chunk: bytes):
+        if vad is not None:
+            # A voice note's end is already known, only its silence is trimmed
+            chunk, _ = vad.process(chunk)
+            if not chunk:
+                return
+        live_request_queue.send_realtime(Blob(data=chunk, mime_type="audio/pcm"))
+        timer.sent_to_agent()
+
+    return send_pcm_chunk
+
+
+async def receive_voice_note_chunk(
+    websocket: WebSocket,
+    message: dict,
+    decoder: FfmpegStreamDecoder,
+    pacer: AudioPacer,
+    upload: ChunkedUpload,
+    timer: TurnTimer,
+    received_at: float,
+):
+    """
+    Feeds one chunk of a voice note upload to the decoder as it arrives
+
+    Chunk 0 starts the clip and the chunk with "end" set finishes it, so
+    ffmpeg decodes while the rest is still being uploaded. An out of order
+    chunk drops the clip and is reported to the client.
+    """
+    upload_id, seq = message.get("upload_id"), message["seq"]
+    try:
+        if seq == 0:
+            if upload.active:
+                log.warning("voice_note_abandoned", upload_id=upload.upload_id, chunks=upload.chunks)
+                await abandon_upload(decoder, pacer, upload, timer)
+            upload.start(upload_id)
+            timer.voice_note_received(received_at)
+        else:
+            upload.check(upload_id, seq)
+
+        chunk = base64.b64decode(message["data"])
+        await decoder.feed(chunk)
+        upload.received(len(chunk))
+        log.debug("voice_note_chunk", upload_id=upload_id, seq=seq, bytes=len(chunk))
+
+        if message.get("end"):
+            chunks, upload_bytes = upload.chunks, upload.bytes
+            upload.finish()
+            pcm_bytes = await decoder.end_stream()
+            pacer.flush()
+            timer.input_ended(INPUT_VOICE_NOTE)
+            log.event("voice_note_decoded", upload_id=upload_id, chunks=chunks, bytes=upload_bytes, pcm_bytes=pcm_bytes)
+
+    except ValueError as e:
+        log.warning("voice_note_chunk_rejected", str(e), upload_id=upload_id, seq=seq)
+        await abandon_upload(decoder, pacer, upload, timer)
+        await websocket.send_text(json.dumps({"upload_id": upload_id, "error": str(e)}))
+    except Exception as e:
+        log.error("voice_note_failed", f"Error decoding upload {upload_id} with ffmpeg: {e}")
+        if upload.active:
+            await abandon_upload(decoder, pacer, upload, timer)
+
+
+async def abandon_upload(decoder: FfmpegStreamDecoder, pacer: AudioPacer, upload: ChunkedUpload, timer: TurnTimer):
+    """Drops a voice note whose upload will not be finished, with the PCM it already produced"""
+    upload.abandon()
+    await decoder.abort_stream()
+    pacer.clear()
+    timer.voice_note_abandoned()
+
+
 async def client_to_agent_messaging(
-    websocket: WebSocket, live_request_queue: LiveRequestQueue
+    websocket: WebSocket,
+    live_request_queue: LiveRequestQueue,
+    decoder: FfmpegStreamDecoder,
+    pacer: AudioPacer,
+    binary_audio=False,
+    timer: TurnTimer = None,
+    vad: Optional[VoiceActivityGate] = None,
+    ingress: Optional[IngressBudget] = None,
 ):
     """Client to agent communication"""
+    timer = timer or TurnTimer()
+    ingestor = PcmIngestor(target_rate=INPUT_SAMPLE_RATE)
+    upload = ChunkedUpload()
     try:
         while True:
-            message_json = await websocket.receive_text()
-            message = json.loads(message_json)
+            # Stop reading, drop or give up when too much audio is waiting for the model
+            if ingress is not None:
+                await ingress.admit()
+            received = await websocket.receive()
+            received_at = time.perf_counter()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+
+            # Binary frames carry raw audio when negotiated for this connection
+            if received.get("bytes") is not None:
+                if not binary_audio:
+                    log.warning("audio_frame_dropped", "Binary audio frames were not negotiated for this connection",
+                                bytes=len(received["bytes"]))
+                    continue
+                send_binary_audio_frame(received["bytes"], live_request_queue, ingestor, timer, received_at, vad)
+                continue
+
+            if len(received["text"]) > WS_MAX_MESSAGE_BYTES:
+                log.warning("message_too_large", bytes=len(received["text"]), limit=WS_MAX_MESSAGE_BYTES)
+                await websocket.send_text(json.dumps({
+                    "error": f"Message larger than {WS_MAX_MESSAGE_BYTES} bytes, upload voice notes in chunks",
+                }))
+                continue
+
+            message = json.loads(received["text"])
             mime_type = message["mime_type"]
             data = message["data"]
 
             if mime_type == "text/plain":
                 content = Content(role="user", parts=[Part.from_text(text=data)])
+                timer.decoded(INPUT_TEXT, received_at)
                 live_request_queue.send_content(content=content)
-                print(f"[CLIENT TO AGENT]: {data}")
+                timer.sent_to_agent()
+                timer.input_ended(INPUT_TEXT)
+                log.event("text_in", text=log.payload(data))
 
-            elif mime_type == "audio/m4a":
-                print(f"[CLIENT TO AGENT]: Received audio/m4a, converting with ffmpeg...")
+            elif mime_type.startswith("audio/pcm"):
+                try:
+                    sample_rate, sample_format, channels = parse_pcm_mime_type(mime_type)
+                except ValueError:
+                    log.warning("mime_type_malformed", mime_type=mime_type)
+                    continue
+                send_client_pcm(
+                    base64.b64decode(data), sample_rate, sample_format, channels,
+                    live_request_queue, ingestor, timer, received_at, vad,
+                )
+
+            elif mime_type in VOICE_NOTE_MIME_TYPES:
+                if "seq" in message:
+                    await receive_voice_note_chunk(websocket, message, decoder, pacer, upload, timer, received_at)
+                    continue
+
+                log.event("voice_note_in", bytes=len(data))
                 try:
-                    decoded_data = base64.b64decode(data)
-                    
-                    ffmpeg_command = [
-                        'ffmpeg', '-i', 'pipe:0', '-f', 's16le', '-ar', '16000', '-ac', '1', 'pipe:1'
-                    ]
-                    
-                    process = await asyncio.create_subprocess_exec(
-                        *ffmpeg_command,
-                        stdin=asyncio.subprocess.PIPE,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    
-                    pcm_data, stderr_data = await process.communicate(input=decoded_data)
-                    
-                    if process.returncode != 0:
-                        print(f"ffmpeg error (code {process.returncode}): {stderr_data.decode()}")
-                        continue
-
-                    print(f"ffmpeg conversion successful, streaming {len(pcm_data)} bytes of PCM data.")
-
-                    chunk_size = 4096
-                    for i in range(0, len(pcm_data), chunk_size):
-                        chunk = pcm_data[i:i+chunk_size]
-                        live_request_queue.send_realtime(Blob(data=chunk, mime_type="audio/pcm"))
-                        await asyncio.sleep(0.01)
-
-                    print("[CLIENT TO AGENT]: Finished streaming converted PCM data.")
+                    if upload.active:
+                        await abandon_upload(decoder, pacer, upload, timer)
+                    timer.voice_note_received(received_at)
+                    await decoder.feed(base64.b64decode(data))
+                    pcm_bytes = await decoder.end_stream()
+                    pacer.flush()
+                    timer.input_ended(INPUT_VOICE_NOTE)
+                    log.event("voice_note_decoded", pcm_bytes=pcm_bytes)
 
                 except Exception as e:
-                    print(f"Error processing audio/m4a with ffmpeg: {e}")
+                    log.error("voice_note_failed", f"Error processing {mime_type} with ffmpeg: {e}")
             else:
-                raise ValueError(f"Mime type not supported: {mime_type}")
+                log.warning("mime_type_unsupported", mime_type=mime_type)
 
     except WebSocketDisconnect:
-        print("Client disconnected normally")
+        log.event("client_disconnected")
+    except IngressOverflow as e:
+        log.warning("ingress_overflow", str(e), policy=ingress.policy)
+        await websocket.close(code=1008, reason="Too much audio waiting for the agent")
     except Exception as e:
-        print(f"Error in client_to_agent_messaging: {e}")
-        import traceback
-        traceback.print_exc()
+        log.error("client_to_agent_failed", f"Error in client_to_agent_messaging: {e}", exc_info=True)
+    finally:
+        if upload.uploads_completed or upload.uploads_abandoned:
+            log.event("upload_stats", **upload.stats())
 
 #
 # FastAPI Web Application
 #
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms local lookup data and live sessions on startup and releases shared clients on shutdown"""
+    await district_directory.warm(state["state_id"] for state in STATE_MAPPING.values())
+    live_sessions.start_pool()
+    yield
+    await district_directory.close()
+    await price_store.aclose()
+    # Closes the price database and flushes the archive
+    price_store.close()
+    await weather_client.aclose()
+    await decoder_spares.close()
+    live_sessions.close()
+    session_service.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 STATIC_DIR = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -190,69 +571,179 @@ async def root():
     return FileResponse(str(STATIC_DIR / "index.html"))
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Serves pipeline latencies, tool durations and session counts in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, is_audio: str):
-    """Client websocket endpoint"""
+async def websocket_endpoint(
+    websocket: WebSocket,
+    user_id: int,
+    is_audio: str,
+    transport: str = "json",
+    pacing: str = "paced",
+    resume: Optional[str] = None,
+    audio_frame_ms: int = AUDIO_OUT_FRAME_MS,
+    codec: str = "pcm",
+    audio_rate: Optional[int] = None,
+    vad: str = VAD_MODE,
+    vad_end_ms: int = VAD_END_SILENCE_MS,
+):
+    """Client websocket endpoint
+
+    Audio travels as base64 inside JSON by default. Connecting with
+    ?transport=binary switches audio in both directions to binary frames
+    (see app.audio.framing) while control and text messages stay JSON.
+    ?pacing=paced|burst selects how decoded voice notes are released to
+    the agent (see app.audio.pacing). ?audio_frame_ms= sets the duration of
+    the agent audio frames sent to the client, 0 sends every part as it
+    comes (see app.audio.coalescing). ?codec=pcm|mulaw|opus and
+    ?audio_rate=24000|16000|8000 choose how agent audio is encoded (see
+    app.audio.encoding); opus is always 24 kHz and refuses another
+    audio_rate, and falls back to mulaw when ffmpeg is missing.
+    ?vad=off|drop|compress trims silence from the audio sent to the live
+    model and ?vad_end_ms= sets the silence that ends an utterance (see
+    app.audio.vad).
+
+    Voice notes (audio/m4a, audio/aac) can be sent whole or, to be decoded
+    while they upload, as chunks {"mime_type": ..., "upload_id": ...,
+    "seq": 0, 1, ..., "end": true on the last, "data": <base64>}. JSON
+    messages over WS_MAX_MESSAGE_BYTES are refused with an "error" reply.
+
+    The first message is {"resume_token": ..., "resumed": ..., "audio":
+    {"codec": ..., "mime_type": ...}}. Reconnecting
+    with ?resume=<token> continues the same conversation, on the same live
+    stream if it is still within its grace period (see app.sessions.live).
+    """
 
     # Wait for client connection
     await websocket.accept()
-    print(f"Client #{user_id} connected, audio mode: {is_audio}")
-
-    # Start agent session
+    if pacing not in PACING_MODES:
+        await websocket.close(code=1003, reason=f"Invalid pacing mode: {pacing}")
+        return
+    if audio_frame_ms < 0:
+        await websocket.close(code=1003, reason=f"Invalid audio frame duration: {audio_frame_ms}")
+        return
+    if vad not in VAD_MODES:
+        await websocket.close(code=1003, reason=f"Invalid VAD mode: {vad}")
+        return
+    try:
+        # Silence is trimmed before the live model when asked for
+        gate = None if vad == VAD_OFF else VoiceActivityGate(vad, INPUT_SAMPLE_RATE, end_silence_ms=vad_end_ms)
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+    binary_audio = transport == "binary"
+    if codec == "opus" and shutil.which("ffmpeg") is None:
+        log.warning("codec_unavailable", "ffmpeg not found, sending mu-law instead of opus", user_id=user_id)
+        codec = "mulaw"
+    try:
+        # Agent audio parts are combined into frames and encoded before they are sent
+        writer, encoder = audio_output(websocket, binary_audio, codec, audio_rate, audio_frame_ms)
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+    log.event("connected", user_id=user_id, is_audio=is_audio, transport=transport, codec=encoder.mime_type, vad=vad)
+
+    # Start or resume the agent session
     user_id_str = str(user_id)
-    live_events, live_request_queue = await start_agent_session(
-        user_id_str, is_audio == "true"
+    live, attachment = await live_sessions.attach(user_id_str, is_audio == "true", resume)
+    live_request_queue = live.live_request_queue
+    timer = TurnTimer()
+    await websocket.send_text(json.dumps({
+        "resume_token": live.token,
+        "resumed": live.resumed,
+        "audio": {"codec": encoder.codec, "mime_type": encoder.mime_type},
+    }))
+    if live.resumed:
+        log.event("resumed", user_id=user_id, session_id=live.session.id)
+
+    # Decoded audio is paced to the agent on its own task
+    pacer = AudioPacer(
+        send=realtime_sender(live_request_queue, timer, gate),
+        sample_rate=INPUT_SAMPLE_RATE,
+        chunk_ms=PACING_CHUNK_MS,
+        mode=pacing,
     )
+    pacer.start()
+    # Bounds the audio this connection has waiting for the model, see INGRESS_* settings
+    ingress = IngressBudget(live_request_queue, pacer)
+
+    # One ffmpeg decoder per session, its processes come from the shared spare pool on the first voice note
+    decoder = FfmpegStreamDecoder(on_pcm=timer.wrap_pcm(pacer.feed))
+    if is_audio == "true" and isinstance(encoder, FfmpegOpusEncoder):
+        await encoder.start()
 
     # Start tasks
     agent_to_client_task = asyncio.create_task(
-        agent_to_client_messaging(websocket, live_events)
+        agent_to_client_messaging(websocket, live.events(attachment), binary_audio, timer, writer)
     )
     client_to_agent_task = asyncio.create_task(
-        client_to_agent_messaging(websocket, live_request_queue)
-    )
-
-    # Wait until the websocket is disconnected or an error occurs
-    done, pending = await asyncio.wait(
-        [agent_to_client_task, client_to_agent_task],
-        return_when=asyncio.FIRST_COMPLETED,
+        client_to_agent_messaging(websocket, live_request_queue, decoder, pacer, binary_audio, timer, gate, ingress)
     )
+    superseded_task = asyncio.create_task(attachment.wait())
+    active_connections.inc()
 
-    for task in pending:
-        task.cancel()
-    for task in done:
-        task.result()
+    try:
+        # Wait until the websocket is disconnected, a reconnect takes over or an error occurs
+        done, pending = await asyncio.wait(
+            [agent_to_client_task, client_to_agent_task, superseded_task],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
 
-    # Close LiveRequestQueue
-    live_request_queue.close()
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.result()
+        if superseded_task in done:
+            await websocket.close(code=1000, reason="Resumed on another connection")
+    finally:
+        # Stop the decoder, pacer and writer, the live run stays up for a reconnect
+        await decoder.close()
+        log.event("pacing_stats", user_id=user_id, **pacer.stats())
+        await pacer.close()
+        ingress.close()
+        ingress_overflows.inc(ingress.overflows, policy=ingress.policy)
+        ingress_dropped_seconds.inc(ingress.dropped_seconds)
+        log.event("ingress_stats", user_id=user_id, **ingress.stats())
+        if gate is not None:
+            vad_audio_seconds.inc(gate.frames_sent * gate.frame_ms / 1000, mode=gate.mode, outcome="sent")
+            vad_audio_seconds.inc(gate.trimmed_ms / 1000, mode=gate.mode, outcome="trimmed")
+            log.event("vad_stats", user_id=user_id, **gate.stats())
+        await writer.close()
+        spent = encoder.encode_seconds
+        await encoder.close()
+        audio_encode_seconds.inc(encoder.encode_seconds - spent, codec=encoder.codec)
+        log.event("audio_out_stats", user_id=user_id, **writer.stats(), **encoder.stats())
+        live_sessions.detach(live, attachment)
+        active_connections.dec()
 
     # Disconnected
-    print(f"Client #{user_id} disconnected")
+    log.event("disconnected", user_id=user_id)
 
 
 async def get_kisaan_info_weather_response(lat: float, lon: float, days: int = 1, user_id: str = "weather_user") -> str:
     """Get summarized weather response from kisaan_info_agent for given lat/lon/days."""
-    from google.genai.types import Content, Part
-    from google.adk.runners import Runner
-
-    runner = Runner(
-        app_name=APP_NAME,
-        session_service=session_service,
-        agent=kisaan_info_agent,
-    )
-    
-    # Get or create session
-    session = session_service.get_session(app_name=APP_NAME, user_id=user_id)
-    if session is None:
-        session = session_service.create_session(app_name=APP_NAME, user_id=user_id, state={})
+    # A session per request, so concurrent requests never share history
+    session = session_service.create_session(app_name=APP_NAME, user_id=user_id, state={})
 
-    # Run the agent with structured input
-    response = await kisaan_info_agent.run(
-        session=session,
-        user_input={"lat": lat, "lon": lon, "days": days}
-    )
-
-    return response.text
+    # The agent's input_schema expects the request as JSON text
+    message = Content(role="user", parts=[Part(text=json.dumps({"lat": lat, "lon": lon, "days": days}))])
+    summary = ""
+    try:
+        async for event in weather_runner.run_async(
+            user_id=user_id,
+            session_id=session.id,
+            new_message=message,
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                summary = "".join(part.text or "" for part in event.content.parts)
+    finally:
+        session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+
+    return summary
 
 class KisaanWeatherRequest(BaseModel):
     lat: float
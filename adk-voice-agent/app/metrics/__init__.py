@@ -0,0 +1,44 @@
+# Metrics Package
+
+"""
+In-process metrics for the voice pipeline, served on /metrics.
+"""
+
+from .registry import LATENCY_BUCKETS, Counter, Gauge, Histogram, MetricsRegistry, metrics
+from .voice import (
+    INPUT_PCM,
+    INPUT_TEXT,
+    INPUT_VOICE_NOTE,
+    TurnTimer,
+    active_connections,
+    audio_encode_seconds,
+    audio_out_bytes,
+    audio_out_frames,
+    audio_out_pcm_bytes,
+    ingress_dropped_seconds,
+    ingress_overflows,
+    instrument_agent,
+    vad_audio_seconds,
+)
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "metrics",
+    "INPUT_PCM",
+    "INPUT_TEXT",
+    "INPUT_VOICE_NOTE",
+    "TurnTimer",
+    "active_connections",
+    "audio_encode_seconds",
+    "audio_out_bytes",
+    "audio_out_frames",
+    "audio_out_pcm_bytes",
+    "ingress_dropped_seconds",
+    "ingress_overflows",
+    "instrument_agent",
+    "vad_audio_seconds",
+]
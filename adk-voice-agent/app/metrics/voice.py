@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.function_tool import FunctionTool
+
+from .registry import metrics
+
+# Input kinds used as the "input" label
+INPUT_TEXT = "text"
+INPUT_PCM = "pcm"  # streamed microphone audio, ends when the model detects it
+INPUT_VOICE_NOTE = "voice_note"  # a recorded clip, ends when it has been decoded
+
+receive_to_decode = metrics.histogram(
+    "voice_receive_to_decode_seconds",
+    "Websocket message received to its payload decoded (PCM converted, voice note's first PCM out of ffmpeg)",
+    ["input"],
+)
+decode_to_agent = metrics.histogram(
+    "voice_decode_to_agent_seconds",
+    "Decoded input to its first chunk sent to the agent",
+    ["input"],
+)
+first_audio = metrics.histogram(
+    "voice_first_audio_seconds",
+    "End of user input to the first agent audio byte sent to the client",
+    ["input"],
+)
+turn_duration = metrics.histogram(
+    "voice_turn_seconds",
+    "End of user input (or the turn's first agent event for streamed audio) to turn_complete",
+    ["input"],
+)
+turns = metrics.counter("voice_turns_total", "Agent turns by how they ended", ["input", "outcome"])
+active_connections = metrics.gauge("voice_active_connections", "Open client websocket connections")
+audio_out_frames = metrics.counter("voice_audio_out_frames_total", "Audio frames sent to clients", ["transport", "codec"])
+audio_out_bytes = metrics.counter(
+    "voice_audio_out_bytes_total", "Encoded audio bytes sent to clients, before base64", ["transport", "codec"]
+)
+audio_out_pcm_bytes = metrics.counter(
+    "voice_audio_out_pcm_bytes_total", "Agent PCM bytes given to the output encoders", ["codec"]
+)
+audio_encode_seconds = metrics.counter(
+    "voice_audio_encode_seconds_total", "CPU time spent encoding output audio (ffmpeg's is added on disconnect)", ["codec"]
+)
+vad_audio_seconds = metrics.counter(
+    "voice_vad_audio_seconds_total", "Client audio seen by the VAD gate, sent or trimmed (added on disconnect)", ["mode", "outcome"]
+)
+ingress_overflows = metrics.counter(
+    "voice_ingress_overflows_total", "Times a connection's audio backlog for the model was full (added on disconnect)", ["policy"]
+)
+ingress_dropped_seconds = metrics.counter(
+    "voice_ingress_dropped_seconds_total", "Client audio dropped because the backlog was full (added on disconnect)"
+)
+tool_duration = metrics.histogram("agent_tool_seconds", "Tool call duration", ["tool", "status"])
+
+
+class TurnTimer:
+    """
+    Timestamps of one connection's current turn, shared by its reader and writer.
+
+    The reader reports when a message arrived, was decoded and went to the
+    agent and when user input ended; the writer reports agent events. Each
+    stage is observed once per input or turn.
+    """
+
+    def __init__(self):
+        self.input = INPUT_PCM
+        self._decoded_at: Optional[float] = None
+        self._decoded_input = INPUT_PCM
+        self._note_received_at: Optional[float] = None
+        self._input_end: Optional[float] = None
+        self._turn_start: Optional[float] = None
+        self._audio_pending = False
+
+    def decoded(self, input: str, received_at: float):
+        now = time.perf_counter()
+        receive_to_decode.observe(now - received_at, input=input)
+        self._decoded_at = now
+        self._decoded_input = input
+
+    def sent_to_agent(self):
+        if self._decoded_at is not None:
+            decode_to_agent.observe(time.perf_counter() - self._decoded_at, input=self._decoded_input)
+            self._decoded_at = None
+
+    def input_ended(self, input: str):
+        self.input = input
+        self._input_end = time.perf_counter()
+        self._audio_pending = True
+
+    def agent_event(self, has_audio: bool):
+        now = time.perf_counter()
+        if self._turn_start is None:
+            self._turn_start = now
+        if has_audio and self._audio_pending:
+            first_audio.observe(now - self._input_end, input=self.input)
+            self._audio_pending = False
+
+    def turn_finished(self, interrupted: bool):
+        start = self._input_end if self._input_end is not None else self._turn_start
+        if start is not None:
+            turn_duration.observe(time.perf_counter() - start, input=self.input)
+        turns.inc(input=self.input, outcome="interrupted" if interrupted else "complete")
+        self.input = INPUT_PCM
+        self._input_end = None
+        self._turn_start = None
+        self._audio_pending = False
+
+    def voice_note_received(self, received_at: float):
+        if self._note_received_at is None:
+            self._note_received_at = received_at
+
+    def voice_note_abandoned(self):
+        self._note_received_at = None
+
+    def wrap_pcm(self, on_pcm: Callable[[bytes], Awaitable[None]]) -> Callable[[bytes], Awaitable[None]]:
+        """Decoder callback that reports a voice note's first PCM as decoded"""
+
+        async def on_decoded_pcm(pcm: bytes):
+            if self._note_received_at is not None:
+                self.decoded(INPUT_VOICE_NOTE, self._note_received_at)
+                self._note_received_at = None
+            await on_pcm(pcm)
+
+        return on_decoded_pcm
+
+
+def _time_tool(tool: BaseTool):
+    """
+    Wraps a tool's run_async so every call is observed
+
+    ADK skips the after-tool callback when a tool raises, so the call is
+    timed around run_async instead: a call that raises counts as an error,
+    one cancelled with its connection as cancelled.
+    """
+    if getattr(tool, "_timed", False):
+        return
+    run_async = tool.run_async
+
+    async def timed_run_async(*, args: Dict[str, Any], tool_context) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await run_async(args=args, tool_context=tool_context)
+            if not (isinstance(response, dict) and (response.get("status") == "error" or "error" in response)):
+                status = "ok"
+            return response
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            tool_duration.observe(time.perf_counter() - started, tool=tool.name, status=status)
+
+    tool.run_async = timed_run_async
+    tool._timed = True
+
+
+def instrument_agent(agent: BaseAgent):
+    """Times the tool calls of an agent and its sub-agents (also those wrapped in an AgentTool)"""
+    if isinstance(agent, LlmAgent):
+        for i, tool in enumerate(agent.tools):
+            if not isinstance(tool, BaseTool):
+                # ADK wraps plain functions in a new FunctionTool on every request, wrap them once here instead
+                tool = agent.tools[i] = FunctionTool(tool)
+            _time_tool(tool)
+            if isinstance(tool, AgentTool):
+                instrument_agent(tool.agent)
+    for sub_agent in agent.sub_agents:
+        instrument_agent(sub_agent)
@@ -0,0 +1,15 @@
+# Sessions Package
+
+"""
+Session storage shared by the agent runners.
+"""
+
+from .live import LiveSession, LiveSessionRegistry, instructions_read_state
+from .store import BoundedSessionService
+
+__all__ = [
+    "BoundedSessionService",
+    "LiveSession",
+    "LiveSessionRegistry",
+    "instructions_read_state",
+]
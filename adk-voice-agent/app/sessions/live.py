@@ -0,0 +1,432 @@
+import asyncio
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LiveRequestQueue
+from google.adk.events.event import Event
+from google.adk.sessions.session import Session
+
+from app.logs import get_logger
+
+from .store import BoundedSessionService
+
+log = get_logger("sessions")
+
+# Starts a live run on a session: (session, is_audio) -> (live_events, live_request_queue)
+LiveStarter = Callable[[Session, bool], Awaitable[Tuple[AsyncIterator[Event], LiveRequestQueue]]]
+
+# Tokens of expired live sessions kept to resume their session (not their stream)
+MAX_EXPIRED_TOKENS = 10000
+
+# Placeholder owner of pre-warmed sessions until a connection claims them
+POOL_USER_ID = "live-pool"
+
+# A pooled run that ends sooner than this after its launch failed to connect (bad key, model outage);
+# refilling then backs off from POOL_RETRY_SECONDS, doubling, and pauses after POOL_MAX_FAILURES in a row
+POOL_FAILURE_WINDOW = 5.0
+POOL_RETRY_SECONDS = 1.0
+POOL_MAX_FAILURES = 5
+
+# Instruction placeholders ADK fills from session state or artifacts, e.g. {user:name} or {artifact.notes?}
+_STATE_PLACEHOLDER = re.compile(r"{+\s*((app:|user:|temp:)?[A-Za-z_]\w*|artifact\.[^{}]+?)\??\s*}+")
+
+
+def instructions_read_state(agent: BaseAgent) -> bool:
+    """
+    Whether any agent in the tree builds its instruction from session state
+
+    Pre-warmed live runs connect to the model, instructions included, before
+    a user claims them, so they are only safe for agents whose instructions
+    do not depend on the session. Callable instructions count as reading it.
+    """
+    agents = [agent]
+    while agents:
+        current = agents.pop()
+        for instruction in (getattr(current, "instruction", ""), getattr(current, "global_instruction", "")):
+            if callable(instruction) or (instruction and _STATE_PLACEHOLDER.search(instruction)):
+                return True
+        agents.extend(current.sub_agents)
+        agents.extend(tool.agent for tool in getattr(current, "tools", ()) if isinstance(getattr(tool, "agent", None), BaseAgent))
+    return False
+
+
+class LiveSession:
+    """
+    One live run of the agent and the websocket attached to it, if any.
+
+    The run's events are pumped into an outbox by a task of its own, so a
+    websocket can go away and another one pick up the same stream. While
+    attached the pump waits for the client to keep up; while detached it
+    keeps the newest ``buffer_events`` events and drops older ones.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        session: Session,
+        is_audio: bool,
+        live_events: AsyncIterator[Event],
+        live_request_queue: LiveRequestQueue,
+        buffer_events: int,
+    ):
+        self.token = token
+        self.session = session
+        self.is_audio = is_audio
+        self.live_events = live_events
+        self.live_request_queue = live_request_queue
+        self.buffer_events = buffer_events
+        self.resumed = False
+        self.finished = False
+        self.created = time.monotonic()
+
+        self._outbox: deque = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._attachment: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self.expiry: Optional[asyncio.TimerHandle] = None
+        self.on_finished: Optional[Callable[["LiveSession"], None]] = None
+
+    @property
+    def attached(self) -> bool:
+        return self._attachment is not None
+
+    def start(self):
+        self._pump_task = asyncio.create_task(self._pump())
+
+    def attach(self) -> asyncio.Event:
+        """
+        Attaches a new connection, superseding the current one
+
+        Returns:
+            asyncio.Event: set when a later connection takes over this one
+        """
+        if self._attachment is not None:
+            self._attachment.set()
+            self._ready.set()
+        self._attachment = asyncio.Event()
+        return self._attachment
+
+    def detach(self, attachment: asyncio.Event) -> bool:
+        """Detaches a connection, False if it had already been superseded"""
+        if attachment is not self._attachment:
+            return False
+        self._attachment = None
+        self._space.set()
+        return True
+
+    async def events(self, attachment: asyncio.Event) -> AsyncIterator[Event]:
+        """Events of the live run for one connection, ends when it is superseded or the run ends"""
+        while True:
+            while not self._outbox and not self.finished and not attachment.is_set():
+                self._ready.clear()
+                await self._ready.wait()
+            if attachment.is_set() or not self._outbox:
+                return
+            event = self._outbox.popleft()
+            self._space.set()
+            yield event
+
+    def close(self):
+        """Ends the live run, the pump finishes once the model connection closes"""
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        self.live_request_queue.close()
+
+    async def _pump(self):
+        try:
+            async for event in self.live_events:
+                while self.attached and len(self._outbox) >= self.buffer_events:
+                    self._space.clear()
+                    await self._space.wait()
+                if len(self._outbox) >= self.buffer_events:
+                    self._outbox.popleft()
+                self._outbox.append(event)
+                self._ready.set()
+        except Exception as e:
+            log.error("live_run_failed", str(e), session_id=self.session.id)
+        finally:
+            self.finished = True
+            self._ready.set()
+            if self.on_finished is not None:
+                self.on_finished(self)
+
+
+class LiveSessionRegistry:
+    """
+    Live runs by resume token, kept alive for a grace period after a disconnect.
+
+    A client reconnecting with its token within ``grace`` seconds is attached
+    to the same live run, including events produced while it was away. After
+    that, or when it reconnects in the other modality (a live run's modality
+    is fixed), it gets a new live run on the same session, which replays the
+    conversation history to the model. Unknown tokens start a new session.
+
+    New conversations are served from a pool of pre-warmed live runs per
+    modality: the session exists, the run has started and the model
+    connection is being set up before anyone connects. Pooled sessions
+    belong to POOL_USER_ID until claimed, then move to the connecting user,
+    whose ``user:`` state they pick up for later turns and tool calls. The
+    model connection, system instruction included, was set up before the
+    claim, so the pool is only for agents whose instructions do not read
+    session state (see instructions_read_state). Runs older than ``pool_max_age`` are replaced, as
+    the model closes long-lived connections. Runs that fail straight away
+    are retried with exponential backoff, and after POOL_MAX_FAILURES in a
+    row refilling pauses for ``pool_pause`` seconds between attempts.
+
+    Configuration from the environment:
+        LIVE_RESUME_GRACE_SECONDS   how long a detached live run is kept (default: 30)
+        LIVE_RESUME_BUFFER_EVENTS   events buffered while detached (default: 256)
+        LIVE_POOL_SIZE              pre-warmed runs per modality, 0 disables the pool (default: 2)
+        LIVE_POOL_MAX_AGE_SECONDS   age at which a pooled run is replaced (default: 300)
+        LIVE_POOL_PAUSE_SECONDS     wait between refills once they keep failing (default: 60)
+    """
+
+    def __init__(
+        self,
+        session_service: BoundedSessionService,
+        app_name: str,
+        start_live: LiveStarter,
+        grace: Optional[float] = None,
+        buffer_events: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        pool_max_age: Optional[float] = None,
+        pool_pause: Optional[float] = None,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.start_live = start_live
+        self.grace = grace if grace is not None else float(os.getenv("LIVE_RESUME_GRACE_SECONDS", 30))
+        self.buffer_events = buffer_events or int(os.getenv("LIVE_RESUME_BUFFER_EVENTS", 256))
+        self.pool_size = pool_size if pool_size is not None else int(os.getenv("LIVE_POOL_SIZE", 2))
+        self.pool_max_age = pool_max_age or float(os.getenv("LIVE_POOL_MAX_AGE_SECONDS", 300))
+        self.pool_pause = pool_pause or float(os.getenv("LIVE_POOL_PAUSE_SECONDS", 60))
+
+        self.resumed_streams = 0
+        self.resumed_sessions = 0
+        self.pool_hits = 0
+        self.pool_misses = 0
+
+        self._live: Dict[str, LiveSession] = {}
+        self._user_ids: Dict[str, str] = {}
+        # token -> (user_id, session user_id, session_id) of live runs that have ended
+        self._expired: "OrderedDict[str, Tuple[str, str, str]]" = OrderedDict()
+        # Pre-warmed runs by is_audio, oldest first
+        self._pools: Dict[bool, deque] = {False: deque(), True: deque()}
+        self._refill_tasks: Dict[bool, asyncio.Task] = {}
+        # Pooled runs that failed in a row, by is_audio
+        self._pool_failures: Dict[bool, int] = {False: 0, True: 0}
+
+    async def attach(self, user_id: str, is_audio: bool, token: Optional[str] = None) -> Tuple[LiveSession, asyncio.Event]:
+        """
+        Live session for a connecting client
+
+        Args:
+            user_id: The websocket's user id, a token only resumes for the same user
+            is_audio: Whether the connection wants audio responses
+            token: Resume token from an earlier connection, if any
+
+        Returns:
+            tuple: (live session, attachment event set when the connection is superseded)
+        """
+        live = self._live.get(token) if token else None
+        if live is not None and self._user_ids.get(token) == user_id and not live.finished:
+            if live.is_audio == is_audio:
+                if live.expiry is not None:
+                    live.expiry.cancel()
+                    live.expiry = None
+                live.resumed = True
+                self.resumed_streams += 1
+                return live, live.attach()
+            # Same conversation in the other modality
+            self._end(live)
+            session = self.session_service.get_session(
+                app_name=self.app_name, user_id=live.session.user_id, session_id=live.session.id
+            )
+        else:
+            session = self._expired_session(user_id, token)
+            if session is None:
+                token = None
+
+        if session is None:
+            live = self._claim(is_audio, user_id)
+            if live is None:
+                session = self.session_service.create_session(app_name=self.app_name, user_id=user_id)
+                live = await self._launch(session, is_audio)
+        else:
+            self.resumed_sessions += 1
+            live = await self._launch(session, is_audio, token)
+            live.resumed = True
+        self._register(live, user_id)
+        return live, live.attach()
+
+    def detach(self, live: LiveSession, attachment: asyncio.Event):
+        """Parks a live session for the grace period once its connection has gone"""
+        if not live.detach(attachment):
+            return
+        if live.finished or self.grace <= 0:
+            self._end(live)
+            return
+        live.expiry = asyncio.get_running_loop().call_later(self.grace, self._end, live)
+
+    def start_pool(self):
+        """Fills the pools in the background, call from a running event loop"""
+        for is_audio in self._pools:
+            self._refill(is_audio)
+
+    def stats(self):
+        claims = self.pool_hits + self.pool_misses
+        return {
+            "live": len(self._live),
+            "detached": sum(1 for live in self._live.values() if not live.attached),
+            "resumed_streams": self.resumed_streams,
+            "resumed_sessions": self.resumed_sessions,
+            "pool_size": self.pool_size,
+            "pool_audio": sum(1 for live in self._pools[True] if not live.finished),
+            "pool_text": sum(1 for live in self._pools[False] if not live.finished),
+            "pool_failures": sum(self._pool_failures.values()),
+            "pool_hits": self.pool_hits,
+            "pool_misses": self.pool_misses,
+            "pool_hit_rate": self.pool_hits / claims if claims else 0.0,
+        }
+
+    def close(self):
+        for task in self._refill_tasks.values():
+            task.cancel()
+        for pool in self._pools.values():
+            while pool:
+                self._discard(pool.popleft())
+        for live in list(self._live.values()):
+            self._end(live)
+
+    async def _launch(self, session: Session, is_audio: bool, token: Optional[str] = None) -> LiveSession:
+        """Starts a live run on a session and its pump, with no connection attached"""
+        live_events, live_request_queue = await self.start_live(session, is_audio)
+        live = LiveSession(
+            token or secrets.token_urlsafe(18), session, is_audio,
+            live_events, live_request_queue, self.buffer_events,
+        )
+        live.on_finished = self._finished
+        self.session_service.pin(session)
+        live.start()
+        return live
+
+    def _register(self, live: LiveSession, user_id: str):
+        self._expired.pop(live.token, None)
+        self._live[live.token] = live
+        self._user_ids[live.token] = user_id
+
+    def _claim(self, is_audio: bool, user_id: str) -> Optional[LiveSession]:
+        """A warm run from the pool moved to ``user_id``, None when the pool is empty"""
+        if self.pool_size <= 0:
+            return None
+        pool = self._pools[is_audio]
+        live = None
+        while pool:
+            candidate = pool.popleft()
+            if not candidate.finished and time.monotonic() - candidate.created < self.pool_max_age:
+                live = candidate
+                live.expiry.cancel()
+                live.expiry = None
+                self.session_service.reassign(live.session, user_id)
+                break
+            self._discard(candidate)
+        if live is None:
+            self.pool_misses += 1
+        else:
+            self.pool_hits += 1
+        self._refill(is_audio)
+        return live
+
+    def _refill(self, is_audio: bool):
+        if self.pool_size <= 0:
+            return
+        task = self._refill_tasks.get(is_audio)
+        if task is None or task.done():
+            self._refill_tasks[is_audio] = asyncio.create_task(self._fill(is_audio))
+
+    async def _fill(self, is_audio: bool):
+        pool = self._pools[is_audio]
+        while len(pool) < self.pool_size:
+            delay = self._retry_delay(is_audio)
+            if delay:
+                await asyncio.sleep(delay)
+            session = self.session_service.create_session(app_name=self.app_name, user_id=POOL_USER_ID)
+            try:
+                live = await self._launch(session, is_audio)
+            except Exception as e:
+                log.error("pool_fill_failed", f"Error pre-warming live sessions: {e}", is_audio=is_audio)
+                self.session_service.delete_session(app_name=self.app_name, user_id=session.user_id, session_id=session.id)
+                self._failed(is_audio)
+                continue
+            live.expiry = asyncio.get_running_loop().call_later(self.pool_max_age, self._recycle, live)
+            pool.append(live)
+
+    def _retry_delay(self, is_audio: bool) -> float:
+        """Wait before the next pooled launch, growing with the failures in a row"""
+        failures = self._pool_failures[is_audio]
+        if not failures:
+            return 0.0
+        if failures >= POOL_MAX_FAILURES:
+            return self.pool_pause
+        return min(POOL_RETRY_SECONDS * 2 ** (failures - 1), self.pool_pause)
+
+    def _failed(self, is_audio: bool):
+        self._pool_failures[is_audio] += 1
+        if self._pool_failures[is_audio] == POOL_MAX_FAILURES:
+            log.warning(
+                "pool_paused", f"{POOL_MAX_FAILURES} pre-warmed live runs failed in a row, refilling every {self.pool_pause:g} s",
+                is_audio=is_audio,
+            )
+
+    def _recycle(self, live: LiveSession):
+        pool = self._pools[live.is_audio]
+        if live in pool:
+            pool.remove(live)
+            if live.finished and time.monotonic() - live.created < POOL_FAILURE_WINDOW:
+                self._failed(live.is_audio)
+            else:
+                self._pool_failures[live.is_audio] = 0
+            self._discard(live)
+            self._refill(live.is_audio)
+
+    def _discard(self, live: LiveSession):
+        """Ends a pooled run nobody claimed and deletes its session"""
+        live.close()
+        self.session_service.unpin(live.session)
+        self.session_service.delete_session(
+            app_name=self.app_name, user_id=live.session.user_id, session_id=live.session.id
+        )
+
+    def _expired_session(self, user_id: str, token: Optional[str]) -> Optional[Session]:
+        if not token or token not in self._expired:
+            return None
+        expired_user_id, session_user_id, session_id = self._expired[token]
+        if expired_user_id != user_id:
+            return None
+        del self._expired[token]
+        return self.session_service.get_session(app_name=self.app_name, user_id=session_user_id, session_id=session_id)
+
+    def _finished(self, live: LiveSession):
+        if live in self._pools[live.is_audio]:
+            # The model dropped a warm connection, replace it
+            self._recycle(live)
+        elif not live.attached:
+            # A run that ends on its own while parked has nothing left to resume
+            self._end(live)
+
+    def _end(self, live: LiveSession):
+        if self._live.get(live.token) is not live:
+            return
+        live.close()
+        del self._live[live.token]
+        user_id = self._user_ids.pop(live.token)
+        self.session_service.unpin(live.session)
+        self._expired[live.token] = (user_id, live.session.user_id, live.session.id)
+        while len(self._expired) > MAX_EXPIRED_TOKENS:
+            self._expired.popitem(last=False)
@@ -0,0 +1,398 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.sessions.session import Session
+
+from app.logs import get_logger
+
+log = get_logger("sessions")
+
+SessionKey = Tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+def _without_inline_data(event: Event) -> Optional[Event]:
+    """
+    Copy of an event with inline audio/image bytes removed
+
+    Returns the event itself when it has no inline data, and None when
+    nothing but inline data would be left.
+    """
+    if not event.content or not event.content.parts:
+        return event
+    parts = [part for part in event.content.parts if part.inline_data is None]
+    if len(parts) == len(event.content.parts):
+        return event
+    if not parts and not (event.actions and event.actions.state_delta):
+        return None
+    content = event.content.model_copy(update={"parts": parts})
+    return event.model_copy(update={"content": content})
+
+
+class BoundedSessionService(InMemorySessionService):
+    """
+    Session service with a size cap, idle expiry and optional SQLite persistence.
+
+    Sessions live in memory in least-recently-used order. A session idle for
+    longer than ``idle_ttl`` is dropped, and the least recently used one is
+    dropped whenever more than ``max_sessions`` are held. Sessions pinned by
+    an open connection are never dropped. Inline audio is not kept in the
+    stored history (transcriptions are), since live runs append every audio
+    chunk the model sends.
+
+    With a ``db_path``, events and state are also written to SQLite in
+    batches (every ``flush_interval`` seconds or ``batch_size`` pending
+    writes) and a session dropped from memory, or lost in a restart, is
+    loaded back on its next get_session. Persisted sessions are deleted
+    after ``retention`` seconds without updates.
+
+    Configuration from the environment:
+        SESSION_MAX_SESSIONS         sessions held in memory (default: 1000)
+        SESSION_IDLE_TTL_SECONDS     idle time before a session is dropped (default: 1800)
+        SESSION_DB_PATH              SQLite file, unset keeps sessions in memory only
+        SESSION_RETENTION_DAYS       days a persisted session is kept (default: 7)
+        SESSION_FLUSH_INTERVAL_SECONDS  (default: 1.0)
+        SESSION_KEEP_AUDIO           set to 1 to keep inline audio in the history
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        db_path: Optional[Path] = None,
+        retention: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: int = 256,
+        keep_audio: Optional[bool] = None,
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL_SECONDS", 1800))
+        if db_path is None and os.getenv("SESSION_DB_PATH"):
+            db_path = Path(os.getenv("SESSION_DB_PATH"))
+        self.db_path = db_path
+        self.retention = retention or float(os.getenv("SESSION_RETENTION_DAYS", 7)) * 86400
+        self.flush_interval = flush_interval or float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", 1.0))
+        self.batch_size = batch_size
+        self.keep_audio = keep_audio if keep_audio is not None else os.getenv("SESSION_KEEP_AUDIO") == "1"
+
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.restored = 0
+
+        # key -> last access (monotonic), least recently used first
+        self._lru: "OrderedDict[SessionKey, float]" = OrderedDict()
+        self._bytes: Dict[SessionKey, int] = {}
+        self._pinned: Dict[SessionKey, int] = {}
+        self._event_counts: Dict[SessionKey, int] = {}
+
+        self._pending_events: List[Tuple] = []
+        self._dirty: Set[SessionKey] = set()
+        self._pending_deletes: Set[SessionKey] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.db_path is not None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path))
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    last_update_time REAL NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id)
+                );
+                CREATE TABLE IF NOT EXISTS events (
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id, seq)
+                );
+                """
+            )
+        return self._db
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        key = (app_name, user_id, session.id)
+        self._bytes[key] = len(json.dumps(state or {}, default=str))
+        self._event_counts[key] = 0
+        self._pending_deletes.discard(key)
+        self._touch(key)
+        self._mark_dirty(key)
+        self._evict()
+        return session
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        if key not in self._lru and not self._restore(key):
+            return None
+        self._touch(key)
+        return super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._forget(key)
+        if self.db_path is not None:
+            self._dirty.discard(key)
+            self._pending_events = [row for row in self._pending_events if row[:3] != key]
+            self._pending_deletes.add(key)
+            self._schedule_flush()
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        if event.partial or key not in self._lru:
+            return super().append_event(session=session, event=event)
+
+        stored_event = event if self.keep_audio else _without_inline_data(event)
+        if stored_event is None:
+            # Audio-only event: the client already has it, nothing to keep
+            session.last_update_time = event.timestamp
+            return event
+        super().append_event(session=session, event=event)
+        storage_session = self._stored(key)
+        if stored_event is not event and storage_session.events and storage_session.events[-1] is event:
+            storage_session.events[-1] = stored_event
+
+        encoded = stored_event.model_dump_json(exclude_none=True)
+        self._bytes[key] = self._bytes.get(key, 0) + len(encoded)
+        if self.db_path is not None:
+            seq = self._event_counts.get(key, 0)
+            self._pending_events.append((*key, seq, encoded))
+            self._event_counts[key] = seq + 1
+            self._mark_dirty(key)
+        self._touch(key)
+        return event
+
+    def pin(self, session: Session):
+        """Keeps a session in memory while a connection uses it, calls may nest"""
+        key = (session.app_name, session.user_id, session.id)
+        self._pinned[key] = self._pinned.get(key, 0) + 1
+
+    def unpin(self, session: Session):
+        key = (session.app_name, session.user_id, session.id)
+        count = self._pinned.get(key, 0) - 1
+        if count > 0:
+            self._pinned[key] = count
+        else:
+            self._pinned.pop(key, None)
+            self._touch(key)
+        self._evict()
+
+    def reassign(self, session: Session, user_id: str):
+        """
+        Moves a session to another user, e.g. a pre-warmed one claimed by a connection
+
+        ``session``, the copy a live run holds, is re-keyed in place and gets
+        the new user's ``user:`` state, so the run writes under its real owner.
+        """
+        old = (session.app_name, session.user_id, session.id)
+        new = (session.app_name, user_id, session.id)
+        if old == new:
+            return
+        if self.db is not None:
+            self.flush()
+            with self.db:
+                for table in ("sessions", "events"):
+                    self.db.execute(
+                        f"UPDATE {table} SET user_id = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                        (user_id, *old),
+                    )
+        stored = self._stored(old)
+        for mapping in (self._lru, self._bytes, self._pinned, self._event_counts):
+            if old in mapping:
+                mapping[new] = mapping.pop(old)
+        self._forget(old)
+        if stored is not None:
+            stored.user_id = user_id
+            self.sessions.setdefault(new[0], {}).setdefault(user_id, {})[new[2]] = stored
+        session.user_id = user_id
+        self._merge_state(session.app_name, user_id, session)
+
+    def flush(self):
+        """Writes pending events, state and deletions in one transaction"""
+        if self.db is None:
+            return
+        sessions = []
+        for key in self._dirty:
+            stored = self._stored(key)
+            if stored is not None:
+                sessions.append((*key, json.dumps(stored.state, default=str), stored.last_update_time))
+        events, deletes = self._pending_events, list(self._pending_deletes)
+        self._dirty.clear()
+        self._pending_events = []
+        self._pending_deletes.clear()
+
+        with self.db:
+            if deletes:
+                self.db.executemany("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", deletes)
+                self.db.executemany("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", deletes)
+            if sessions:
+                self.db.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", sessions)
+            if events:
+                self.db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)", events)
+        self._prune()
+
+    def stats(self) -> Dict[str, Any]:
+        """Session counts, approximate bytes held and eviction counters"""
+        return {
+            "sessions": len(self._lru),
+            "max_sessions": self.max_sessions,
+            "pinned": len(self._pinned),
+            "bytes": sum(self._bytes.values()),
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "restored": self.restored,
+            "pending_writes": len(self._pending_events) + len(self._dirty) + len(self._pending_deletes),
+        }
+
+    def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _stored(self, key: SessionKey) -> Optional[Session]:
+        return self.sessions.get(key[0], {}).get(key[1], {}).get(key[2])
+
+    def _touch(self, key: SessionKey):
+        self._lru[key] = time.monotonic()
+        self._lru.move_to_end(key)
+
+    def _forget(self, key: SessionKey):
+        self._lru.pop(key, None)
+        self._bytes.pop(key, None)
+        self._event_counts.pop(key, None)
+        self._pinned.pop(key, None)
+        self.sessions.get(key[0], {}).get(key[1], {}).pop(key[2], None)
+        user_sessions = self.sessions.get(key[0], {})
+        if key[1] in user_sessions and not user_sessions[key[1]]:
+            del user_sessions[key[1]]
+
+    def _evict(self):
+        now = time.monotonic()
+        for key, last_access in list(self._lru.items()):
+            if now - last_access <= self.idle_ttl:
+                break
+            if key not in self._pinned:
+                self._drop(key)
+                self.evicted_idle += 1
+
+        unpinned = (key for key in list(self._lru) if key not in self._pinned)
+        while len(self._lru) > self.max_sessions:
+            key = next(unpinned, None)
+            if key is None:
+                break
+            self._drop(key)
+            self.evicted_lru += 1
+
+    def _drop(self, key: SessionKey):
+        """Removes a session from memory, persisted copies stay loadable"""
+        if key in self._dirty:
+            self.flush()
+        self._forget(key)
+
+    def _restore(self, key: SessionKey) -> bool:
+        if self.db is None:
+            return False
+        if key in self._dirty or any(row[:3] == key for row in self._pending_events):
+            self.flush()
+        row = self.db.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+        ).fetchone()
+        if row is None:
+            return False
+        rows = self.db.execute(
+            "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq", key
+        ).fetchall()
+
+        session = Session(
+            app_name=key[0],
+            user_id=key[1],
+            id=key[2],
+            state=json.loads(row[0]),
+            events=[Event.model_validate_json(event) for (event,) in rows],
+            last_update_time=row[1],
+        )
+        self.sessions.setdefault(key[0], {}).setdefault(key[1], {})[key[2]] = session
+        self._bytes[key] = len(row[0]) + sum(len(event) for (event,) in rows)
+        self._event_counts[key] = len(rows)
+        self._touch(key)
+        self.restored += 1
+        self._evict()
+        return True
+
+    def _mark_dirty(self, key: SessionKey):
+        if self.db_path is None:
+            return
+        self._dirty.add(key)
+        if len(self._pending_events) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop, e.g. a script: write through
+            self.flush()
+            return
+        self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            log.error("session_flush_failed", f"Error writing sessions: {e}")
+
+    def _prune(self):
+        """Deletes persisted sessions older than the retention, at most hourly"""
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        expired = self.db.execute(
+            "SELECT app_name, user_id, session_id FROM sessions WHERE last_update_time < ?", (now - self.retention,)
+        ).fetchall()
+        if not expired:
+            return
+        with self.db:
+            self.db.executemany("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", expired)
+            self.db.executemany("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", expired)
@@ -11,7 +11,19 @@ const sessionId = Math.random().toString().substring(10);
 const ws_url = (window.location.protocol === "https:" ? "wss://" : "ws://") + window.location.host + "/ws/" + sessionId;
 let websocket = null;
 let is_audio = false;
+let use_binary_audio = true; // Send audio as binary frames instead of base64 JSON
+let audioSequence = 0; // Frame counter for outgoing binary audio
 let currentMessageId = null; // Track the current message ID during a conversation turn
+let resumeToken = null; // Sent back on reconnect to continue the same conversation
+
+// Codec for the agent's audio, e.g. open the page with ?codec=opus or ?codec=mulaw&audio_rate=8000
+const pageParams = new URLSearchParams(window.location.search);
+let audioCodec = pageParams.get("codec") || "pcm";
+const audioRate = pageParams.get("audio_rate");
+if (audioCodec === "opus" && !("AudioDecoder" in window)) {
+  console.warn("WebCodecs AudioDecoder not available, asking for mu-law instead of opus");
+  audioCodec = "mulaw";
+}
 
 // Get DOM elements
 const messageForm = document.getElementById("messageForm");
@@ -27,9 +39,16 @@ const recordingContainer = document.getElementById("recording-container");
 // WebSocket handlers
 function connectWebsocket() {
   // Connect websocket
-  const wsUrl = ws_url + "?is_audio=" + is_audio;
+  const wsUrl =
+    ws_url +
+    "?is_audio=" + is_audio +
+    "&transport=" + (use_binary_audio ? "binary" : "json") +
+    "&codec=" + audioCodec +
+    (audioRate ? "&audio_rate=" + audioRate : "") +
+    (resumeToken ? "&resume=" + encodeURIComponent(resumeToken) : "");
   console.log("Attempting to connect to:", wsUrl);
   websocket = new WebSocket(wsUrl);
+  websocket.binaryType = "arraybuffer";
 
   // Handle connection open
   websocket.onopen = function () {
@@ -70,16 +89,35 @@ function connectWebsocket() {
 
   // Handle incoming messages
   websocket.onmessage = function (event) {
+    // Binary messages are audio frames, play them directly
+    if (event.data instanceof ArrayBuffer) {
+      const frame = decodeAudioFrame(event.data);
+      typingIndicator.classList.add("visible");
+      if (frame && audioPlayerNode) {
+        playAudioFrame(frame);
+      }
+      return;
+    }
+
     // Parse the incoming message
     const message_from_server = JSON.parse(event.data);
     console.log("[AGENT TO CLIENT] ", message_from_server);
 
+    // The first message carries the token to resume this conversation with
+    if (message_from_server.resume_token) {
+      resumeToken = message_from_server.resume_token;
+      if (message_from_server.audio) {
+        console.log("Agent audio codec:", message_from_server.audio.mime_type);
+      }
+      return;
+    }
+
     // Show typing indicator for first message in a response sequence,
     // but not for turn_complete messages
     if (
       !message_from_server.turn_complete &&
       (message_from_server.mime_type === "text/plain" ||
-        message_from_server.mime_type === "audio/pcm")
+        isAudioMimeType(message_from_server.mime_type))
     ) {
       typingIndicator.classList.add("visible");
     }
@@ -96,8 +134,8 @@ function connectWebsocket() {
     }
 
     // If it's audio, play it
-    if (message_from_server.mime_type === "audio/pcm" && audioPlayerNode) {
-      audioPlayerNode.port.postMessage(base64ToArray(message_from_server.data));
+    if (isAudioMimeType(message_from_server.mime_type) && audioPlayerNode) {
+      playAudioMessage(message_from_server.mime_type, base64ToArray(message_from_server.data));
 
       // If we have an existing message element for this turn, add audio icon if needed
       if (currentMessageId) {
@@ -192,6 +230,18 @@ function connectWebsocket() {
 }
 connectWebsocket();
 
+// Reconnect right away, e.g. to switch the audio mode, keeping the conversation
+function reconnectWebsocket() {
+  if (websocket) {
+    // Drop the handlers so closing does not schedule another reconnect
+    websocket.onclose = null;
+    websocket.onerror = null;
+    websocket.onmessage = null;
+    websocket.close();
+  }
+  connectWebsocket();
+}
+
 // Add submit handler to the form
 function addSubmitHandler() {
   messageForm.onsubmit = function (e) {
@@ -239,6 +289,114 @@ function base64ToArray(base64) {
   return bytes.buffer;
 }
 
+/**
+ * Binary audio framing, mirrors app/audio/framing.py
+ *
+ * Header (big-endian, 8 bytes): version u8, codec u8, sample rate u16, sequence u32
+ */
+const AUDIO_FRAME_VERSION = 1;
+const AUDIO_FRAME_HEADER_SIZE = 8;
+const CODEC_PCM16 = 0;
+
+// Prefix an audio buffer with the binary frame header
+function encodeAudioFrame(buffer, sampleRate, codec = CODEC_PCM16) {
+  const frame = new Uint8Array(AUDIO_FRAME_HEADER_SIZE + buffer.byteLength);
+  const view = new DataView(frame.buffer);
+  view.setUint8(0, AUDIO_FRAME_VERSION);
+  view.setUint8(1, codec);
+  view.setUint16(2, sampleRate);
+  view.setUint32(4, audioSequence);
+  audioSequence = (audioSequence + 1) >>> 0;
+  frame.set(new Uint8Array(buffer), AUDIO_FRAME_HEADER_SIZE);
+  return frame.buffer;
+}
+
+// Split a binary frame into header fields and payload
+function decodeAudioFrame(buffer) {
+  if (buffer.byteLength < AUDIO_FRAME_HEADER_SIZE) {
+    console.error("Audio frame too short:", buffer.byteLength);
+    return null;
+  }
+  const view = new DataView(buffer);
+  if (view.getUint8(0) !== AUDIO_FRAME_VERSION) {
+    console.error("Unsupported audio frame version:", view.getUint8(0));
+    return null;
+  }
+  return {
+    codec: view.getUint8(1),
+    sampleRate: view.getUint16(2),
+    sequence: view.getUint32(4),
+    payload: buffer.slice(AUDIO_FRAME_HEADER_SIZE),
+  };
+}
+
+/**
+ * Agent audio decoding, mirrors app/audio/encoding.py
+ *
+ * PCM16 and mu-law frames go to the player worklet as they are, Opus frames
+ * (uint16 length-prefixed packets) are decoded with WebCodecs first.
+ */
+const CODEC_MULAW = 2;
+const CODEC_OPUS = 3;
+let opusDecoder = null;
+let opusTimestamp = 0;
+
+function isAudioMimeType(mimeType) {
+  return typeof mimeType === "string" && mimeType.startsWith("audio/");
+}
+
+// Sample rate parameter of a mime type such as audio/pcmu;rate=8000
+function mimeTypeRate(mimeType, fallback) {
+  const match = /;\s*rate=(\d+)/.exec(mimeType);
+  return match ? parseInt(match[1], 10) : fallback;
+}
+
+function playAudioFrame(frame) {
+  if (frame.codec === CODEC_OPUS) {
+    decodeOpusPackets(frame.payload);
+  } else {
+    const codec = frame.codec === CODEC_MULAW ? "mulaw" : "pcm16";
+    audioPlayerNode.port.postMessage({ codec, sampleRate: frame.sampleRate, data: frame.payload });
+  }
+}
+
+function playAudioMessage(mimeType, buffer) {
+  if (mimeType.startsWith("audio/opus")) {
+    decodeOpusPackets(buffer);
+  } else {
+    const codec = mimeType.startsWith("audio/pcmu") ? "mulaw" : "pcm16";
+    audioPlayerNode.port.postMessage({ codec, sampleRate: mimeTypeRate(mimeType, 24000), data: buffer });
+  }
+}
+
+function decodeOpusPackets(buffer) {
+  if (!opusDecoder) {
+    opusDecoder = new AudioDecoder({
+      output: (audioData) => {
+        const samples = new Float32Array(audioData.numberOfFrames);
+        audioData.copyTo(samples, { planeIndex: 0, format: "f32-planar" });
+        audioPlayerNode.port.postMessage({ codec: "f32", sampleRate: audioData.sampleRate, data: samples }, [samples.buffer]);
+        audioData.close();
+      },
+      error: (e) => console.error("Opus decoder error:", e),
+    });
+    opusDecoder.configure({ codec: "opus", sampleRate: 48000, numberOfChannels: 1 });
+  }
+  const view = new DataView(buffer);
+  let offset = 0;
+  while (offset + 2 <= buffer.byteLength) {
+    const length = view.getUint16(offset);
+    offset += 2;
+    opusDecoder.decode(new EncodedAudioChunk({
+      type: "key",
+      timestamp: opusTimestamp,
+      data: new Uint8Array(buffer, offset, length),
+    }));
+    opusTimestamp += 20000; // 20 ms packets, in microseconds
+    offset += length;
+  }
+}
+
 /**
  * Audio handling
  */
@@ -308,7 +466,7 @@ startAudioButton.addEventListener("click", () => {
   // Add class to messages container to enable audio styling
   messagesDiv.classList.add("audio-enabled");
 
-  connectWebsocket(); // reconnect with the audio mode
+  reconnectWebsocket(); // reconnect with the audio mode
 });
 
 // Stop audio recording when stop button is clicked
@@ -326,11 +484,7 @@ stopAudioButton.addEventListener("click", () => {
   // Reconnect without audio mode
   is_audio = false;
 
-  // Only reconnect if the connection is still open
-  if (websocket && websocket.readyState === WebSocket.OPEN) {
-    websocket.close();
-    // The onclose handler will trigger reconnection
-  }
+  reconnectWebsocket();
 });
 
 // Audio recorder handler
@@ -338,11 +492,18 @@ function audioRecorderHandler(pcmData) {
   // Only send data if we're still recording
   if (!isRecording) return;
 
-  // Send the pcm data as base64
-  sendMessage({
-    mime_type: "audio/pcm",
-    data: arrayBufferToBase64(pcmData),
-  });
+  if (use_binary_audio) {
+    // Send the pcm data as a binary frame
+    if (websocket && websocket.readyState == WebSocket.OPEN) {
+      websocket.send(encodeAudioFrame(pcmData, audioRecorderContext.sampleRate));
+    }
+  } else {
+    // Send the pcm data as base64
+    sendMessage({
+      mime_type: "audio/pcm",
+      data: arrayBufferToBase64(pcmData),
+    });
+  }
 
   // Log every few samples to avoid flooding the console
   if (Math.random() < 0.01) {
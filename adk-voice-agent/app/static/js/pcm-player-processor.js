@@ -1,7 +1,22 @@
 /**
  * An audio worklet processor that stores the PCM audio data sent from the main thread
  * to a buffer and plays it.
+ *
+ * Messages are either an ArrayBuffer of 16-bit PCM at the context's rate, or
+ * { codec, sampleRate, data } where codec is "pcm16" (ArrayBuffer of Int16),
+ * "mulaw" (ArrayBuffer of G.711 mu-law bytes) or "f32" (Float32Array, e.g.
+ * decoded Opus). Audio at another rate is resampled to the context's rate.
  */
+
+// G.711 mu-law byte -> 16-bit sample
+const MULAW_TABLE = new Int16Array(256);
+for (let i = 0; i < 256; i++) {
+  const u = ~i & 0xff;
+  let t = ((u & 0x0f) << 3) + 0x84;
+  t <<= (u & 0x70) >> 4;
+  MULAW_TABLE[i] = u & 0x80 ? 0x84 - t : t - 0x84;
+}
+
 class PCMPlayerProcessor extends AudioWorkletProcessor {
   constructor() {
     super();
@@ -12,6 +27,10 @@ class PCMPlayerProcessor extends AudioWorkletProcessor {
     this.writeIndex = 0;
     this.readIndex = 0;
 
+    // Resampler state: position of the next output sample and the last input sample
+    this.resamplePosition = 0;
+    this.lastSample = 0;
+
     // Handle incoming messages from main thread
     this.port.onmessage = (event) => {
       // Reset the buffer when 'endOfAudio' message received
@@ -21,14 +40,63 @@ class PCMPlayerProcessor extends AudioWorkletProcessor {
         return;
       }
 
-      // Decode the base64 data to int16 array.
-      const int16Samples = new Int16Array(event.data);
+      // Plain buffers are 16-bit PCM at the context's rate
+      if (event.data instanceof ArrayBuffer) {
+        this._enqueue(new Int16Array(event.data));
+        return;
+      }
 
-      // Add the audio data to the buffer
-      this._enqueue(int16Samples);
+      const { codec, data } = event.data;
+      const rate = event.data.sampleRate || sampleRate;
+      let samples;
+      if (codec === "f32") {
+        samples = data;
+      } else {
+        const ints = codec === "mulaw" ? this._mulawToInt16(new Uint8Array(data)) : new Int16Array(data);
+        samples = new Float32Array(ints.length);
+        for (let i = 0; i < ints.length; i++) {
+          samples[i] = ints[i] / 32768;
+        }
+      }
+      this._enqueueFloat(rate === sampleRate ? samples : this._resample(samples, rate));
     };
   }
 
+  _mulawToInt16(bytes) {
+    const ints = new Int16Array(bytes.length);
+    for (let i = 0; i < bytes.length; i++) {
+      ints[i] = MULAW_TABLE[bytes[i]];
+    }
+    return ints;
+  }
+
+  // Linear interpolation to the context's rate, continuous across messages
+  _resample(samples, rate) {
+    const step = rate / sampleRate;
+    const out = [];
+    let position = this.resamplePosition;
+    while (position < samples.length - 1) {
+      const index = Math.floor(position);
+      const fraction = position - index;
+      const previous = index < 0 ? this.lastSample : samples[index];
+      out.push(previous + (samples[index + 1] - previous) * fraction);
+      position += step;
+    }
+    this.resamplePosition = position - samples.length;
+    this.lastSample = samples[samples.length - 1];
+    return Float32Array.from(out);
+  }
+
+  _enqueueFloat(samples) {
+    for (let i = 0; i < samples.length; i++) {
+      this.buffer[this.writeIndex] = samples[i];
+      this.writeIndex = (this.writeIndex + 1) % this.bufferSize;
+      if (this.writeIndex === this.readIndex) {
+        this.readIndex = (this.readIndex + 1) % this.bufferSize;
+      }
+    }
+  }
+
   // Push incoming Int16 data into our ring buffer.
   _enqueue(int16Samples) {
     for (let i = 0; i < int16Samples.length; i++) {
@@ -0,0 +1,19 @@
+# Weather Package
+
+"""
+Shared Google Weather API client and agent tools.
+"""
+
+from .cache import WeatherCache, geohash, weather_cache
+from .client import WeatherClient, weather_client
+from .tools import get_current_weather, get_weather_forecast
+
+__all__ = [
+    "WeatherCache",
+    "geohash",
+    "weather_cache",
+    "WeatherClient",
+    "weather_client",
+    "get_current_weather",
+    "get_weather_forecast",
+]
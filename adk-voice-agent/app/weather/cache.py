@@ -0,0 +1,186 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Cache kinds, each with its own TTL
+CURRENT = "current"
+FORECAST = "forecast"
+
+
+def geohash(latitude: float, longitude: float, precision: int = 5) -> str:
+    """
+    Encode a coordinate as a geohash string
+
+    Precision 5 is a cell of roughly 4.9 km x 4.9 km, precision 6 roughly
+    1.2 km x 0.6 km.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+class WeatherCache:
+    """
+    Spatially bucketed TTL cache for weather lookups.
+
+    Coordinates are snapped to a grid cell, either a geohash of
+    ``geohash_precision`` characters or a lat/lon grid of ``cell_size_deg``
+    degrees, so nearby callers in the same village share one entry. Entries
+    are keyed on (kind, cell, units_system, extra), expire after the TTL of
+    their kind, and the least recently used entry is evicted once
+    ``max_entries`` is reached. Concurrent misses for the same key share one
+    upstream call (counted as ``coalesced``). Error responses are never cached.
+
+    Defaults come from the environment:
+        WEATHER_CACHE_GEOHASH_PRECISION  geohash length (default: 5)
+        WEATHER_CACHE_CELL_DEGREES       use a rounded lat/lon grid instead
+        WEATHER_CACHE_CURRENT_TTL        seconds (default: 600)
+        WEATHER_CACHE_FORECAST_TTL       seconds (default: 3600)
+        WEATHER_CACHE_MAX_ENTRIES        (default: 2048)
+    """
+
+    def __init__(
+        self,
+        geohash_precision: Optional[int] = None,
+        cell_size_deg: Optional[float] = None,
+        current_ttl: Optional[float] = None,
+        forecast_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        if cell_size_deg is None and os.getenv("WEATHER_CACHE_CELL_DEGREES"):
+            cell_size_deg = float(os.getenv("WEATHER_CACHE_CELL_DEGREES"))
+        self.cell_size_deg = cell_size_deg
+        self.geohash_precision = geohash_precision or int(os.getenv("WEATHER_CACHE_GEOHASH_PRECISION", 5))
+        self.ttls = {
+            CURRENT: current_ttl or float(os.getenv("WEATHER_CACHE_CURRENT_TTL", 600)),
+            FORECAST: forecast_ttl or float(os.getenv("WEATHER_CACHE_FORECAST_TTL", 3600)),
+        }
+        self.max_entries = max_entries or int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", 2048))
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def cell(self, latitude: float, longitude: float) -> Hashable:
+        """Grid cell a coordinate falls in"""
+        if self.cell_size_deg:
+            return (
+                round(latitude / self.cell_size_deg),
+                round(longitude / self.cell_size_deg),
+            )
+        return geohash(latitude, longitude, self.geohash_precision)
+
+    def key(self, kind: str, latitude: float, longitude: float, units_system: str, extra: Tuple = ()) -> Tuple:
+        return (kind, self.cell(latitude, longitude), units_system, extra)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Returns a fresh entry and marks it recently used, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Tuple, value: Dict[str, Any]):
+        """Stores an entry with the TTL of its kind, evicting the LRU entry if full"""
+        self._entries[key] = (time.monotonic() + self.ttls[key[0]], value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(
+        self,
+        kind: str,
+        latitude: float,
+        longitude: float,
+        units_system: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        extra: Tuple = (),
+    ) -> Dict[str, Any]:
+        """
+        Return the cached response for the coordinate's cell, calling ``fetch`` on a miss
+
+        Exceptions raised by ``fetch`` propagate to every caller waiting on it.
+        """
+        key = self.key(kind, latitude, longitude, units_system, extra)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody waited on is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if "error" not in value:
+                self.put(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by the weather tools of every agent
+weather_cache = WeatherCache()
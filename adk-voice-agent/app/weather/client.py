@@ -0,0 +1,86 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+WEATHER_API_BASE_URL = "https://weather.googleapis.com/v1"
+
+
+class WeatherClient:
+    """
+    Async Google Weather API client with a keep-alive connection pool.
+
+    One instance is shared by every agent in the worker. Requests never block
+    the event loop, at most ``max_concurrency`` are in flight at once, and the
+    API key is read from GOOGLE_API_KEY on first use.
+
+    Limits come from the environment when not passed explicitly:
+        WEATHER_MAX_CONNECTIONS      pool size (default: 20)
+        WEATHER_MAX_KEEPALIVE        idle connections kept open (default: 10)
+        WEATHER_MAX_CONCURRENCY      concurrent requests (default: 20)
+        WEATHER_TIMEOUT_SECONDS      total request timeout (default: 10)
+        WEATHER_CONNECT_TIMEOUT_SECONDS  connect timeout (default: 3)
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        api_key: Optional[str] = None,
+    ):
+        self.base_url = base_url or os.getenv("WEATHER_API_BASE_URL", WEATHER_API_BASE_URL)
+        self.max_connections = max_connections or int(os.getenv("WEATHER_MAX_CONNECTIONS", 20))
+        self.max_keepalive = max_keepalive or int(os.getenv("WEATHER_MAX_KEEPALIVE", 10))
+        self.max_concurrency = max_concurrency or int(os.getenv("WEATHER_MAX_CONCURRENCY", 20))
+        self.timeout = timeout or float(os.getenv("WEATHER_TIMEOUT_SECONDS", 10))
+        self.connect_timeout = connect_timeout or float(os.getenv("WEATHER_CONNECT_TIMEOUT_SECONDS", 3))
+        self._api_key = api_key
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @property
+    def api_key(self) -> Optional[str]:
+        if self._api_key is None:
+            self._api_key = os.getenv("GOOGLE_API_KEY")
+        return self._api_key
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        GET a Weather API endpoint and return its JSON body
+
+        Raises:
+            httpx.HTTPError: On connection errors, timeouts and non-2xx responses
+            ValueError: If the response is not valid JSON
+        """
+        async with self._semaphore:
+            response = await self.client.get(path, params={"key": self.api_key, **params})
+            response.raise_for_status()
+            return response.json()
+
+    async def aclose(self):
+        """Closes pooled connections, called on application shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared by root_agent, kisaan_info_agent and the HTTP routes
+weather_client = WeatherClient()
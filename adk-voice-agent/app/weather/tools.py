@@ -0,0 +1,113 @@
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .cache import CURRENT, FORECAST, weather_cache
+from .client import weather_client
+
+
+async def get_current_weather(latitude: float, longitude: float, units_system: str = "METRIC") -> Dict[str, Any]:
+    """
+    Get current weather conditions for a specific location using Google Weather API
+    
+    Args:
+        latitude (float): Latitude coordinate of the location
+        longitude (float): Longitude coordinate of the location
+        units_system (str): Unit system - "METRIC" or "IMPERIAL" (default: "METRIC")
+    
+    Returns:
+        dict: JSON response containing current weather conditions
+    """
+    if not weather_client.api_key:
+        return {
+            "error": "Google Weather API key not found. Please set GOOGLE_API_KEY environment variable."
+        }
+    
+    # Validate units_system parameter
+    if units_system not in ["METRIC", "IMPERIAL"]:
+        return {
+            "error": "Invalid units_system. Must be 'METRIC' or 'IMPERIAL'"
+        }
+    
+    params = {
+        "location.latitude": latitude,
+        "location.longitude": longitude,
+        "unitsSystem": units_system
+    }
+    
+    try:
+        return await weather_cache.get_or_fetch(
+            CURRENT, latitude, longitude, units_system,
+            lambda: weather_client.get("/currentConditions:lookup", params),
+        )
+        
+    except httpx.HTTPError as e:
+        return {
+            "error": f"Failed to fetch weather data: {str(e)}"
+        }
+    except ValueError as e:
+        return {
+            "error": f"Invalid JSON response: {str(e)}"
+        }
+
+
+async def get_weather_forecast(latitude: float, longitude: float, days: int = 10, units_system: str = "METRIC", page_size: Optional[int] = None, page_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get weather forecast for up to 10 days for a specific location using Google Weather API
+    
+    Args:
+        latitude (float): Latitude coordinate of the location
+        longitude (float): Longitude coordinate of the location
+        days (int): Number of days to forecast (1-10, default: 10)
+        units_system (str): Unit system - "METRIC" or "IMPERIAL" (default: "METRIC")
+        page_size (int, optional): Number of days per page (default: 5)
+        page_token (str, optional): Token for pagination to get next page of results
+    
+    Returns:
+        dict: JSON response containing weather forecast data
+    """
+    if not weather_client.api_key:
+        return {
+            "error": "Google Weather API key not found. Please set GOOGLE_API_KEY environment variable."
+        }
+    
+    # Validate parameters
+    if not 1 <= days <= 10:
+        return {
+            "error": "Invalid days parameter. Must be between 1 and 10."
+        }
+    
+    if units_system not in ["METRIC", "IMPERIAL"]:
+        return {
+            "error": "Invalid units_system. Must be 'METRIC' or 'IMPERIAL'"
+        }
+    
+    params = {
+        "location.latitude": latitude,
+        "location.longitude": longitude,
+        "days": days,
+        "unitsSystem": units_system
+    }
+    
+    # Add optional parameters if provided
+    if page_size is not None:
+        params["pageSize"] = page_size
+    
+    if page_token is not None:
+        params["pageToken"] = page_token
+    
+    try:
+        return await weather_cache.get_or_fetch(
+            FORECAST, latitude, longitude, units_system,
+            lambda: weather_client.get("/forecast/days:lookup", params),
+            extra=(days, page_size, page_token),
+        )
+        
+    except httpx.HTTPError as e:
+        return {
+            "error": f"Failed to fetch forecast data: {str(e)}"
+        }
+    except ValueError as e:
+        return {
+            "error": f"Invalid JSON response: {str(e)}"
+        }
@@ -0,0 +1 @@
+# Benchmarks for the voice agent hot paths
@@ -0,0 +1,126 @@
+"""
+Benchmark: websocket connect to first agent event, per-connection Runner vs. shared Runner.
+
+Both paths run the real jarvis agent tree with its tools; only the live model
+is replaced by StubLiveLlm (--model-connect-ms of setup). Each round opens
+--connections sessions at once, like a traffic spike, and reports the
+latency percentiles from connect to the first event. The shared path is the
+one websocket_endpoint takes, live_sessions.attach() with the pre-warmed pool
+disabled so every connect starts a run on the shared live_runner. Rounds
+alternate between the two paths and every session is deleted afterwards, so
+neither path inherits the other's leftover sessions.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_connect_latency [--connections 200] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+
+from benchmarks.stubs import StubLiveLlm
+
+
+async def per_connection_session(main, user_id: str, is_audio: bool):
+    """The previous session start: a new Runner for every connection"""
+    runner = Runner(
+        app_name=main.APP_NAME,
+        session_service=main.session_service,
+        agent=main.root_agent,
+    )
+    session = runner.session_service.create_session(app_name=main.APP_NAME, user_id=user_id)
+    modality = "AUDIO" if is_audio else "TEXT"
+    if is_audio:
+        run_config = RunConfig(
+            response_modalities=[modality],
+            input_audio_transcription={},
+            output_audio_transcription={},
+        )
+    else:
+        run_config = RunConfig(response_modalities=[modality])
+    live_request_queue = LiveRequestQueue()
+    live_events = runner.run_live(
+        session=session,
+        live_request_queue=live_request_queue,
+        run_config=run_config,
+    )
+    return live_events, live_request_queue.close
+
+
+async def connect_once(main, start_session, user_id: str, is_audio: bool) -> float:
+    start = time.perf_counter()
+    live_events, end_session = await start_session(user_id, is_audio)
+    await live_events.__anext__()
+    elapsed = (time.perf_counter() - start) * 1000
+    # Ending the run closes its queue, drain it so it shuts down in its own context
+    end_session()
+    async for _ in live_events:
+        pass
+    for listed in main.session_service.list_sessions(app_name=main.APP_NAME, user_id=user_id).sessions:
+        main.session_service.delete_session(app_name=main.APP_NAME, user_id=user_id, session_id=listed.id)
+    return elapsed
+
+
+async def spike(main, start_session, name: str, connections: int, is_audio: bool):
+    return await asyncio.gather(*(
+        connect_once(main, start_session, f"bench_{name}_{i}", is_audio) for i in range(connections)
+    ))
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=200, help="Concurrent connects per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--model-connect-ms", type=float, default=0, help="Simulated live model connection setup")
+    parser.add_argument("--audio", action="store_true", help="Use the audio run config")
+    args = parser.parse_args()
+
+    from app import main as app_main
+    app_main.root_agent.model = StubLiveLlm(connect_delay=args.model_connect_ms / 1000)
+
+    # Measure the cold path: no pre-warmed runs, and a detached run ends at once
+    live_sessions = app_main.live_sessions
+    live_sessions.pool_size = 0
+    live_sessions.grace = 0
+
+    async def shared_session(user_id: str, is_audio: bool):
+        live, attachment = await live_sessions.attach(user_id, is_audio)
+        return live.events(attachment), lambda: live_sessions.detach(live, attachment)
+
+    async def per_connection(user_id: str, is_audio: bool):
+        return await per_connection_session(app_main, user_id, is_audio)
+
+    paths = {"per-connection": per_connection, "shared": shared_session}
+    timings = {name: [] for name in paths}
+
+    async def run_rounds():
+        # Warm imports and lazy initialization before measuring either path
+        await spike(app_main, shared_session, "warmup", 5, args.audio)
+        for round_index in range(args.rounds):
+            order = list(paths) if round_index % 2 == 0 else list(reversed(paths))
+            for name in order:
+                timings[name].extend(await spike(app_main, paths[name], name, args.connections, args.audio))
+
+    asyncio.run(run_rounds())
+
+    print(f"{args.connections} concurrent connects x {args.rounds} rounds, model connect {args.model_connect_ms:.0f} ms")
+    print(f"{'runner':>16} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, path_timings in timings.items():
+        print(
+            f"{name:>16} {percentile(path_timings, 50):>8.1f} {percentile(path_timings, 90):>8.1f}"
+            f" {percentile(path_timings, 99):>8.1f} {statistics.mean(path_timings):>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
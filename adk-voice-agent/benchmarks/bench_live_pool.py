@@ -0,0 +1,94 @@
+"""
+Benchmark: connect-to-ready latency with and without the pre-warmed live session pool.
+
+Runs the real jarvis agent tree with StubLiveLlm standing in for the live
+model (--model-connect-ms of connection setup). Clients arrive every
+--interval-ms, stay --hold-ms and leave; "ready" is the first agent event
+reaching the client, i.e. the model connection is up and listening. Each
+pass uses its own LiveSessionRegistry on the app's session service, with
+the pool disabled and with --pool-size warm runs per modality.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_live_pool [--connections 100] [--interval-ms 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.sessions import LiveSessionRegistry
+from benchmarks.stubs import StubLiveLlm
+
+
+async def client(registry: LiveSessionRegistry, user_id: str, is_audio: bool, hold: float) -> float:
+    start = time.perf_counter()
+    live, attachment = await registry.attach(user_id, is_audio)
+    events = live.events(attachment)
+    await events.__anext__()
+    elapsed = (time.perf_counter() - start) * 1000
+    await asyncio.sleep(hold)
+    await events.aclose()
+    registry.detach(live, attachment)
+    return elapsed
+
+
+async def run_pass(app_main, pool_size: int, args) -> tuple:
+    registry = LiveSessionRegistry(
+        app_main.session_service, app_main.APP_NAME, app_main.start_live_run,
+        grace=0, pool_size=pool_size,
+    )
+    registry.start_pool()
+    # Let the pool fill, as it would between server start and the first client
+    await asyncio.sleep(args.model_connect_ms / 1000 * (pool_size + 1) + 0.5)
+
+    tasks = []
+    for i in range(args.connections):
+        tasks.append(asyncio.create_task(
+            client(registry, f"bench_pool{pool_size}_{i}", args.audio, args.hold_ms / 1000)
+        ))
+        await asyncio.sleep(args.interval_ms / 1000)
+    timings = await asyncio.gather(*tasks)
+    stats = registry.stats()
+    registry.close()
+    await asyncio.sleep(0.1)
+    return timings, stats
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--interval-ms", type=float, default=200, help="Time between client arrivals")
+    parser.add_argument("--hold-ms", type=float, default=1000, help="How long each client stays connected")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--model-connect-ms", type=float, default=400, help="Simulated live model connection setup")
+    parser.add_argument("--audio", action="store_true", help="Use the audio run config")
+    args = parser.parse_args()
+
+    from app import main as app_main
+    app_main.root_agent.model = StubLiveLlm(connect_delay=args.model_connect_ms / 1000)
+
+    async def run_passes():
+        return [(pool_size, *await run_pass(app_main, pool_size, args)) for pool_size in (0, args.pool_size)]
+
+    results = asyncio.run(run_passes())
+
+    print(
+        f"{args.connections} clients every {args.interval_ms:.0f} ms, held {args.hold_ms:.0f} ms,"
+        f" model connect {args.model_connect_ms:.0f} ms"
+    )
+    print(f"{'pool':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'hit rate':>9}")
+    for pool_size, timings, stats in results:
+        print(
+            f"{pool_size:>6} {percentile(timings, 50):>8.1f} {percentile(timings, 90):>8.1f}"
+            f" {percentile(timings, 99):>8.1f} {statistics.mean(timings):>8.1f} {stats['pool_hit_rate']:>9.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
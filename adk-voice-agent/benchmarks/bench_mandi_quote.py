@@ -0,0 +1,96 @@
+"""
+Benchmark: one get_mandi_quote call vs. the five-tool mandi_analyst flow.
+
+Every tool call in a live conversation costs a model round trip, simulated
+here with --model-rtt-ms. Agmarknet is replaced by a local stub server with
+--upstream-ms of latency, and the price store / district directory start
+empty (cold) and are then reused (warm).
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_mandi_quote [--model-rtt-ms 700] [--upstream-ms 150]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.stubs import AgmarknetStubHandler, start_stub_server
+
+QUERIES = [
+    ("wheat", "karnataka", "bangalore"),
+    ("rice", "karnataka", ""),
+    ("moong dal", "punjab", "ludhiana"),
+    ("banana", "karnataka", "mysuru"),
+]
+
+
+async def multi_call_flow(agent, commodity: str, state: str, district: str, rtt: float):
+    """The original sequence: one model round trip before each tool and for the answer"""
+    await asyncio.sleep(rtt)
+    commodity_info = agent.get_commodity_id(commodity)
+    await asyncio.sleep(rtt)
+    state_info = agent.get_state_id(state)
+    district_id = 0
+    if district:
+        await asyncio.sleep(rtt)
+        district_id = await agent.get_district_id(state_info["state_id"], district) or 0
+    await asyncio.sleep(rtt)
+    await agent.get_mandi_prices(commodity_info["commodity_id"], state_info["state_id"], district_id)
+    await asyncio.sleep(rtt)
+    await agent.analyze_price_trends(commodity_info["commodity_id"], state_info["state_id"], district_id)
+    await asyncio.sleep(rtt)
+
+
+async def single_call_flow(agent, commodity: str, state: str, district: str, rtt: float):
+    """One model round trip to call get_mandi_quote and one for the answer"""
+    await asyncio.sleep(rtt)
+    await agent.get_mandi_quote(commodity, state, district)
+    await asyncio.sleep(rtt)
+
+
+async def run(agent, flow, rtt: float):
+    timings = []
+    for query in QUERIES:
+        start = time.perf_counter()
+        await flow(agent, *query, rtt)
+        timings.append((time.perf_counter() - start) * 1000)
+    # The pooled client belongs to this run's event loop
+    await agent.price_store.aclose()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-rtt-ms", type=float, default=700, help="Simulated model round trip per tool call")
+    parser.add_argument("--upstream-ms", type=float, default=150, help="Stub agmarknet response delay")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(AgmarknetStubHandler, delay=args.upstream_ms / 1000)
+    rtt = args.model_rtt_ms / 1000
+    results = {}
+    try:
+        for name, flow in (("multi-call", multi_call_flow), ("get_mandi_quote", single_call_flow)):
+            # Fresh stores per flow so both start cold
+            os.environ["AGMARKNET_API_URL"] = base_url + "/api"
+            os.environ["MANDI_DATA_DIR"] = tempfile.mkdtemp()
+            from app.jarvis.sub_agents.mandi_analyst import agent, districts, price_store
+            agent.district_directory = districts.DistrictDirectory(base_url=base_url + "/api")
+            agent.price_store = price_store.PriceStore(base_url=base_url + "/api")
+
+            cold = asyncio.run(run(agent, flow, rtt))
+            warm = asyncio.run(run(agent, flow, rtt))
+            results[name] = (cold, warm)
+    finally:
+        server.shutdown()
+
+    print(f"model round trip {args.model_rtt_ms:.0f} ms, upstream {args.upstream_ms:.0f} ms, {len(QUERIES)} queries")
+    print(f"{'flow':>16} {'cold median ms':>15} {'warm median ms':>15}")
+    for name, (cold, warm) in results.items():
+        print(f"{name:>16} {statistics.median(cold):>15.0f} {statistics.median(warm):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Micro-benchmarks: the pure-Python code that runs on every turn, checked against stored baselines.
+
+Cases:
+    analyze_price_records  price analysis behind analyze_price_trends, on a
+                           30-day and a 1-year agmarknet payload
+    get_commodity_id       exact name, alias, misspelling and unknown name
+    get_state_id           exact name, abbreviation, misspelling and unknown name
+    client_to_agent        20 ms client PCM messages through client_to_agent_messaging,
+                           base64 JSON and binary frames
+    agent_to_client        one spoken turn (50 x 40 ms agent audio chunks, text and
+                           turn_complete) through agent_to_client_messaging, JSON and binary
+    vad_gate               20 ms client PCM chunks through VoiceActivityGate: 1 s of
+                           low noise, 2 s of tone, 1 s of low noise
+
+Each case reports the best of --repeats runs in microseconds per operation.
+Runs alternate with a fixed calibration loop whose best time is stored with
+the baseline; results are compared after scaling by the calibration ratio,
+so a baseline recorded on one machine stays usable on a faster or slower
+one. A case over --threshold is measured once more to rule out a noisy
+neighbour, and the run exits with status 1 if it is still over.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_micro                 # compare with the baseline
+    python -m benchmarks.bench_micro --save          # record a new baseline
+    python -m benchmarks.bench_micro -k agent_to_client --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import random
+import struct
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Keep per-turn log lines out of the report, as in the load test
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.events import Event
+from google.genai.types import Blob, Content, Part
+
+from app import main as app_main
+from app.audio import CODEC_PCM16, VoiceActivityGate, encode_audio_frame
+from app.jarvis.sub_agents.mandi_analyst.agent import analyze_price_records, get_commodity_id, get_state_id
+from benchmarks.stubs import stub_pcm, stub_price_records
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+
+# A case builds its inputs once and returns (operations per run, run)
+CaseSetup = Callable[[], Tuple[int, Callable[[], None]]]
+
+
+def price_payload(days: int, districts: int = 3) -> Dict:
+    """State-level agmarknet response: one record per district per day"""
+    end = date(2025, 6, 30)
+    data = []
+    for i in range(districts):
+        for record in stub_price_records(1 + i, end - timedelta(days=days - 1), end):
+            record["district"] = f"District {i + 1}"
+            data.append(record)
+    data.sort(key=lambda record: record["t"])
+    return {"data": data}
+
+
+def price_case(days: int) -> CaseSetup:
+    def setup():
+        payload = price_payload(days)
+
+        def run():
+            for _ in range(20):
+                analyze_price_records(payload)
+
+        return 20, run
+
+    return setup
+
+
+def lookup_case(lookup: Callable, names: List[str]) -> CaseSetup:
+    def setup():
+        def run():
+            for _ in range(200):
+                for name in names:
+                    lookup(name)
+
+        return 200 * len(names), run
+
+    return setup
+
+
+class ReplayWebSocket:
+    """Replays prepared client messages, then disconnects; everything sent is dropped"""
+
+    def __init__(self, messages: List[Dict]):
+        self._messages = iter(messages)
+
+    async def receive(self) -> Dict:
+        return next(self._messages, {"type": "websocket.disconnect", "code": 1000})
+
+    async def send_text(self, data: str):
+        pass
+
+    async def send_bytes(self, data: bytes):
+        pass
+
+
+def client_to_agent_case(binary: bool) -> CaseSetup:
+    def setup():
+        chunk = stub_pcm(20, 16000)
+        if binary:
+            messages = [
+                {"type": "websocket.receive", "bytes": encode_audio_frame(chunk, sequence, 16000, CODEC_PCM16)}
+                for sequence in range(500)
+            ]
+        else:
+            text = json.dumps({"mime_type": "audio/pcm;rate=16000", "data": base64.b64encode(chunk).decode("ascii")})
+            messages = [{"type": "websocket.receive", "text": text}] * 500
+        loop = asyncio.new_event_loop()
+
+        def run():
+            queue = LiveRequestQueue()
+            loop.run_until_complete(app_main.client_to_agent_messaging(
+                ReplayWebSocket(messages), queue, decoder=None, pacer=None, binary_audio=binary,
+            ))
+
+        return len(messages), run
+
+    return setup
+
+
+def agent_to_client_case(binary: bool) -> CaseSetup:
+    def setup():
+        chunk = stub_pcm(40, 24000)
+        audio = Event(
+            author="jarvis",
+            content=Content(role="model", parts=[Part(inline_data=Blob(data=chunk, mime_type="audio/pcm;rate=24000"))]),
+        )
+        text = Event(author="jarvis", partial=True, content=Content(role="model", parts=[Part(text="Aaj gehun ka bhav 2,150 rupaye quintal hai.")]))
+        complete = Event(author="jarvis", turn_complete=True)
+        turn = [audio] * 50 + [text, complete]
+        loop = asyncio.new_event_loop()
+
+        async def events():
+            for event in turn:
+                yield event
+
+        def run():
+            for _ in range(5):
+                loop.run_until_complete(app_main.agent_to_client_messaging(
+                    ReplayWebSocket([]), events(), binary_audio=binary,
+                ))
+
+        return 5, run
+
+    return setup
+
+
+def vad_case() -> CaseSetup:
+    def setup():
+        rng = random.Random(0)
+        noise = struct.pack("<16000h", *(rng.randint(-30, 30) for _ in range(16000)))
+        stream = noise + stub_pcm(2000, 16000) + noise
+        chunks = [stream[i:i + 640] for i in range(0, len(stream), 640)]
+
+        def run():
+            gate = VoiceActivityGate()
+            for chunk in chunks:
+                gate.process(chunk)
+
+        return len(chunks), run
+
+    return setup
+
+
+CASES: Dict[str, CaseSetup] = {
+    "analyze_price_records[30d]": price_case(30),
+    "analyze_price_records[1y]": price_case(365),
+    "get_commodity_id": lookup_case(get_commodity_id, ["wheat", "gehun", "moong dall", "quinoa"]),
+    "get_state_id": lookup_case(get_state_id, ["karnataka", "UP", "karnatka", "atlantis"]),
+    "client_to_agent[json]": client_to_agent_case(binary=False),
+    "client_to_agent[binary]": client_to_agent_case(binary=True),
+    "agent_to_client[json]": agent_to_client_case(binary=False),
+    "agent_to_client[binary]": agent_to_client_case(binary=True),
+    "vad_gate": vad_case(),
+}
+
+
+def calibrate() -> float:
+    """Seconds for a fixed mix of interpreter work, the unit baselines are scaled by"""
+    record = {"t": "2025-06-30T00:00:00", "p_min": 1900, "p_modal": 2000, "p_max": 2150}
+    start = time.perf_counter()
+    total = 0
+    for i in range(30000):
+        total += i % 7
+    for _ in range(600):
+        json.dumps(record)
+        sorted(record)
+    return time.perf_counter() - start
+
+
+def measure(setup: CaseSetup, repeats: int) -> Tuple[float, float]:
+    """
+    Best time per operation in microseconds, and the best calibration time
+
+    Calibration runs alternate with the case's runs, so both see the same CPU
+    frequency and neighbour load.
+    """
+    operations, run = setup()
+    run()  # warm up
+    best, best_calibration = float("inf"), float("inf")
+    for _ in range(repeats):
+        best_calibration = min(best_calibration, calibrate())
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best / operations * 1e6, best_calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="match", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown against the baseline, 0.25 = 25%%")
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    results = {name: measure(setup, args.repeats) for name, setup in CASES.items() if args.match in name}
+
+    if args.save:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+        stored["python"] = platform.python_version()
+        for name, (us, calibration) in results.items():
+            stored["cases"][name] = {"us_per_op": round(us, 3), "calibration_seconds": round(calibration, 6)}
+            print(f"{name:<30} {us:>10.2f} us/op")
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        sys.exit(f"No baseline at {args.baseline}, record one with --save")
+    baseline = json.loads(args.baseline.read_text())["cases"]
+    print(f"{'case':<30} {'us/op':>10} {'baseline':>10} {'change':>8}")
+
+    regressions = []
+    for name, (us, calibration) in results.items():
+        stored = baseline.get(name)
+        if stored is None:
+            print(f"{name:<30} {us:>10.2f} {'-':>10} {'new':>8}")
+            continue
+        expected = stored["us_per_op"] * calibration / stored["calibration_seconds"]
+        change = us / expected - 1
+        if change > args.threshold:
+            us, calibration = measure(CASES[name], args.repeats)
+            expected = stored["us_per_op"] * calibration / stored["calibration_seconds"]
+            change = us / expected - 1
+        flag = ""
+        if change > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<30} {us:>10.2f} {expected:>10.2f} {change:>+7.0%}{flag}")
+
+    if regressions:
+        sys.exit(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
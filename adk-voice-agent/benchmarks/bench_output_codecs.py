@@ -0,0 +1,79 @@
+"""
+Benchmark: bandwidth and encode CPU of each output codec for agent audio.
+
+Streams --seconds of 24 kHz speech-band PCM through every output encoder
+in --frame-ms frames, as agent_to_client_messaging does, and reports the
+bitrate on the wire (binary frames, and base64 JSON), the share of
+bandwidth saved against raw 24 kHz PCM and the CPU time per second of
+audio. Opus is included when ffmpeg is installed; its CPU is ffmpeg's.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_output_codecs [--seconds 30] [--frame-ms 80]
+"""
+
+import argparse
+import asyncio
+import shutil
+
+import numpy as np
+
+from app.audio import AUDIO_FRAME_HEADER_SIZE, create_output_encoder
+
+CASES = [("pcm", 24000), ("pcm", 16000), ("pcm", 8000), ("mulaw", 16000), ("mulaw", 8000), ("opus", None)]
+
+
+def make_speech(seconds: float, sample_rate: int = 24000) -> bytes:
+    """Harmonics of a moving pitch with a syllable-rate envelope and a little noise"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = 0.15 * voice * envelope + 0.01 * np.random.default_rng(0).standard_normal(t.size)
+    return (np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+async def run_case(codec: str, rate, pcm: bytes, frame_ms: int) -> dict:
+    payloads = []
+
+    async def send(payload: bytes, sample_rate: int):
+        payloads.append(len(payload))
+
+    encoder = create_output_encoder(codec, send, rate)
+    frame_bytes = 24000 * frame_ms // 1000 * 2
+    for i in range(0, len(pcm), frame_bytes):
+        await encoder.write(pcm[i:i + frame_bytes], 24000)
+    # Returns once the last packet was sent
+    await encoder.flush()
+    await encoder.close()
+    stats = encoder.stats()
+    stats["frames"] = len(payloads)
+    stats["binary_bytes"] = sum(payloads) + AUDIO_FRAME_HEADER_SIZE * len(payloads)
+    stats["json_bytes"] = sum(4 * -(-size // 3) + 32 for size in payloads)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--frame-ms", type=int, default=80, help="Coalesced frame duration")
+    args = parser.parse_args()
+
+    pcm = make_speech(args.seconds)
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    print(f"{'codec':<14} {'binary kbps':>12} {'json kbps':>10} {'saved':>7} {'cpu ms/s audio':>15}")
+    for codec, rate in CASES:
+        label = f"{codec} {rate // 1000} kHz" if rate else codec
+        if codec == "opus" and not has_ffmpeg:
+            print(f"{label:<14} {'(no ffmpeg)':>12}")
+            continue
+        stats = asyncio.run(run_case(codec, rate, pcm, args.frame_ms))
+        print(
+            f"{label:<14} {stats['binary_bytes'] * 8 / args.seconds / 1000:>12.1f}"
+            f" {stats['json_bytes'] * 8 / args.seconds / 1000:>10.1f}"
+            f" {stats['bandwidth_saved']:>7.0%} {stats['encode_ms'] / args.seconds:>15.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
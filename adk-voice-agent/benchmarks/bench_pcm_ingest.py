@@ -0,0 +1,84 @@
+"""
+Benchmark: in-process PCM ingestion vs. the ffmpeg subprocess path.
+
+Converts synthetic client audio at every supported rate/format to 16 kHz
+mono int16 and reports input samples processed per second.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.bench_pcm_ingest [--seconds 10] [--chunk-ms 20]
+"""
+
+import argparse
+import asyncio
+import shutil
+import time
+
+import numpy as np
+
+from app.audio.pcm import SAMPLE_FORMATS, SUPPORTED_SAMPLE_RATES, PcmIngestor
+
+FFMPEG_FORMATS = {"int16": "s16le", "float32": "f32le"}
+
+
+def make_signal(sample_rate: int, sample_format: str, seconds: float) -> bytes:
+    """Speech-band test signal with a little noise"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.default_rng(0).standard_normal(t.size)
+    if sample_format == "int16":
+        return (signal * 32767).astype(SAMPLE_FORMATS["int16"]).tobytes()
+    return signal.astype(SAMPLE_FORMATS["float32"]).tobytes()
+
+
+def bench_numpy(data: bytes, sample_rate: int, sample_format: str, chunk_ms: int) -> float:
+    """Returns input samples per second for the NumPy path, fed in client-sized chunks"""
+    ingestor = PcmIngestor()
+    chunk_bytes = sample_rate * chunk_ms // 1000 * SAMPLE_FORMATS[sample_format].itemsize
+    start = time.perf_counter()
+    for i in range(0, len(data), chunk_bytes):
+        ingestor.convert(data[i:i + chunk_bytes], sample_rate, sample_format)
+    elapsed = time.perf_counter() - start
+    return ingestor.samples_in / elapsed
+
+
+async def bench_ffmpeg(data: bytes, sample_rate: int, sample_format: str) -> float:
+    """Returns input samples per second for one ffmpeg process over the whole buffer"""
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", FFMPEG_FORMATS[sample_format], "-ar", str(sample_rate), "-ac", "1",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ar", "16000", "-ac", "1",
+        "pipe:1",
+    ]
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    await process.communicate(input=data)
+    elapsed = time.perf_counter() - start
+    return len(data) // SAMPLE_FORMATS[sample_format].itemsize / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Audio length per case")
+    parser.add_argument("--chunk-ms", type=int, default=20, help="Client buffer size for the NumPy path")
+    args = parser.parse_args()
+
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    print(f"{'rate':>6} {'format':>8} {'numpy samples/s':>16} {'ffmpeg samples/s':>17} {'speedup':>8}")
+    for sample_rate in SUPPORTED_SAMPLE_RATES:
+        for sample_format in SAMPLE_FORMATS:
+            data = make_signal(sample_rate, sample_format, args.seconds)
+            numpy_rate = bench_numpy(data, sample_rate, sample_format, args.chunk_ms)
+            if has_ffmpeg:
+                ffmpeg_rate = asyncio.run(bench_ffmpeg(data, sample_rate, sample_format))
+                print(f"{sample_rate:>6} {sample_format:>8} {numpy_rate:>16,.0f} {ffmpeg_rate:>17,.0f} {numpy_rate / ffmpeg_rate:>7.1f}x")
+            else:
+                print(f"{sample_rate:>6} {sample_format:>8} {numpy_rate:>16,.0f} {'(no ffmpeg)':>17} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
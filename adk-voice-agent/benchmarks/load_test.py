@@ -0,0 +1,309 @@
+"""
+Load test: N concurrent /ws/{user_id} clients against the real app, offline.
+
+Starts the app under uvicorn in a subprocess with every agent's model
+replaced by StubLiveLlm and agmarknet and the Google Weather API by local
+stub servers (see benchmarks.stubs), then opens --connections websockets
+over --ramp-seconds. Each client replays --turns turns cycling through
+--script: "text" sends a message, "audio" streams --utterance-ms of
+microphone PCM in real time as binary frames, "weather" and "mandi" send
+text that makes the stub model call the weather tool or mandi_analyst
+(which calls get_mandi_quote against the agmarknet stub).
+
+Reports connect latency (to the resume token, i.e. the session is
+attached), ready latency (to the greeting), first-response and
+turn-complete latency per turn kind, throughput, and the server's CPU time
+and resident memory per session, sampled from /proc.
+
+Run from the adk-voice-agent directory:
+    python -m benchmarks.load_test [--connections 50] [--turns 6] [--audio]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Per-turn message sent for each script entry
+SCRIPT_TEXTS = {
+    "text": "Which crop should I sow after the monsoon?",
+    "weather": "What is the weather today?",
+    "mandi": "What is the mandi price of wheat in Karnataka?",
+}
+FRAME_MS = 20
+CLIENT_RATE = 16000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def install_stub_models(agent, llm):
+    """Replaces the model of an agent, its sub-agents and agents behind AgentTools"""
+    from google.adk.agents import LlmAgent
+    from google.adk.tools.agent_tool import AgentTool
+
+    if isinstance(agent, LlmAgent):
+        agent.model = llm
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool):
+                install_stub_models(tool.agent, llm)
+    for sub_agent in agent.sub_agents:
+        install_stub_models(sub_agent, llm)
+
+
+def serve(args):
+    """Server side: stubs, stub models and the app under uvicorn"""
+    from benchmarks.stubs import AgmarknetStubHandler, StubLiveLlm, WeatherStubHandler, start_stub_server
+
+    _, agmarknet_url = start_stub_server(AgmarknetStubHandler, args.upstream_ms / 1000)
+    _, weather_url = start_stub_server(WeatherStubHandler, args.upstream_ms / 1000)
+    os.environ["AGMARKNET_API_URL"] = agmarknet_url + "/api"
+    os.environ["WEATHER_API_BASE_URL"] = weather_url
+    os.environ.setdefault("GOOGLE_API_KEY", "load-test")
+    os.environ["MANDI_DATA_DIR"] = tempfile.mkdtemp(prefix="load_test_")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import uvicorn
+    from app import main as app_main
+
+    llm = StubLiveLlm(
+        connect_delay=args.model_connect_ms / 1000,
+        reply_delay=args.model_reply_ms / 1000,
+        utterance_ms=args.utterance_ms,
+        audio_ms=args.reply_audio_ms,
+        chunk_ms=args.reply_chunk_ms,
+    )
+    install_stub_models(app_main.root_agent, llm)
+    install_stub_models(app_main.kisaan_info_agent, llm)
+    uvicorn.run(app_main.app, host="127.0.0.1", port=args.port, log_level="warning", ws_max_size=16 * 1024 * 1024)
+
+
+class ProcessSampler:
+    """CPU time and resident memory of a process, from /proc"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.peak_rss = 0
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15, i.e. 11 and 12 after the command name
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def rss_bytes(self) -> int:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                    self.peak_rss = max(self.peak_rss, rss)
+                    return rss
+        return 0
+
+    async def watch(self, interval: float = 0.2):
+        while True:
+            self.rss_bytes()
+            await asyncio.sleep(interval)
+
+
+class ClientResult:
+    def __init__(self):
+        self.connect_ms = None
+        self.ready_ms = None
+        self.first_response_ms: Dict[str, List[float]] = {}
+        self.turn_ms: Dict[str, List[float]] = {}
+        self.error = None
+
+
+async def next_turn(ws, started: float, result: ClientResult, kind: str):
+    """Reads messages until turn_complete, recording first-response and turn latency"""
+    first = None
+    while True:
+        message = await ws.recv()
+        now = time.perf_counter()
+        if first is None:
+            first = now
+            result.first_response_ms.setdefault(kind, []).append((now - started) * 1000)
+        if isinstance(message, str) and json.loads(message).get("turn_complete") is not None:
+            result.turn_ms.setdefault(kind, []).append((now - started) * 1000)
+            return
+
+
+async def send_utterance(ws, milliseconds: int, sequence: int) -> int:
+    """Streams a tone as microphone PCM in real time, in binary frames"""
+    from app.audio.framing import encode_audio_frame
+    from benchmarks.stubs import stub_pcm
+
+    frame = stub_pcm(FRAME_MS, CLIENT_RATE)
+    start = time.perf_counter()
+    for i in range(milliseconds // FRAME_MS):
+        await ws.send(encode_audio_frame(frame, sequence, CLIENT_RATE))
+        sequence += 1
+        # Real-time pacing against the clock, not per-frame sleeps
+        delay = start + (i + 1) * FRAME_MS / 1000 - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return sequence
+
+
+async def run_client(url: str, script: List[str], turns: int, utterance_ms: int, think: float) -> ClientResult:
+    import websockets
+
+    result = ClientResult()
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            hello = json.loads(await ws.recv())
+            result.connect_ms = (time.perf_counter() - started) * 1000
+            if "resume_token" not in hello:
+                raise ValueError(f"Unexpected first message: {hello}")
+            await next_turn(ws, started, result, "greeting")
+            result.ready_ms = result.turn_ms.pop("greeting")[0]
+            result.first_response_ms.pop("greeting")
+
+            sequence = 0
+            for turn in range(turns):
+                kind = script[turn % len(script)]
+                if kind == "audio":
+                    sequence = await send_utterance(ws, utterance_ms, sequence)
+                else:
+                    await ws.send(json.dumps({"mime_type": "text/plain", "data": SCRIPT_TEXTS[kind]}))
+                await next_turn(ws, time.perf_counter(), result, kind)
+                await asyncio.sleep(think)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return f"{'-':>8} {'-':>8} {'-':>8}"
+    ordered = sorted(values)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return f"{pick(50):>8.1f} {pick(90):>8.1f} {pick(99):>8.1f}"
+
+
+async def drive(args, sampler: ProcessSampler):
+    script = args.script.split(",")
+    query = f"is_audio={'true' if args.audio else 'false'}&transport=binary"
+    # Lazy imports and first-use setup in the server are not what is measured
+    for i in range(args.warmup):
+        url = f"ws://127.0.0.1:{args.port}/ws/{90000 + i}?{query}"
+        await run_client(url, script, len(script), args.utterance_ms, 0)
+    rss_before = sampler.rss_bytes()
+    cpu_before = sampler.cpu_seconds()
+    watcher = asyncio.create_task(sampler.watch())
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(args.connections):
+        url = f"ws://127.0.0.1:{args.port}/ws/{100000 + i}?{query}"
+        tasks.append(asyncio.create_task(run_client(url, script, args.turns, args.utterance_ms, args.think_ms / 1000)))
+        if args.ramp_seconds:
+            await asyncio.sleep(args.ramp_seconds / args.connections)
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    watcher.cancel()
+    cpu_used = sampler.cpu_seconds() - cpu_before
+
+    ok = [result for result in results if result.error is None]
+    errors = [result.error for result in results if result.error is not None]
+    turns_done = sum(len(values) for result in ok for values in result.turn_ms.values())
+    kinds = sorted({kind for result in ok for kind in result.turn_ms})
+
+    print(
+        f"{args.connections} connections ({len(errors)} failed), {args.turns} turns each, script {args.script},"
+        f" {'audio' if args.audio else 'text'} responses, model connect {args.model_connect_ms:.0f} ms,"
+        f" reply {args.model_reply_ms:.0f} ms, upstream {args.upstream_ms:.0f} ms"
+    )
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    print(f"\n{'latency (ms)':<24} {'p50':>8} {'p90':>8} {'p99':>8}")
+    print(f"{'connect':<24} {percentiles([r.connect_ms for r in ok])}")
+    print(f"{'ready (greeting)':<24} {percentiles([r.ready_ms for r in ok])}")
+    for kind in kinds:
+        print(f"{kind + ' first response':<24} {percentiles([v for r in ok for v in r.first_response_ms.get(kind, [])])}")
+        print(f"{kind + ' turn complete':<24} {percentiles([v for r in ok for v in r.turn_ms.get(kind, [])])}")
+    sessions = max(len(ok), 1)
+    print(f"\nthroughput: {turns_done / elapsed:.1f} turns/s, {len(ok) / elapsed:.1f} sessions/s over {elapsed:.1f} s")
+    print(
+        f"server CPU: {cpu_used:.2f} s ({cpu_used / elapsed:.0%} of one core),"
+        f" {cpu_used / sessions * 1000:.1f} ms per session, {cpu_used / max(turns_done, 1) * 1000:.1f} ms per turn"
+    )
+    print(
+        f"server RSS: {rss_before / 2**20:.0f} MB idle, {sampler.peak_rss / 2**20:.0f} MB peak,"
+        f" {(sampler.peak_rss - rss_before) / sessions / 2**10:.0f} KB per session"
+    )
+
+
+async def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=6, help="Turns per connection")
+    parser.add_argument("--script", default="text,audio,weather,mandi", help="Turn kinds to cycle through")
+    parser.add_argument("--audio", action="store_true", help="Ask for audio responses")
+    parser.add_argument("--ramp-seconds", type=float, default=2.0, help="Spread connection starts over this time")
+    parser.add_argument("--think-ms", type=float, default=200, help="Pause between a reply and the next turn")
+    parser.add_argument("--utterance-ms", type=int, default=1000, help="Audio per spoken turn")
+    parser.add_argument("--reply-audio-ms", type=int, default=1000, help="Audio per model answer in audio mode")
+    parser.add_argument("--reply-chunk-ms", type=int, default=40, help="Size of the model's audio parts")
+    parser.add_argument("--model-connect-ms", type=float, default=300)
+    parser.add_argument("--model-reply-ms", type=float, default=300)
+    parser.add_argument("--upstream-ms", type=float, default=100, help="Latency of the weather and agmarknet stubs")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured connections run through the script first")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    args.port = args.port or free_port()
+    forwarded = []
+    arguments = iter(sys.argv[1:])
+    for arg in arguments:
+        if arg == "--port":
+            next(arguments, None)
+        elif not arg.startswith("--port="):
+            forwarded.append(arg)
+    command = [sys.executable, "-m", "benchmarks.load_test", "--serve", *forwarded, "--port", str(args.port)]
+    server = subprocess.Popen(command)
+    try:
+        asyncio.run(wait_for_port(args.port, server))
+        asyncio.run(drive(args, ProcessSampler(server.pid)))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Local stand-ins for the upstream APIs used by the agents.
+
+Each HTTP stub runs a ThreadingHTTPServer on 127.0.0.1 in a daemon thread
+with a configurable response delay, so benchmarks exercise the real HTTP
+clients without leaving the machine. StubLiveLlm replaces the Gemini Live
+model behind an agent: it answers text, streams PCM in audio mode, treats
+every --utterance of received audio as a spoken turn and calls the
+weather and mandi tools when asked, all deterministically.
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import struct
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncGenerator, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.llm_response import LlmResponse
+from google.genai.types import Blob, Content, FunctionCall, Part
+from websockets.exceptions import ConnectionClosedOK
+
+STUB_DISTRICTS = {
+    29: [
+        {"census_district_id": 572, "census_district_name": "Bangalore"},
+        {"census_district_id": 573, "census_district_name": "Bangalore Rural"},
+        {"census_district_id": 577, "census_district_name": "Mysore"},
+        {"census_district_id": 580, "census_district_name": "Belgaum"},
+    ],
+    3: [
+        {"census_district_id": 41, "census_district_name": "Ludhiana"},
+        {"census_district_id": 42, "census_district_name": "Amritsar"},
+    ],
+}
+
+
+def stub_price_records(commodity_id: int, start: date, end: date) -> list:
+    """One deterministic record per day between start and end"""
+    records = []
+    day = start
+    while day <= end:
+        modal = 2000 + (commodity_id * 37 + day.toordinal()) % 200
+        records.append({
+            "t": day.isoformat() + "T00:00:00",
+            "p_min": modal - 100,
+            "p_modal": modal,
+            "p_max": modal + 150,
+            "cmdty": f"Commodity {commodity_id}",
+            "state": "Stub State",
+            "district": "Stub District",
+        })
+        day += timedelta(days=1)
+    return records
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body: Dict[str, Any], status: int = 200):
+        time.sleep(self.delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class AgmarknetStubHandler(_StubHandler):
+    """GET /api/districts?state_id= and POST /api/prices"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/districts"):
+            state_id = int(parse_qs(url.query).get("state_id", ["0"])[0])
+            self._send_json({"data": STUB_DISTRICTS.get(state_id, [])})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if not self.path.endswith("/prices"):
+            self._send_json({"error": "not found"}, 404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        start = datetime.fromisoformat(body["start_date"].rstrip("Z")).date()
+        end = datetime.fromisoformat(body["end_date"].rstrip("Z")).date()
+        self._send_json({"data": stub_price_records(body["commodity_id"], start, end)})
+
+
+class WeatherStubHandler(_StubHandler):
+    """GET /currentConditions:lookup and /forecast/days:lookup of the Google Weather API"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        latitude = float(query.get("location.latitude", ["0"])[0])
+        temperature = round(20 + (latitude * 7) % 15, 1)
+        if url.path.endswith("/currentConditions:lookup"):
+            self._send_json({
+                "currentTime": datetime.utcnow().isoformat() + "Z",
+                "weatherCondition": {"type": "PARTLY_CLOUDY", "description": {"text": "Partly cloudy"}},
+                "temperature": {"degrees": temperature, "unit": "CELSIUS"},
+                "relativeHumidity": 60,
+                "precipitation": {"probability": {"percent": 20, "type": "RAIN"}},
+                "wind": {"speed": {"value": 8, "unit": "KILOMETERS_PER_HOUR"}},
+            })
+        elif url.path.endswith("/forecast/days:lookup"):
+            days = int(query.get("days", ["10"])[0])
+            today = date.today()
+            self._send_json({"forecastDays": [
+                {
+                    "displayDate": {"year": day.year, "month": day.month, "day": day.day},
+                    "maxTemperature": {"degrees": temperature + 6, "unit": "CELSIUS"},
+                    "minTemperature": {"degrees": temperature - 4, "unit": "CELSIUS"},
+                    "daytimeForecast": {"weatherCondition": {"type": "CLEAR"}, "precipitation": {"probability": {"percent": 10}}},
+                }
+                for day in (today + timedelta(days=i) for i in range(days))
+            ]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+
+def start_stub_server(handler_class, delay: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start a stub server on a free port
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done
+    """
+    handler = type(handler_class.__name__, (handler_class,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Sample rates of the live model's audio
+STUB_INPUT_RATE = 16000
+STUB_OUTPUT_RATE = 24000
+
+# Tool calls the stub model makes when a user turn mentions a keyword
+STUB_WEATHER_KEYWORDS = ("weather", "mausam")
+STUB_MANDI_KEYWORDS = ("mandi", "price", "bhav")
+STUB_MANDI_QUOTE = {"commodity": "wheat", "state": "karnataka", "district": "bangalore"}
+
+
+def stub_pcm(milliseconds: int, sample_rate: int = STUB_OUTPUT_RATE) -> bytes:
+    """A 220 Hz tone as 16-bit mono PCM"""
+    samples = sample_rate * milliseconds // 1000
+    return struct.pack(
+        f"<{samples}h", *(int(8000 * math.sin(2 * math.pi * 220 * i / sample_rate)) for i in range(samples))
+    )
+
+
+class StubLiveConnection(BaseLlmConnection):
+    """
+    Live connection that greets once, then answers every user turn until closed
+
+    A user turn is a text message or ``utterance_ms`` of realtime audio.
+    Text mentioning the weather or mandi prices is answered with a call to
+    get_current_weather or mandi_analyst when the agent has that tool, and
+    the tool's response with a summary. In audio mode every answer is
+    ``audio_ms`` of PCM in ``chunk_ms`` pieces before its text.
+    """
+
+    def __init__(
+        self,
+        reply_delay: float = 0.0,
+        audio: bool = False,
+        tools: Tuple[str, ...] = (),
+        utterance_ms: int = 1000,
+        audio_ms: int = 1000,
+        chunk_ms: int = 40,
+        chunk_delay: float = 0.0,
+    ):
+        self.reply_delay = reply_delay
+        self.audio = audio
+        self.tools = set(tools)
+        self.utterance_bytes = STUB_INPUT_RATE * 2 * utterance_ms // 1000
+        self.chunk_delay = chunk_delay
+        self._chunk = stub_pcm(chunk_ms)
+        self._chunks = max(1, audio_ms // chunk_ms)
+        self._heard = 0
+        self._calls = 0
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._turns.put_nowait("Namaste")
+
+    async def send_history(self, history):
+        pass
+
+    async def send_content(self, content: Content):
+        parts = content.parts or []
+        responses = [part.function_response for part in parts if part.function_response]
+        if responses:
+            self._turns.put_nowait(f"Here is what {responses[0].name} found.")
+            return
+        text = parts[0].text if parts and parts[0].text else ""
+        self._turns.put_nowait(self._tool_call(text) or f"You said: {text}")
+
+    async def send_realtime(self, blob):
+        self._heard += len(blob.data)
+        if self._heard >= self.utterance_bytes:
+            milliseconds = self._heard * 1000 // (STUB_INPUT_RATE * 2)
+            self._heard = 0
+            self._turns.put_nowait(f"I heard {milliseconds} ms of audio.")
+
+    async def receive(self) -> AsyncGenerator[LlmResponse, None]:
+        while True:
+            turn = await self._turns.get()
+            if turn is None:
+                # What the Gemini Live websocket raises once closed, it ends the ADK live loop
+                raise ConnectionClosedOK(None, None)
+            await asyncio.sleep(self.reply_delay)
+            if isinstance(turn, FunctionCall):
+                yield LlmResponse(content=Content(role="model", parts=[Part(function_call=turn)]))
+                continue
+            if self.audio:
+                mime_type = f"audio/pcm;rate={STUB_OUTPUT_RATE}"
+                for _ in range(self._chunks):
+                    yield LlmResponse(content=Content(role="model", parts=[Part(inline_data=Blob(mime_type=mime_type, data=self._chunk))]))
+                    await asyncio.sleep(self.chunk_delay)
+            yield LlmResponse(content=Content(role="model", parts=[Part(text=turn)]))
+            yield LlmResponse(turn_complete=True)
+
+    async def close(self):
+        self._turns.put_nowait(None)
+
+    def _tool_call(self, text: str):
+        lowered = text.lower()
+        self._calls += 1
+        if "get_current_weather" in self.tools and any(word in lowered for word in STUB_WEATHER_KEYWORDS):
+            # Move around so the weather cache does not answer every call
+            return FunctionCall(
+                name="get_current_weather",
+                args={"latitude": 10.0 + self._calls % 50 * 0.37, "longitude": 76.0 + self._calls % 20 * 0.29},
+            )
+        if "mandi_analyst" in self.tools and any(word in lowered for word in STUB_MANDI_KEYWORDS):
+            return FunctionCall(name="mandi_analyst", args={"request": text})
+        return None
+
+
+def _is_audio(llm_request) -> bool:
+    config = llm_request.live_connect_config
+    modalities = (config.response_modalities if config else None) or []
+    return any(str(modality).upper().endswith("AUDIO") for modality in modalities)
+
+
+class StubLiveLlm(BaseLlm):
+    """
+    Stand-in for the live model: assign it to an agent's ``model``
+
+    ``connect_delay`` simulates the model's connection setup and
+    ``reply_delay`` its time to first response of a turn. Non-live calls
+    (agents behind an AgentTool) call get_mandi_quote once when the agent
+    has it, then answer in text.
+    """
+
+    model: str = "stub-live"
+    connect_delay: float = 0.0
+    reply_delay: float = 0.0
+    utterance_ms: int = 1000
+    audio_ms: int = 1000
+    chunk_ms: int = 40
+    chunk_delay: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.reply_delay)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        answered = last is not None and any(part.function_response for part in last.parts or [])
+        if not answered and "get_mandi_quote" in llm_request.tools_dict:
+            call = FunctionCall(name="get_mandi_quote", args=dict(STUB_MANDI_QUOTE))
+            yield LlmResponse(content=Content(role="model", parts=[Part(function_call=call)]))
+            return
+        yield LlmResponse(content=Content(role="model", parts=[Part(text="Namaste")]))
+
+    @contextlib.asynccontextmanager
+    async def connect(self, llm_request):
+        await asyncio.sleep(self.connect_delay)
+        connection = StubLiveConnection(
+            self.reply_delay, _is_audio(llm_request), tuple(llm_request.tools_dict),
+            self.utterance_ms, self.audio_ms, self.chunk_ms, self.chunk_delay,
+        )
+        try:
+            yield connection
+        finally:
+            await connection.close()
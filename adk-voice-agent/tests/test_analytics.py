@@ -0,0 +1,141 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.jarvis.sub_agents.mandi_analyst.agent import analyze_price_records
+from app.jarvis.sub_agents.mandi_analyst.analytics import (
+    analyze_arrays_batch,
+    analyze_series,
+    analyze_series_batch,
+    group_records,
+)
+
+
+def baseline_stats(records):
+    """The per-record loop analyze_price_trends used before the vectorized engine"""
+    prices, min_prices, max_prices = [], [], []
+    for item in records:
+        if item.get("p_modal") and item["p_modal"] > 0:
+            modal = float(item["p_modal"])
+            prices.append(modal)
+            min_prices.append(float(item["p_min"]) if item.get("p_min") and item["p_min"] > 0 else modal)
+            max_prices.append(float(item["p_max"]) if item.get("p_max") and item["p_max"] > 0 else modal)
+    if not prices:
+        return None
+
+    average = sum(prices) / len(prices)
+    if len(prices) >= 2:
+        recent = sum(prices[-7:]) / min(7, len(prices))
+        older = sum(prices[:-7]) / max(1, len(prices) - 7) if len(prices) > 7 else average
+        trend = "increasing" if recent > older * 1.05 else "decreasing" if recent < older * 0.95 else "stable"
+    else:
+        trend = "insufficient data"
+    return {
+        "count": len(prices),
+        "current": prices[-1],
+        "current_min": min_prices[-1],
+        "current_max": max_prices[-1],
+        "average": average,
+        "overall_min": min(min_prices),
+        "overall_max": max(max_prices),
+        "trend": trend,
+        "modal": prices,
+    }
+
+
+def random_series(rng: random.Random, days: int, drift: float):
+    records = []
+    price = rng.uniform(1500, 3000)
+    for day in range(days):
+        price *= 1 + drift + rng.uniform(-0.03, 0.03)
+        record = {
+            "t": f"2026-01-{day + 1:02d}T00:00:00",
+            "p_min": price * 0.9,
+            "p_modal": price,
+            "p_max": price * 1.1,
+            "cmdty": "Wheat",
+            "district": f"D{rng.randint(1, 3)}",
+        }
+        # Missing and zero prices, as agmarknet sometimes sends
+        roll = rng.random()
+        if roll < 0.1:
+            record["p_modal"] = 0
+        elif roll < 0.2:
+            record["p_min"] = None
+        elif roll < 0.25:
+            record["p_max"] = 0
+        records.append(record)
+    return records
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_the_baseline_loop(seed):
+    rng = random.Random(seed)
+    records = random_series(rng, rng.randint(1, 31), rng.choice([-0.02, 0.0, 0.02]))
+    expected = baseline_stats(records)
+    stats = analyze_series(records)
+
+    if expected is None:
+        assert stats == {"count": 0}
+        return
+    for name in ("count", "current", "current_min", "current_max", "average", "overall_min", "overall_max"):
+        assert stats[name] == pytest.approx(expected[name]), name
+    assert stats["trend"] == expected["trend"]
+
+    modal = np.array(expected["modal"])
+    for percentile, value in stats["percentiles"].items():
+        assert value == pytest.approx(np.percentile(modal, percentile))
+    changes = np.diff(modal) / modal[:-1] * 100
+    assert stats["volatility"] == pytest.approx(np.std(changes) if changes.size else 0.0)
+
+
+def test_batch_matches_single_series():
+    rng = random.Random(7)
+    series = {name: random_series(rng, 20, 0.01) for name in ("a", "b", "c")}
+    series["a"][-1]["p_modal"] = 2500.0
+    series["empty"] = []
+    batch = analyze_series_batch(series)
+    for name, records in series.items():
+        single = analyze_series(records)
+        assert batch[name].keys() == single.keys()
+        for field, value in single.items():
+            if isinstance(value, float):
+                assert batch[name][field] == pytest.approx(value), field
+    assert batch["empty"] == {"count": 0}
+    assert batch["a"]["last_date"] == series["a"][-1]["t"]
+    assert batch["a"]["current"] == 2500.0
+
+
+def test_arrays_skip_missing_days():
+    modal = np.array([100.0, np.nan, 110.0, 0.0, 120.0])
+    stats = analyze_arrays_batch({"k": (modal * 0.9, modal, modal * 1.1)})["k"]
+    assert stats["count"] == 3
+    assert stats["current"] == 120.0
+    assert stats["average"] == pytest.approx(110.0)
+    assert stats["overall_min"] == pytest.approx(90.0)
+
+
+def test_group_records_by_commodity_and_district():
+    records = [{"cmdty": "Wheat", "district": "Pune"}, {"cmdty": "Wheat", "district": "Nashik"},
+               {"cmdty": "Wheat", "district": "Pune"}]
+    groups = group_records(records)
+    assert [len(group) for group in groups.values()] == [2, 1]
+
+
+def test_formatter_reports_the_baseline_figures():
+    records = random_series(random.Random(3), 25, 0.02)
+    expected = baseline_stats(records)
+    text = analyze_price_records({"data": records})
+
+    assert f"Current Price: ₹{expected['current']:.2f}" in text
+    assert f"Average Price (30 days): ₹{expected['average']:.2f}" in text
+    assert f"Overall Price Range: ₹{expected['overall_min']:.2f} - ₹{expected['overall_max']:.2f}" in text
+    assert f"Trend: {expected['trend'].capitalize()}" in text
+    assert "Volatility:" in text
+
+
+def test_formatter_errors():
+    assert analyze_price_records({"error": "down"}) == "Error: down"
+    assert analyze_price_records({"data": []}).startswith("No price data")
+    assert analyze_price_records({"data": [{"p_modal": 0}]}) == "No valid price data found in the response."
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.audio.coalescing import AudioCoalescer
+
+RATE = 16000
+# 80 ms of 16 kHz 16-bit mono
+FRAME = 2560
+
+
+class Recorder:
+    def __init__(self):
+        self.frames = []
+        self.flushes = 0
+        self.discards = 0
+
+    async def send(self, frame: bytes, sample_rate: int):
+        self.frames.append((frame, sample_rate))
+
+    async def on_flush(self):
+        self.flushes += 1
+
+    async def on_discard(self):
+        self.discards += 1
+
+    def coalescer(self, **kwargs) -> AudioCoalescer:
+        return AudioCoalescer(self.send, on_flush=self.on_flush, on_discard=self.on_discard, **kwargs)
+
+
+def test_negative_settings_are_rejected():
+    with pytest.raises(ValueError):
+        AudioCoalescer(Recorder().send, frame_ms=-1)
+
+
+def test_small_parts_are_combined_into_frames():
+    async def run():
+        recorder = Recorder()
+        coalescer = recorder.coalescer(max_hold_ms=1000)
+        audio = bytes(range(256)) * 40  # 10240 bytes
+        parts = [audio[start:start + 640] for start in range(0, len(audio), 640)]
+        for part in parts:
+            await coalescer.write(part, RATE)
+
+        # The first part of a reply is not held back
+        assert [len(frame) for frame, _ in recorder.frames] == [640, FRAME, FRAME, FRAME]
+        assert coalescer.pending_ms == 60.0
+
+        await coalescer.flush()
+        assert [len(frame) for frame, _ in recorder.frames][-1] == 1920
+        assert b"".join(frame for frame, _ in recorder.frames) == audio
+        assert recorder.flushes == 1
+        assert coalescer.stats()["parts_in"] == 16
+        assert coalescer.stats()["frames_sent"] == 5
+        await coalescer.close()
+
+    asyncio.run(run())
+
+
+def test_partial_frame_goes_out_after_max_hold():
+    async def run():
+        recorder = Recorder()
+        coalescer = recorder.coalescer(max_hold_ms=20)
+        await coalescer.write(b"\x01" * 640, RATE)
+        await coalescer.write(b"\x02" * 640, RATE)
+        assert len(recorder.frames) == 1
+
+        await asyncio.sleep(0.1)
+        assert [frame for frame, _ in recorder.frames][1] == b"\x02" * 640
+        assert coalescer.hold_flushes == 1
+        await coalescer.close()
+
+    asyncio.run(run())
+
+
+def test_discard_drops_an_interrupted_reply():
+    async def run():
+        recorder = Recorder()
+        coalescer = recorder.coalescer(max_hold_ms=20)
+        await coalescer.write(b"\x01" * 640, RATE)
+        await coalescer.write(b"\x02" * 1000, RATE)
+        await coalescer.discard()
+        assert recorder.discards == 1
+        assert coalescer.stats()["bytes_discarded"] == 1000
+
+        # Nothing is left for the hold timer, the next reply starts at once
+        await asyncio.sleep(0.05)
+        await coalescer.write(b"\x03" * 640, RATE)
+        assert [frame[:1] for frame, _ in recorder.frames] == [b"\x01", b"\x03"]
+        await coalescer.close()
+
+    asyncio.run(run())
+
+
+def test_rate_change_flushes_the_old_audio():
+    async def run():
+        recorder = Recorder()
+        coalescer = recorder.coalescer(max_hold_ms=1000)
+        await coalescer.write(b"\x01" * 640, RATE)
+        await coalescer.write(b"\x02" * 640, RATE)
+        await coalescer.write(b"\x03" * 480, 24000)
+        assert recorder.frames[1] == (b"\x02" * 640, RATE)
+        assert recorder.frames[2] == (b"\x03" * 480, 24000)
+        await coalescer.close()
+
+    asyncio.run(run())
+
+
+def test_frame_ms_zero_sends_every_part():
+    async def run():
+        recorder = Recorder()
+        coalescer = recorder.coalescer(frame_ms=0)
+        for size in (10, 20, 30):
+            await coalescer.write(b"\x00" * size, RATE)
+        assert [len(frame) for frame, _ in recorder.frames] == [10, 20, 30]
+
+    asyncio.run(run())
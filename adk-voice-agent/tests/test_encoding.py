@@ -0,0 +1,229 @@
+import asyncio
+import json
+import struct
+import sys
+
+import numpy as np
+import pytest
+
+from app.audio import encoding as encoding_module
+from app.audio.encoding import (
+    OPUS_DECODE_RATE,
+    FfmpegOpusEncoder,
+    MulawEncoder,
+    OggPacketReader,
+    OutputEncoder,
+    create_output_encoder,
+    mulaw_encode,
+    pack_opus_packets,
+)
+
+# Stands in for ffmpeg: an Ogg page per packet, the two Opus headers first,
+# then a packet per 960 bytes of PCM and one for the tail once stdin closes
+FAKE_FFMPEG = """
+import sys
+out = sys.stdout.buffer
+
+def page(packet):
+    lacing = bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+    out.write(b"OggS" + bytes(22) + bytes([len(lacing)]) + lacing + packet)
+    out.flush()
+
+page(b"OpusHead" + bytes(11))
+page(b"OpusTags" + bytes(8))
+buffer = b""
+while True:
+    data = sys.stdin.buffer.read1(4096)
+    if not data:
+        break
+    buffer += data
+    while len(buffer) >= 960:
+        page(b"packet" + buffer[:4])
+        buffer = buffer[960:]
+if buffer:
+    page(b"tail")
+"""
+
+
+def reference_mulaw(sample: int) -> int:
+    """G.711 mu-law of one sample, the textbook segment search"""
+    sign = 0x80 if sample < 0 else 0
+    magnitude = min(abs(sample), 32635) + 0x84
+    exponent = 7
+    while exponent > 0 and not magnitude & (0x4000 >> (7 - exponent)):
+        exponent -= 1
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+class Sent:
+    def __init__(self):
+        self.payloads = []
+
+    async def __call__(self, payload: bytes, sample_rate: int):
+        self.payloads.append((payload, sample_rate))
+
+
+def ogg_page(*packets: bytes) -> bytes:
+    lacing, body = b"", b""
+    for packet in packets:
+        lacing += bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+        body += packet
+    return b"OggS" + bytes(22) + bytes([len(lacing)]) + lacing + body
+
+
+def test_mulaw_matches_the_reference():
+    samples = np.array([0, 1, -1, 100, -100, 1000, -1000, 8000, -8000, 32767, -32768], dtype=np.int16)
+    samples = np.concatenate([samples, np.random.default_rng(0).integers(-32768, 32767, 500, dtype=np.int16)])
+    assert mulaw_encode(samples) == bytes(reference_mulaw(int(sample)) for sample in samples)
+
+
+def test_mulaw_encoder_resamples_to_its_rate():
+    async def run():
+        sent = Sent()
+        encoder = MulawEncoder(sent)
+        assert encoder.mime_type == "audio/pcmu;rate=8000"
+        # 100 ms at 24 kHz in, 100 ms at 8 kHz out
+        await encoder.write(bytes(4800), 24000)
+        await encoder.write(bytes(1600), 8000)
+        payload, rate = sent.payloads[0]
+        assert rate == 8000
+        assert abs(len(payload) - 800) <= 1
+        assert sent.payloads[1] == (bytes([0xFF]) * 800, 8000)
+
+        stats = encoder.stats()
+        assert stats["pcm_bytes"] == 6400
+        assert stats["bandwidth_saved"] == pytest.approx(0.75, abs=0.01)
+
+    asyncio.run(run())
+
+
+def test_pcm_encoder_keeps_the_model_rate_unchanged():
+    async def run():
+        sent = Sent()
+        encoder = OutputEncoder(sent)
+        assert encoder.mime_type == "audio/pcm"
+        pcm = np.arange(480, dtype="<i2").tobytes()
+        await encoder.write(pcm, 24000)
+        assert sent.payloads == [(pcm, 24000)]
+        assert OutputEncoder(sent, 16000).mime_type == "audio/pcm;rate=16000"
+
+    asyncio.run(run())
+
+
+def test_create_output_encoder_checks_codec_and_rate():
+    sent = Sent()
+    assert isinstance(create_output_encoder("mulaw", sent), MulawEncoder)
+    assert create_output_encoder("pcm", sent, 16000).sample_rate == 16000
+    assert create_output_encoder("opus", sent, 24000).send is sent
+    with pytest.raises(ValueError):
+        create_output_encoder("flac", sent)
+    with pytest.raises(ValueError):
+        create_output_encoder("pcm", sent, 44100)
+    with pytest.raises(ValueError):
+        create_output_encoder("opus", sent, 8000)
+
+
+def test_ogg_reader_splits_packets_across_pages_and_reads():
+    long_packet = bytes(range(256)) * 2 + b"end"
+    stream = ogg_page(b"one", b"two") + ogg_page(long_packet) + ogg_page(bytes(255)) + ogg_page(b"")
+    reader = OggPacketReader()
+    packets = []
+    for start in range(0, len(stream), 7):
+        packets += reader.feed(stream[start:start + 7])
+    assert packets == [b"one", b"two", long_packet, bytes(255), b""]
+
+    # Junk before a page is skipped
+    assert OggPacketReader().feed(b"noise" + ogg_page(b"x")) == [b"x"]
+
+
+def test_opus_payload_is_length_prefixed():
+    assert pack_opus_packets([b"ab", b"c"]) == b"\x00\x02ab\x00\x01c"
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    script = tmp_path / "ffmpeg.py"
+    script.write_text(FAKE_FFMPEG)
+    monkeypatch.setattr(encoding_module, "FFMPEG_OPUS_COMMAND", [sys.executable, str(script)])
+
+
+def unpack(payloads):
+    packets = []
+    for payload, rate in payloads:
+        assert rate == OPUS_DECODE_RATE
+        while payload:
+            (size,) = struct.unpack("!H", payload[:2])
+            packets.append(payload[2:2 + size])
+            payload = payload[2 + size:]
+    return packets
+
+
+def test_opus_flush_sends_the_whole_reply_before_returning(fake_ffmpeg):
+    async def run():
+        sent = Sent()
+        encoder = FfmpegOpusEncoder(sent)
+        await encoder.start()
+        await encoder.write(b"\x01" * 1920 + b"\x02" * 100, 24000)
+        await encoder.flush()
+        assert unpack(sent.payloads) == [b"packet\x01\x01\x01\x01", b"packet\x01\x01\x01\x01", b"tail"]
+
+        # A new process is ready for the next reply
+        sent.payloads.clear()
+        await encoder.write(b"\x03" * 960, 24000)
+        await encoder.flush()
+        assert unpack(sent.payloads) == [b"packet\x03\x03\x03\x03"]
+        assert encoder.stats()["packets_sent"] == 4
+        await encoder.close()
+
+    asyncio.run(run())
+
+
+def test_opus_reset_drops_the_interrupted_reply(fake_ffmpeg):
+    async def run():
+        sent = Sent()
+        encoder = FfmpegOpusEncoder(sent)
+        await encoder.write(b"\x01" * 100, 24000)
+        await encoder.reset()
+        # Flushing nothing written is a no-op
+        await encoder.flush()
+
+        await encoder.write(b"\x02" * 100, 24000)
+        await encoder.flush()
+        assert unpack(sent.payloads) == [b"tail"]
+        assert encoder.stats()["replies_dropped"] == 1
+        await encoder.close()
+
+    asyncio.run(run())
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.frames = []
+        self.texts = []
+
+    async def send_bytes(self, data: bytes):
+        self.frames.append(data)
+
+    async def send_text(self, text: str):
+        self.texts.append(text)
+
+
+def test_audio_output_sends_frames_labelled_with_the_encoder_codec():
+    from app.audio.framing import CODEC_MULAW, decode_audio_frame
+    from app.main import audio_output
+
+    async def run():
+        websocket = RecordingWebSocket()
+        writer, encoder = audio_output(websocket, True, "mulaw", 8000, frame_ms=0)
+        await writer.write(bytes(1600), 8000)
+        codec, sample_rate, sequence, payload = decode_audio_frame(websocket.frames[0])
+        assert (codec, sample_rate, sequence) == (CODEC_MULAW, 8000, 0)
+        assert bytes(payload) == bytes([0xFF]) * 800
+
+        websocket = RecordingWebSocket()
+        writer, encoder = audio_output(websocket, False, "pcm", 16000, frame_ms=0)
+        await writer.write(bytes(960), 24000)
+        assert json.loads(websocket.texts[0])["mime_type"] == "audio/pcm;rate=16000"
+
+    asyncio.run(run())
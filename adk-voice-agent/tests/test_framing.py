@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from app.audio.framing import (
+    AUDIO_FRAME_HEADER_SIZE,
+    CODEC_OPUS,
+    CODEC_PCM16,
+    decode_audio_frame,
+    encode_audio_frame,
+)
+
+
+def test_round_trip():
+    payload = bytes(range(256)) * 4
+    frame = encode_audio_frame(payload, sequence=7, sample_rate=24000, codec=CODEC_OPUS)
+
+    assert len(frame) == AUDIO_FRAME_HEADER_SIZE + len(payload)
+    codec, sample_rate, sequence, data = decode_audio_frame(frame)
+    assert (codec, sample_rate, sequence) == (CODEC_OPUS, 24000, 7)
+    assert bytes(data) == payload
+
+
+def test_payload_is_a_view_into_the_frame():
+    frame = encode_audio_frame(b"abcd", sequence=0, sample_rate=16000)
+    _, _, _, data = decode_audio_frame(frame)
+    assert isinstance(data, memoryview)
+    assert data.obj is frame
+
+
+def test_empty_payload():
+    codec, _, _, data = decode_audio_frame(encode_audio_frame(b"", sequence=1, sample_rate=16000))
+    assert codec == CODEC_PCM16
+    assert len(data) == 0
+
+
+def test_sequence_wraps_at_32_bits():
+    frame = encode_audio_frame(b"", sequence=2**32 + 5, sample_rate=16000)
+    assert decode_audio_frame(frame)[2] == 5
+
+
+def test_truncated_frame_is_rejected():
+    with pytest.raises(ValueError):
+        decode_audio_frame(b"\x01\x00\x3e")
+
+
+def test_unknown_version_is_rejected():
+    frame = bytearray(encode_audio_frame(b"\x00\x00", sequence=0, sample_rate=16000))
+    frame[0] = 2
+    with pytest.raises(ValueError):
+        decode_audio_frame(bytes(frame))
+
+
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        if not self.messages:
+            return {"type": "websocket.disconnect", "code": 1000}
+        return self.messages.pop(0)
+
+
+def test_unnegotiated_binary_frame_is_dropped_and_the_session_goes_on():
+    from app.audio.ingress import BoundedLiveRequestQueue
+    from app.main import client_to_agent_messaging
+
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        websocket = FakeWebSocket([
+            {"type": "websocket.receive", "bytes": encode_audio_frame(bytes(320), 0, 16000)},
+            {"type": "websocket.receive", "text": json.dumps({"mime_type": "text/plain", "data": "hello"})},
+        ])
+        await client_to_agent_messaging(websocket, queue, decoder=None, pacer=None, binary_audio=False)
+        assert queue.audio_bytes == 0
+        assert (await asyncio.wait_for(queue.get(), 1)).content.parts[0].text == "hello"
+
+    asyncio.run(run())
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from google.adk.agents.live_request_queue import LiveRequest
+from google.genai.types import Blob, Content, Part
+
+from app.audio.ingress import (
+    BYTES_PER_MS,
+    OVERFLOW_BLOCK,
+    OVERFLOW_CLOSE,
+    OVERFLOW_DROP_OLDEST,
+    BoundedLiveRequestQueue,
+    IngressBudget,
+    IngressOverflow,
+)
+from app.audio.pacing import AudioPacer
+
+
+def audio(ms: int) -> Blob:
+    return Blob(data=bytes(ms * BYTES_PER_MS), mime_type="audio/pcm")
+
+
+def test_queue_counts_audio_and_keeps_order():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        queue.send_realtime(audio(10))
+        queue.send_content(Content(role="user", parts=[Part(text="hi")]))
+        queue.close()
+        assert queue.audio_bytes == queue.peak_audio_bytes == 10 * BYTES_PER_MS
+
+        first, second, third = [await queue.get() for _ in range(3)]
+        assert first.blob is not None
+        assert second.content.parts[0].text == "hi"
+        assert third.close
+        assert queue.audio_bytes == 0
+
+    asyncio.run(run())
+
+
+def test_queue_drop_oldest_audio_keeps_content():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        queue.send_realtime(audio(10))
+        queue.send(LiveRequest(content=Content(role="user", parts=[Part(text="keep")])))
+        queue.send_realtime(audio(10))
+        queue.send_realtime(audio(10))
+
+        assert queue.drop_oldest_audio(15 * BYTES_PER_MS) == 20 * BYTES_PER_MS
+        assert queue.audio_bytes == 10 * BYTES_PER_MS
+        assert (await queue.get()).content.parts[0].text == "keep"
+        assert (await queue.get()).blob is not None
+
+    asyncio.run(run())
+
+
+def test_budget_rejects_invalid_settings():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        with pytest.raises(ValueError):
+            IngressBudget(queue, policy="spill")
+        with pytest.raises(ValueError):
+            IngressBudget(queue, max_ms=0)
+
+    asyncio.run(run())
+
+
+def test_admit_returns_under_the_limit():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        budget = IngressBudget(queue, max_ms=100, policy=OVERFLOW_CLOSE)
+        queue.send_realtime(audio(100))
+        await budget.admit()
+        assert budget.overflows == 0
+        assert budget.stats()["peak_backlog_ms"] == 100
+        budget.close()
+
+    asyncio.run(run())
+
+
+def test_close_policy_raises():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        budget = IngressBudget(queue, max_ms=100, policy=OVERFLOW_CLOSE)
+        queue.send_realtime(audio(150))
+        with pytest.raises(IngressOverflow):
+            await budget.admit()
+        assert budget.overflows == 1
+        budget.close()
+
+    asyncio.run(run())
+
+
+def test_drop_oldest_policy_trims_both_stages():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        pacer = AudioPacer(send=queue.send_realtime)
+        budget = IngressBudget(queue, pacer, max_ms=100, pacer_max_ms=200, policy=OVERFLOW_DROP_OLDEST)
+        for _ in range(3):
+            queue.send_realtime(audio(50))
+        await pacer.feed(bytes(300 * BYTES_PER_MS))
+
+        await budget.admit()
+        assert queue.audio_bytes <= 100 * BYTES_PER_MS
+        assert pacer.pending_bytes == 200 * BYTES_PER_MS
+        assert budget.stats()["dropped_ms"] == 150
+        budget.close()
+
+    asyncio.run(run())
+
+
+def test_block_policy_waits_for_the_model():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        budget = IngressBudget(queue, max_ms=100, policy=OVERFLOW_BLOCK, block_timeout=1.0)
+        queue.send_realtime(audio(100))
+        queue.send_realtime(audio(100))
+
+        admit = asyncio.create_task(budget.admit())
+        await asyncio.sleep(0.01)
+        assert not admit.done()
+
+        await queue.get()
+        await asyncio.wait_for(admit, 1.0)
+        assert budget.overflows == 1
+        assert budget.stats()["blocked_ms"] > 0
+        budget.close()
+
+    asyncio.run(run())
+
+
+def test_block_policy_gives_up_when_the_model_stalls():
+    async def run():
+        queue = BoundedLiveRequestQueue()
+        budget = IngressBudget(queue, max_ms=100, policy=OVERFLOW_BLOCK, block_timeout=0.05)
+        queue.send_realtime(audio(200))
+        with pytest.raises(IngressOverflow):
+            await budget.admit()
+        budget.close()
+
+    asyncio.run(run())
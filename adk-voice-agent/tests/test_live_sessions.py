@@ -0,0 +1,224 @@
+import asyncio
+
+from google.adk.agents import Agent
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.tools.agent_tool import AgentTool
+from google.genai.types import Content, Part
+
+from app.audio.ingress import BoundedLiveRequestQueue
+from app.sessions import BoundedSessionService, LiveSessionRegistry, instructions_read_state
+from app.sessions import live as live_module
+from app.sessions.live import POOL_USER_ID
+
+APP = "app"
+
+
+class FakeModel:
+    """Starts live runs that echo every text they are sent back as an event"""
+
+    def __init__(self):
+        self.launches = 0
+
+    async def start_live(self, session, is_audio):
+        self.launches += 1
+        queue = BoundedLiveRequestQueue()
+
+        async def events():
+            while True:
+                request = await queue.get()
+                if request.close:
+                    return
+                yield Event(author="model", content=request.content)
+
+        return events(), queue
+
+
+def say(live, text: str):
+    live.live_request_queue.send_content(Content(role="user", parts=[Part(text=text)]))
+
+
+async def next_text(events) -> str:
+    event = await asyncio.wait_for(events.__anext__(), 1)
+    return event.content.parts[0].text
+
+
+def make_registry(**kwargs):
+    model = FakeModel()
+    kwargs.setdefault("pool_size", 0)
+    registry = LiveSessionRegistry(BoundedSessionService(), APP, model.start_live, **kwargs)
+    return registry, model
+
+
+def test_new_connection_gets_a_fresh_run():
+    async def run():
+        registry, model = make_registry()
+        live, attachment = await registry.attach("farmer", is_audio=False)
+        assert not live.resumed
+        assert live.session.user_id == "farmer"
+
+        say(live, "namaste")
+        assert await next_text(live.events(attachment)) == "namaste"
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_reconnect_within_grace_resumes_the_stream():
+    async def run():
+        registry, model = make_registry(grace=5)
+        live, attachment = await registry.attach("farmer", is_audio=False)
+        registry.detach(live, attachment)
+
+        # Produced while nobody is connected, delivered after the reconnect
+        say(live, "missed")
+        resumed, attachment = await registry.attach("farmer", is_audio=False, token=live.token)
+        assert resumed is live
+        assert resumed.resumed
+        assert await next_text(resumed.events(attachment)) == "missed"
+        assert model.launches == 1
+        assert registry.resumed_streams == 1
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_a_newer_connection_supersedes_the_older_one():
+    async def run():
+        registry, _ = make_registry(grace=5)
+        live, first = await registry.attach("farmer", is_audio=False)
+        _, second = await registry.attach("farmer", is_audio=False, token=live.token)
+        assert first.is_set()
+        assert not second.is_set()
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_token_of_another_user_starts_a_new_session():
+    async def run():
+        registry, model = make_registry(grace=5)
+        live, attachment = await registry.attach("farmer", is_audio=False)
+        registry.detach(live, attachment)
+
+        other, _ = await registry.attach("someone-else", is_audio=False, token=live.token)
+        assert other is not live
+        assert other.session.id != live.session.id
+        assert not other.resumed
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_after_the_grace_period_the_session_resumes_on_a_new_run():
+    async def run():
+        registry, model = make_registry(grace=0.01)
+        live, attachment = await registry.attach("farmer", is_audio=False)
+        registry.detach(live, attachment)
+        await asyncio.sleep(0.05)
+        assert registry.stats()["live"] == 0
+
+        resumed, _ = await registry.attach("farmer", is_audio=False, token=live.token)
+        assert resumed is not live
+        assert resumed.session.id == live.session.id
+        assert resumed.token == live.token
+        assert resumed.resumed
+        assert registry.resumed_sessions == 1
+        assert model.launches == 2
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_switching_modality_keeps_the_session():
+    async def run():
+        registry, model = make_registry(grace=5)
+        live, _ = await registry.attach("farmer", is_audio=False)
+        audio, _ = await registry.attach("farmer", is_audio=True, token=live.token)
+        assert audio is not live
+        assert audio.is_audio
+        assert audio.session.id == live.session.id
+        # The run in the old modality is ended
+        await asyncio.sleep(0.01)
+        assert live.finished
+        registry.close()
+
+    asyncio.run(run())
+
+
+async def wait_for_pool(registry, is_audio: bool, size: int):
+    for _ in range(200):
+        if registry.stats()["pool_audio" if is_audio else "pool_text"] >= size:
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("pool did not fill")
+
+
+def test_claimed_pool_run_moves_to_the_user_and_is_replaced():
+    async def run():
+        registry, model = make_registry(pool_size=2, grace=5)
+        registry.start_pool()
+        await wait_for_pool(registry, True, 2)
+        # User state the farmer saved in an earlier session
+        service = registry.session_service
+        earlier = service.create_session(app_name=APP, user_id="farmer")
+        service.append_event(earlier, Event(author="user", actions=EventActions(state_delta={"user:district": "Pune"})))
+
+        live, attachment = await registry.attach("farmer", is_audio=True)
+        assert live.session.user_id == "farmer"
+        assert live.session.state["user:district"] == "Pune"
+        assert registry.pool_hits == 1
+        assert service.get_session(app_name=APP, user_id="farmer", session_id=live.session.id)
+        assert not service.get_session(app_name=APP, user_id=POOL_USER_ID, session_id=live.session.id)
+
+        say(live, "warm")
+        assert await next_text(live.events(attachment)) == "warm"
+        await wait_for_pool(registry, True, 2)
+        # Two runs in each pool plus the replacement
+        assert model.launches == 5
+
+        # The other modality has its own pool
+        await registry.attach("farmer", is_audio=False)
+        assert registry.pool_hits == 2
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_failing_launches_back_off(monkeypatch):
+    monkeypatch.setattr(live_module, "POOL_RETRY_SECONDS", 0.02)
+
+    async def run():
+        attempts = []
+
+        async def start_live(session, is_audio):
+            attempts.append(is_audio)
+            raise RuntimeError("model unavailable")
+
+        registry = LiveSessionRegistry(BoundedSessionService(), APP, start_live, pool_size=2, pool_pause=10)
+        registry.start_pool()
+        await asyncio.sleep(0.5)
+
+        # 0.02 + 0.04 + 0.08 + 0.16 s of backoff, then a 10 s pause
+        assert len(attempts) == 2 * live_module.POOL_MAX_FAILURES
+        assert registry.stats()["pool_failures"] == 2 * live_module.POOL_MAX_FAILURES
+        assert registry.session_service.stats()["sessions"] == 0
+
+        # A connection still gets a run of its own
+        registry.start_live = FakeModel().start_live
+        live, _ = await registry.attach("farmer", is_audio=True)
+        assert live.session.user_id == "farmer"
+        assert registry.pool_misses == 1
+        registry.close()
+
+    asyncio.run(run())
+
+
+def test_instructions_reading_state_rule_out_the_pool():
+    plain = Agent(name="plain", model="stub", instruction='Reply briefly. {"example": 1}')
+    assert not instructions_read_state(plain)
+
+    personal = Agent(name="personal", model="stub", instruction="The farmer lives in {user:district}.")
+    assert instructions_read_state(Agent(name="root", model="stub", instruction="Route", sub_agents=[personal]))
+    assert instructions_read_state(Agent(name="tool_owner", model="stub", tools=[AgentTool(agent=personal)]))
+    assert instructions_read_state(Agent(name="dynamic", model="stub", instruction=lambda context: "hi"))
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from google.adk.tools.function_tool import FunctionTool
+
+from app.metrics import registry as registry_module
+from app.metrics import voice as voice_module
+from app.metrics.registry import MetricsRegistry
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = MetricsRegistry()
+    frames = registry.counter("frames_total", "Frames sent", ["codec"])
+    frames.inc(codec="pcm")
+    frames.inc(2, codec="opus")
+    frames.inc(codec="pcm")
+    connections = registry.gauge("connections", "Open connections")
+    connections.inc()
+    connections.inc()
+    connections.dec()
+
+    assert registry.render().splitlines() == [
+        "# HELP frames_total Frames sent",
+        "# TYPE frames_total counter",
+        'frames_total{codec="opus"} 2',
+        'frames_total{codec="pcm"} 2',
+        "# HELP connections Open connections",
+        "# TYPE connections gauge",
+        "connections 1",
+    ]
+
+
+def test_label_values_are_escaped_and_checked():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["reason"])
+    errors.inc(reason='bad "frame"\n')
+    assert 'errors_total{reason="bad \\"frame\\"\\n"} 1' in registry.render()
+
+    with pytest.raises(ValueError):
+        errors.inc()
+    with pytest.raises(ValueError):
+        errors.inc(codec="pcm")
+    with pytest.raises(ValueError):
+        registry.counter("errors_total", "Errors again")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["input"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, input="pcm")
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{input="pcm",le="0.1"} 2',
+        'latency_seconds_bucket{input="pcm",le="1"} 3',
+        'latency_seconds_bucket{input="pcm",le="+Inf"} 4',
+        'latency_seconds_sum{input="pcm"} 3.65',
+        'latency_seconds_count{input="pcm"} 4',
+    ]
+
+
+def test_function_metrics_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    entries = {"count": 3}
+    registry.gauge("cache_entries", "Entries", function=lambda: entries["count"])
+    registry.counter("cache_lookups_total", "Lookups", ["result"],
+                     function=lambda: {("hit",): 5, ("miss",): 1.5})
+
+    entries["count"] = 7
+    text = registry.render()
+    assert "cache_entries 7\n" in text
+    assert 'cache_lookups_total{result="hit"} 5\n' in text
+    assert 'cache_lookups_total{result="miss"} 1.5\n' in text
+
+
+def test_a_failing_metric_is_logged_and_skipped(monkeypatch):
+    logged = []
+    monkeypatch.setattr(registry_module.log, "error", lambda event, message, **fields: logged.append((event, fields)))
+    registry = MetricsRegistry()
+    registry.gauge("broken", "Raises", function=lambda: 1 / 0)
+    registry.gauge("working", "Fine", function=lambda: 1)
+
+    text = registry.render()
+    assert "broken" not in text
+    assert "working 1\n" in text
+    assert logged == [("metric_collect_failed", {"metric": "broken"})]
+
+
+def test_tool_calls_are_timed_by_status(monkeypatch):
+    registry = MetricsRegistry()
+    tool_duration = registry.histogram("agent_tool_seconds", "Tool call duration", ["tool", "status"])
+    monkeypatch.setattr(voice_module, "tool_duration", tool_duration)
+
+    def lookup(crop: str) -> dict:
+        """Looks up a crop"""
+        if crop == "unknown":
+            return {"status": "error", "error_message": "no such crop"}
+        if crop == "crash":
+            raise RuntimeError("upstream down")
+        return {"status": "success"}
+
+    tool = FunctionTool(lookup)
+    voice_module._time_tool(tool)
+    # Wrapping twice must not time a call twice
+    voice_module._time_tool(tool)
+
+    async def run():
+        await tool.run_async(args={"crop": "wheat"}, tool_context=None)
+        await tool.run_async(args={"crop": "unknown"}, tool_context=None)
+        with pytest.raises(RuntimeError):
+            await tool.run_async(args={"crop": "crash"}, tool_context=None)
+
+    asyncio.run(run())
+    text = registry.render()
+    assert 'agent_tool_seconds_count{tool="lookup",status="ok"} 1\n' in text
+    assert 'agent_tool_seconds_count{tool="lookup",status="error"} 2\n' in text
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from app.audio.pacing import BURST, PACED, AudioPacer
+
+# 50 ms of 16 kHz 16-bit mono
+CHUNK = 1600
+
+
+async def wait_until(condition, timeout: float = 1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.001)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        AudioPacer(send=print, mode="fast")
+    with pytest.raises(ValueError):
+        AudioPacer(send=print, chunk_ms=0)
+
+
+def test_burst_sends_whole_chunks_in_order_and_flushes_the_tail():
+    async def run():
+        sent = []
+        pacer = AudioPacer(send=sent.append, mode=BURST)
+        pacer.start()
+        audio = bytes(range(256)) * 26  # 6656 bytes, 4 chunks and a tail
+        await pacer.feed(audio)
+        await wait_until(lambda: len(sent) == 4)
+        await asyncio.sleep(0.01)
+        assert len(sent) == 4
+
+        pacer.flush()
+        await wait_until(lambda: len(sent) == 5)
+        assert [len(chunk) for chunk in sent] == [CHUNK] * 4 + [256]
+        assert b"".join(sent) == audio
+        assert pacer.stats()["bytes_sent"] == len(audio)
+        await pacer.close()
+
+    asyncio.run(run())
+
+
+def test_paced_releases_audio_in_real_time():
+    async def run():
+        sent = []
+        pacer = AudioPacer(send=sent.append, mode=PACED)
+        pacer.start()
+        start = time.monotonic()
+        await pacer.feed(bytes(CHUNK * 5))
+        await wait_until(lambda: len(sent) == 5)
+        elapsed = time.monotonic() - start
+
+        # The first chunk goes out at once, the last one 200 ms later
+        assert 0.18 <= elapsed < 0.5
+        assert pacer.max_drift_ms < 50
+        await pacer.close()
+
+    asyncio.run(run())
+
+
+def test_drop_oldest_keeps_whole_samples():
+    pacer = AudioPacer(send=print)
+    asyncio.run(pacer.feed(bytes(100)))
+    assert pacer.drop_oldest(11) == 12
+    assert pacer.pending_bytes == 88
+    assert pacer.drop_oldest(1000) == 88
+
+
+def test_send_error_stops_the_pacer_and_reaches_the_producer():
+    async def run():
+        def send(chunk):
+            raise RuntimeError("queue closed")
+
+        pacer = AudioPacer(send=send, mode=BURST)
+        pacer.start()
+        await pacer.feed(bytes(CHUNK * 3))
+        await wait_until(lambda: pacer.error is not None)
+
+        assert pacer.pending_bytes == 0
+        with pytest.raises(RuntimeError):
+            await pacer.feed(bytes(CHUNK))
+        await pacer.close()
+
+    asyncio.run(run())
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.audio.pcm import PcmIngestor, PcmResampler, parse_pcm_mime_type
+
+
+def sine(rate: int, seconds: float, frequency: float = 440.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_parse_pcm_mime_type_defaults_to_16k_mono_int16():
+    assert parse_pcm_mime_type("audio/pcm") == (16000, "int16", 1)
+    assert parse_pcm_mime_type("audio/pcm; rate=48000; format=Float32; channels=2") == (48000, "float32", 2)
+
+
+@pytest.mark.parametrize("source_rate", [48000, 44100, 24000])
+def test_resampler_output_length_matches_rate(source_rate):
+    resampler = PcmResampler(source_rate)
+    out = resampler.process(sine(source_rate, 1.0))
+    assert abs(out.size - 16000) <= 1
+
+
+@pytest.mark.parametrize("source_rate", [48000, 44100, 24000])
+def test_resampler_chunked_matches_whole_buffer(source_rate):
+    signal = sine(source_rate, 0.5)
+    whole = PcmResampler(source_rate).process(signal)
+
+    # Odd chunk sizes so pending samples and the read position carry over
+    resampler = PcmResampler(source_rate)
+    pieces = [resampler.process(chunk) for chunk in np.array_split(signal, 37)]
+    chunked = np.concatenate(pieces)
+
+    assert chunked.size == whole.size
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+
+
+def test_resampler_integer_ratio_averages_blocks():
+    out = PcmResampler(48000).process(np.array([0.0, 0.3, 0.6, 1.0, 1.0, 1.0, 0.5], dtype=np.float32))
+    np.testing.assert_allclose(out, [0.3, 1.0], atol=1e-6)
+
+
+def test_resampler_same_rate_passes_through():
+    samples = sine(16000, 0.01)
+    assert PcmResampler(16000).process(samples) is samples
+
+
+def test_ingestor_fast_path_returns_input_unchanged():
+    ingestor = PcmIngestor()
+    data = (np.arange(160, dtype="<i2") * 100).tobytes()
+    assert ingestor.convert(data) == data
+    assert ingestor.samples_in == ingestor.samples_out == 160
+
+
+def test_ingestor_downmixes_and_resamples_float32_stereo():
+    mono = sine(48000, 0.1)
+    stereo = np.repeat(mono, 2)
+    out = np.frombuffer(PcmIngestor().convert(stereo.tobytes(), 48000, "float32", 2), dtype="<i2")
+
+    assert out.size == 1600
+    expected = mono.reshape(-1, 3).mean(axis=1) * 32768
+    np.testing.assert_allclose(out, expected, atol=1.5)
+
+
+def test_ingestor_clips_full_scale_float():
+    data = np.array([2.0, -2.0], dtype="<f4").tobytes()
+    out = np.frombuffer(PcmIngestor().convert(data, 16000, "float32"), dtype="<i2")
+    assert out.tolist() == [32767, -32768]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"sample_rate": 22050},
+        {"sample_format": "int8"},
+        {"channels": 0},
+    ],
+)
+def test_ingestor_rejects_unsupported_input(kwargs):
+    with pytest.raises(ValueError):
+        PcmIngestor().convert(bytes(8), **kwargs)
+
+
+def test_ingestor_rejects_partial_frames():
+    with pytest.raises(ValueError):
+        PcmIngestor().convert(bytes(6), 16000, "int16", 2)
@@ -0,0 +1,110 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.jarvis.sub_agents.mandi_analyst.archive import DAYS_BLOCK, ROWS_BLOCK, PriceArchive
+
+KEY = (1, 27, 500)
+
+
+def record(day: date, modal: float, low=None, high=None):
+    return {"t": f"{day.isoformat()}T00:00:00", "p_min": low, "p_modal": modal, "p_max": high}
+
+
+def test_records_round_trip_through_a_reopen(tmp_path):
+    archive = PriceArchive(tmp_path)
+    start = date(2026, 3, 1)
+    written = archive.append_records(KEY, [
+        record(start, 2000, 1900, 2100),
+        record(start + timedelta(days=2), 2200),
+        # Two markets on one day are averaged
+        record(start + timedelta(days=3), 2300, 2200, 2400),
+        record(start + timedelta(days=3), 2500, 2400, 2600),
+        # No modal price, ignored
+        record(start + timedelta(days=4), 0),
+    ])
+    assert written == 3
+    archive.close()
+
+    reopened = PriceArchive(tmp_path, readonly=True)
+    assert reopened.keys() == [KEY]
+    dates, low, modal, high = reopened.series(KEY, start, start + timedelta(days=4))
+    assert dates.tolist() == [start + timedelta(days=offset) for offset in range(5)]
+    np.testing.assert_array_equal(modal, [2000, np.nan, 2200, 2400, np.nan])
+    np.testing.assert_array_equal(low, [1900, np.nan, 2200, 2300, np.nan])
+    np.testing.assert_array_equal(high, [2100, np.nan, 2200, 2500, np.nan])
+    with pytest.raises(RuntimeError):
+        reopened.append_records(KEY, [record(start, 1)])
+
+
+def test_unknown_series_and_empty_archive(tmp_path):
+    archive = PriceArchive(tmp_path / "missing")
+    assert archive.series(KEY) is None
+    assert archive.window([KEY], 30) == {}
+    assert archive.stats()["series"] == 0
+
+
+def test_date_axis_grows_both_ways_and_keeps_prices(tmp_path):
+    archive = PriceArchive(tmp_path)
+    middle = date(2026, 6, 1)
+    archive.append_records(KEY, [record(middle, 1000)])
+    assert archive.stats()["days"] == DAYS_BLOCK
+
+    earlier = middle - timedelta(days=400)
+    later = middle + timedelta(days=500)
+    archive.append_records(KEY, [record(earlier, 900)])
+    archive.append_records((2, 27, 500), [record(later, 1100)])
+
+    assert archive.start == earlier
+    assert archive.stats()["days"] % DAYS_BLOCK == 0
+    for key, day, price in ((KEY, middle, 1000), (KEY, earlier, 900), ((2, 27, 500), later, 1100)):
+        assert archive.series(key, day, day)[2].tolist() == [price]
+    # Cells never written stay NaN after the rewrite
+    assert np.isnan(archive.series((2, 27, 500), middle, middle)[2]).all()
+
+
+def test_rows_grow_past_the_initial_capacity(tmp_path):
+    archive = PriceArchive(tmp_path)
+    day = date(2026, 1, 1)
+    for district in range(ROWS_BLOCK + 5):
+        archive.append_records((1, 27, district), [record(day, 1000 + district)])
+    archive.close()
+
+    reopened = PriceArchive(tmp_path)
+    assert len(reopened.keys()) == ROWS_BLOCK + 5
+    assert reopened.series((1, 27, ROWS_BLOCK + 4), day, day)[2].tolist() == [1000 + ROWS_BLOCK + 4]
+    assert reopened.series((1, 27, 0), day, day)[2].tolist() == [1000]
+
+
+def test_window_returns_the_last_days(tmp_path):
+    archive = PriceArchive(tmp_path)
+    end = date(2026, 2, 10)
+    archive.append_records(KEY, [record(end - timedelta(days=offset), 100 + offset) for offset in range(10)])
+    low, modal, high = archive.window([KEY, (9, 9, 9)], days=3, end=end)[KEY]
+    assert modal.tolist() == [102, 101, 100]
+
+
+def test_reads_during_a_resize_see_whole_series(tmp_path):
+    archive = PriceArchive(tmp_path)
+    day = date(2026, 1, 1)
+    archive.append_records(KEY, [record(day, 1234)])
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            values = archive.series(KEY, day, day)[2].tolist()
+            if values != [1234]:
+                errors.append(values)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for offset in range(1, 6):
+            archive.append_records(KEY, [record(day - timedelta(days=offset * DAYS_BLOCK), 1)])
+    finally:
+        done.set()
+        reader.join()
+    assert errors == []
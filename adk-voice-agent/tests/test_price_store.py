@@ -0,0 +1,142 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.jarvis.sub_agents.mandi_analyst.archive import PriceArchive
+from app.jarvis.sub_agents.mandi_analyst.price_store import PriceStore, missing_ranges
+
+KEY = (1, 27, 500)
+
+
+def record(day: date, modal: float = 2200.0):
+    return {"t": f"{day.isoformat()}T00:00:00", "p_min": modal - 100, "p_modal": modal, "p_max": modal + 100}
+
+
+class FakeUpstream:
+    """Stands in for PriceStore._fetch, records every range asked for"""
+
+    def __init__(self, skip=()):
+        self.ranges = []
+        self.skip = set(skip)
+        self.fail = False
+
+    async def __call__(self, commodity_id, state_id, district_id, start, stop):
+        self.ranges.append((start, stop))
+        if self.fail:
+            raise ValueError("upstream down")
+        days = []
+        day = start
+        while day <= stop:
+            if day not in self.skip:
+                days.append(record(day))
+            day += timedelta(days=1)
+        return days
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(path=tmp_path / "prices.sqlite3", archive=PriceArchive(tmp_path / "archive"),
+                       recent_ttl=3600, settled_days=3)
+    yield store
+    store.close()
+
+
+def test_missing_ranges_collapses_contiguous_days():
+    days = [date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 3), date(2026, 1, 7), date(2026, 1, 9), date(2026, 1, 10)]
+    assert missing_ranges(days) == [
+        (date(2026, 1, 1), date(2026, 1, 3)),
+        (date(2026, 1, 7), date(2026, 1, 7)),
+        (date(2026, 1, 9), date(2026, 1, 10)),
+    ]
+
+
+def test_only_missing_days_are_fetched(store):
+    async def run():
+        today = date.today()
+        store._fetch = upstream = FakeUpstream(skip={today - timedelta(days=5)})
+        first = await store.get_prices(*KEY, days=10)
+        assert upstream.ranges == [(today - timedelta(days=10), today)]
+        assert len(first["data"]) == 10
+
+        # A longer window only asks for the older days it adds
+        upstream.ranges.clear()
+        second = await store.get_prices(*KEY, days=14)
+        assert upstream.ranges == [(today - timedelta(days=14), today - timedelta(days=11))]
+        assert len(second["data"]) == 14
+
+        # Nothing is missing or stale any more, including the day without trading
+        upstream.ranges.clear()
+        await store.get_prices(*KEY, days=14)
+        assert upstream.ranges == []
+
+    asyncio.run(run())
+
+
+def test_recent_days_are_refetched_after_the_ttl(store):
+    async def run():
+        today = date.today()
+        store._fetch = upstream = FakeUpstream()
+        await store.get_prices(*KEY, days=10)
+
+        # Age every stored day past the TTL, only the unsettled ones come back
+        series = store._series[KEY]
+        for day, (fetched_at, records) in list(series.items()):
+            series[day] = (fetched_at - 7200, records)
+        upstream.ranges.clear()
+        await store.get_prices(*KEY, days=10)
+        assert upstream.ranges == [(today - timedelta(days=3), today)]
+
+    asyncio.run(run())
+
+
+def test_stored_days_survive_a_restart_and_eviction(store, tmp_path):
+    async def run():
+        store._fetch = FakeUpstream()
+        await store.get_prices(*KEY, days=5)
+        await store.aclose()
+        store.close()
+
+        reopened = PriceStore(path=tmp_path / "prices.sqlite3", archive=PriceArchive(tmp_path / "archive"),
+                              settled_days=0, max_series=1)
+        reopened._fetch = upstream = FakeUpstream()
+        response = await reopened.get_prices(*KEY, days=5)
+        assert upstream.ranges == []
+        assert len(response["data"]) == 6
+
+        # Another series pushes this one out of memory, it reloads from SQLite
+        await reopened.get_prices(2, 27, 500, days=1)
+        assert KEY not in reopened._series
+        await reopened.get_prices(*KEY, days=5)
+        assert len(upstream.ranges) == 1
+        reopened.close()
+
+    asyncio.run(run())
+
+
+def test_failed_fetch_serves_what_is_stored(store):
+    async def run():
+        store._fetch = upstream = FakeUpstream()
+        await store.get_prices(*KEY, days=5)
+        upstream.fail = True
+
+        response = await store.get_prices(*KEY, days=8)
+        assert len(response["data"]) == 6
+        assert "warning" in response
+
+        assert "error" in await store.get_prices(9, 9, 9, days=3)
+
+    asyncio.run(run())
+
+
+def test_fetched_days_reach_the_archive(store):
+    async def run():
+        store._fetch = FakeUpstream()
+        await store.get_prices(*KEY, days=5)
+        today = date.today()
+        dates, low, modal, high = store.archive.series(KEY, today - timedelta(days=5), today)
+        assert dates.size == 6
+        assert modal.tolist() == [2200.0] * 6
+        assert low.tolist() == [2100.0] * 6
+
+    asyncio.run(run())
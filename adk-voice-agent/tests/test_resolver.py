@@ -0,0 +1,79 @@
+import pytest
+
+from app.jarvis.sub_agents.mandi_analyst.agent import commodity_index, state_index
+from app.jarvis.sub_agents.mandi_analyst.resolver import NameIndex, normalize_name, phonetic_key
+
+
+def commodity_id(query: str):
+    entry = commodity_index.resolve(query)
+    return entry["commodity_id"] if entry else None
+
+
+def state_name(query: str):
+    entry = state_index.resolve(query)
+    return entry["state_name"] if entry else None
+
+
+def test_normalize_drops_filler_words_and_unifies_devanagari():
+    assert normalize_name("Gehun ka bhav, aaj?") == "gehun"
+    assert normalize_name("उड़द") == normalize_name("उडद")
+    assert normalize_name("गेहूँ") == normalize_name("गेहूं")
+
+
+def test_phonetic_key_folds_vowel_spellings_alike():
+    assert phonetic_key("wheet") == phonetic_key("wheat")
+    assert phonetic_key("tamil naadu") == phonetic_key("tamil nadu")
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("wheat", 1),
+        ("gehun ka bhav", 1),
+        ("wheet", 1),
+        ("chana dal", 263),
+        ("chna dal", 263),
+        ("chane ki dal", 263),
+        ("arhar dal", 260),
+        ("dal", 6),
+        ("wheat from karnataka mandi", 1),
+    ],
+)
+def test_commodity_resolution(query, expected):
+    assert commodity_id(query) == expected
+
+
+def test_generic_word_ranks_below_the_full_name():
+    best = commodity_index.candidates("chna dal")[0]
+    assert best["key"] == "chana dal"
+    assert best["method"] == "fuzzy"
+
+
+def test_typo_still_gets_candidates():
+    assert commodity_index.candidates("wheet")[0]["key"] == "wheat"
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("tamil naadu", "Tamil Nadu"),
+        ("mp", "Madhya Pradesh"),
+        ("madhya", "Madhya Pradesh"),
+        ("bengal", "West Bengal"),
+    ],
+)
+def test_state_resolution(query, expected):
+    assert state_name(query) == expected
+
+
+def test_city_is_not_taken_for_a_state():
+    assert state_name("bengaluru") is None
+
+
+def test_shared_word_is_ambiguous():
+    assert state_name("pradesh") is None
+
+
+def test_unknown_alias_group_is_rejected():
+    with pytest.raises(KeyError):
+        NameIndex({"wheat": {}}, {"rice": ["chawal"]})
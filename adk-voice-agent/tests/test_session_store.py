@@ -0,0 +1,113 @@
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai.types import Blob, Content, Part
+
+from app.sessions import store
+from app.sessions.store import BoundedSessionService
+
+APP = "app"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_service(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(store.time, "monotonic", clock)
+    monkeypatch.delenv("SESSION_DB_PATH", raising=False)
+    return BoundedSessionService(**kwargs), clock
+
+
+def exists(service: BoundedSessionService, user_id: str, session_id: str) -> bool:
+    return service.get_session(app_name=APP, user_id=user_id, session_id=session_id) is not None
+
+
+def test_least_recently_used_session_is_evicted(monkeypatch):
+    service, clock = make_service(monkeypatch, max_sessions=2)
+    first = service.create_session(app_name=APP, user_id="a")
+    clock.now += 1
+    second = service.create_session(app_name=APP, user_id="b")
+    clock.now += 1
+    # Reading the first session makes the second the least recently used
+    assert exists(service, "a", first.id)
+    clock.now += 1
+    service.create_session(app_name=APP, user_id="c")
+
+    assert exists(service, "a", first.id)
+    assert not exists(service, "b", second.id)
+    assert service.stats()["sessions"] == 2
+    assert service.evicted_lru == 1
+
+
+def test_pinned_sessions_are_not_evicted(monkeypatch):
+    service, clock = make_service(monkeypatch, max_sessions=1)
+    pinned = service.create_session(app_name=APP, user_id="a")
+    service.pin(pinned)
+    clock.now += 1
+    other = service.create_session(app_name=APP, user_id="b")
+
+    assert exists(service, "a", pinned.id)
+    assert not exists(service, "b", other.id)
+
+    service.unpin(pinned)
+    clock.now += 1
+    service.create_session(app_name=APP, user_id="c")
+    assert not exists(service, "a", pinned.id)
+
+
+def test_idle_sessions_expire(monkeypatch):
+    service, clock = make_service(monkeypatch, idle_ttl=60)
+    idle = service.create_session(app_name=APP, user_id="a")
+    pinned = service.create_session(app_name=APP, user_id="b")
+    service.pin(pinned)
+
+    clock.now += 61
+    service.create_session(app_name=APP, user_id="c")
+
+    assert not exists(service, "a", idle.id)
+    assert exists(service, "b", pinned.id)
+    assert service.evicted_idle == 1
+
+
+def test_evicted_session_is_restored_from_the_database(monkeypatch, tmp_path):
+    service, clock = make_service(monkeypatch, max_sessions=1, db_path=tmp_path / "sessions.db")
+    session = service.create_session(app_name=APP, user_id="a", state={"city": "Pune"})
+    service.append_event(session, Event(
+        author="user",
+        content=Content(role="user", parts=[Part(text="hello")]),
+        actions=EventActions(state_delta={"language": "hi"}),
+    ))
+    clock.now += 1
+    service.create_session(app_name=APP, user_id="b")
+    assert service.evicted_lru == 1
+
+    restored = service.get_session(app_name=APP, user_id="a", session_id=session.id)
+    assert restored.state == {"city": "Pune", "language": "hi"}
+    assert [event.content.parts[0].text for event in restored.events] == ["hello"]
+    assert service.restored == 1
+    service.close()
+
+
+def test_inline_audio_is_not_kept_in_history(monkeypatch):
+    service, _ = make_service(monkeypatch)
+    session = service.create_session(app_name=APP, user_id="a")
+    service.append_event(session, Event(
+        author="jarvis",
+        content=Content(role="model", parts=[Part(inline_data=Blob(data=bytes(3200), mime_type="audio/pcm"))]),
+    ))
+    service.append_event(session, Event(
+        author="jarvis",
+        content=Content(role="model", parts=[
+            Part(text="Namaste"),
+            Part(inline_data=Blob(data=bytes(3200), mime_type="audio/pcm")),
+        ]),
+    ))
+
+    stored = service.get_session(app_name=APP, user_id="a", session_id=session.id)
+    assert len(stored.events) == 1
+    assert [part.text for part in stored.events[0].content.parts] == ["Namaste"]
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from app.audio.vad import VAD_COMPRESS, VAD_DROP, VoiceActivityGate
+
+RATE = 16000
+# One 20 ms frame of 16-bit samples
+FRAME = 640
+
+
+def noise(ms: int, seed: int = 0) -> bytes:
+    samples = np.random.default_rng(seed).normal(0, 30, RATE * ms // 1000)
+    return samples.astype("<i2").tobytes()
+
+
+def tone(ms: int, frequency: float = 300.0, amplitude: float = 8000.0) -> bytes:
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype("<i2").tobytes()
+
+
+def gate(mode: str = VAD_DROP, **kwargs) -> VoiceActivityGate:
+    kwargs.setdefault("end_padding_ms", 0)
+    return VoiceActivityGate(mode, RATE, **kwargs)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        VoiceActivityGate("off")
+    with pytest.raises(ValueError):
+        VoiceActivityGate(end_silence_ms=100, hangover_ms=200)
+    with pytest.raises(ValueError):
+        VoiceActivityGate(pre_roll_ms=20, start_ms=60)
+
+
+def test_silence_and_hum_are_not_sent():
+    vad = gate()
+    sent, ended = vad.process(noise(1000))
+    assert (sent, ended) == (b"", False)
+    # Loud but below the voice band
+    sent, _ = vad.process(tone(500, frequency=50))
+    assert sent == b""
+    assert vad.stats()["trimmed_ms"] == 1500
+
+
+def test_speech_is_sent_with_its_pre_roll_and_hangover():
+    vad = gate(pre_roll_ms=100, hangover_ms=100, end_silence_ms=400)
+    sent, _ = vad.process(noise(500))
+    assert sent == b""
+
+    speech = tone(300)
+    sent, ended = vad.process(speech)
+    assert not ended
+    # The pre-roll is sent ahead of the speech, the frames that opened the gate included
+    assert sent.endswith(speech)
+    assert len(sent) == len(speech) + 2 * FRAME
+
+    # Drop mode: the hangover is sent, the rest of the pause is not, then the end is reported
+    sent, ended = vad.process(noise(600, seed=1))
+    assert ended
+    assert len(sent) == 5 * FRAME
+    assert vad.stats()["speech_ends"] == 1
+
+
+def test_a_single_click_does_not_open_the_gate():
+    vad = gate(start_ms=60)
+    vad.process(noise(500))
+    sent, _ = vad.process(tone(20) + noise(500, seed=2))
+    assert sent == b""
+
+
+def test_compress_keeps_pauses_up_to_max_pause():
+    vad = gate(VAD_COMPRESS, hangover_ms=100, max_pause_ms=200, end_silence_ms=1000)
+    vad.process(noise(500))
+    vad.process(tone(200))
+    sent, ended = vad.process(noise(600, seed=3))
+    assert not ended
+    assert len(sent) == 10 * FRAME
+
+    sent, _ = vad.process(tone(200))
+    assert len(sent) == len(tone(200))
+
+
+def test_end_padding_is_sent_when_speech_ends():
+    vad = gate(end_silence_ms=200, hangover_ms=200, end_padding_ms=800)
+    vad.process(noise(500))
+    vad.process(tone(200))
+    sent, ended = vad.process(noise(200, seed=4))
+    assert ended
+    assert sent.endswith(bytes(RATE * 800 // 1000 * 2))
+    assert vad.stats()["padding_ms"] == 800
+
+
+def test_partial_frames_wait_for_the_next_buffer():
+    vad = gate()
+    audio = noise(500) + tone(300)
+    whole, _ = gate().process(audio)
+
+    sent = b""
+    for start in range(0, len(audio), 333):
+        sent += vad.process(audio[start:start + 333])[0]
+    assert sent == whole
+    assert vad.stats()["audio_in_ms"] == 800
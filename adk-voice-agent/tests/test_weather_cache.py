@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app.weather import cache as cache_module
+from app.weather.cache import CURRENT, FORECAST, WeatherCache, geohash
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def counting_fetch(value):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return dict(value)
+
+    return fetch, calls
+
+
+def test_geohash_known_value():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_nearby_points_share_an_entry(clock):
+    async def run():
+        cache = WeatherCache(geohash_precision=5, current_ttl=600, forecast_ttl=3600)
+        fetch, calls = counting_fetch({"temperature": 30})
+        await cache.get_or_fetch(CURRENT, 18.5204, 73.8567, "METRIC", fetch)
+        value = await cache.get_or_fetch(CURRENT, 18.5210, 73.8570, "METRIC", fetch)
+        assert value == {"temperature": 30}
+        assert len(calls) == 1
+
+        # Other units, kind or a far away point are separate entries
+        await cache.get_or_fetch(CURRENT, 18.5204, 73.8567, "IMPERIAL", fetch)
+        await cache.get_or_fetch(FORECAST, 18.5204, 73.8567, "METRIC", fetch)
+        await cache.get_or_fetch(CURRENT, 28.6139, 77.2090, "METRIC", fetch)
+        assert len(calls) == 4
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 4
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_the_ttl_of_their_kind(clock):
+    async def run():
+        cache = WeatherCache(current_ttl=600, forecast_ttl=3600)
+        fetch, calls = counting_fetch({"ok": True})
+        await cache.get_or_fetch(CURRENT, 10.0, 76.0, "METRIC", fetch)
+        await cache.get_or_fetch(FORECAST, 10.0, 76.0, "METRIC", fetch)
+
+        clock.now += 601
+        await cache.get_or_fetch(CURRENT, 10.0, 76.0, "METRIC", fetch)
+        await cache.get_or_fetch(FORECAST, 10.0, 76.0, "METRIC", fetch)
+        assert len(calls) == 3
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_fetch(clock):
+    async def run():
+        cache = WeatherCache()
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return {"temperature": 25}
+
+        waiters = [asyncio.create_task(cache.get_or_fetch(CURRENT, 12.97, 77.59, "METRIC", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert len(calls) == 1
+        assert all(result == {"temperature": 25} for result in results)
+        assert cache.coalesced == 4
+
+    asyncio.run(run())
+
+
+def test_errors_are_not_cached(clock):
+    async def run():
+        cache = WeatherCache()
+        fetch, calls = counting_fetch({"error": "quota"})
+        await cache.get_or_fetch(CURRENT, 22.57, 88.36, "METRIC", fetch)
+        await cache.get_or_fetch(CURRENT, 22.57, 88.36, "METRIC", fetch)
+        assert len(calls) == 2
+
+        async def failing():
+            raise RuntimeError("down")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch(FORECAST, 22.57, 88.36, "METRIC", failing)
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(run())
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = WeatherCache(max_entries=2)
+    first = cache.key(CURRENT, 10.0, 76.0, "METRIC")
+    second = cache.key(CURRENT, 20.0, 76.0, "METRIC")
+    third = cache.key(CURRENT, 30.0, 76.0, "METRIC")
+    cache.put(first, {"n": 1})
+    cache.put(second, {"n": 2})
+    assert cache.get(first) == {"n": 1}
+    cache.put(third, {"n": 3})
+
+    assert cache.get(second) is None
+    assert cache.get(first) == {"n": 1}
+    assert cache.evictions == 1
+
+
+def test_lat_lon_grid_cells():
+    cache = WeatherCache(cell_size_deg=0.05)
+    assert cache.cell(18.51, 73.85) == cache.cell(18.52, 73.86)
+    assert cache.cell(18.52, 73.85) != cache.cell(18.62, 73.85)